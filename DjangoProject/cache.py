@@ -0,0 +1,329 @@
+"""
+Two-tier cache backend for LearnOnline.
+
+TieredCache keeps a small, bounded LRU of recently read values in each process
+in front of a shared store (Redis in production, a file-based cache for local
+runs). Reads that hit the local tier never leave the process. Like
+LocMemCache, the local tier stores pickled values, so every read gets its own
+copy and callers never share mutable objects (such as model instances).
+
+Coherence between processes uses version stamps: every key prefix with a
+coherent policy has a stamp counter in the shared store. Writes through this
+backend bump the stamp, and a process trusts its local copies only while the
+stamp it last saw (re-read at most every STAMP_CHECK_INTERVAL seconds) is
+unchanged. Prefixes whose keys are immutable (for example keys that already
+contain a content version) can skip the stamp. Keys without a policy use
+LOCAL_TIMEOUT and COHERENT, which default to reading from the shared store
+only, so prefixes opt into the local tier explicitly.
+
+Example configuration::
+
+    CACHES = {
+        "default": {
+            "BACKEND": "DjangoProject.cache.TieredCache",
+            "OPTIONS": {
+                "SHARED": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://..."},
+                "LOCAL_MAX_ENTRIES": 1000,
+                "PREFIX_POLICIES": {
+                    "course-content:": {"local_timeout": 300, "coherent": False},
+                    "page-tag:": {"local_timeout": 5},
+                },
+            },
+        }
+    }
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+STAMP_KEY_PREFIX = "tiered-stamp:"
+SINGLE_FLIGHT_KEY_PREFIX = "single-flight:"
+
+
+@dataclass(frozen=True)
+class PrefixPolicy:
+    # Seconds a value may be served from the local tier; 0 disables it
+    local_timeout: float
+    # Writes bump a shared stamp that invalidates other processes' local copies
+    coherent: bool = True
+
+
+# Always read from the shared store: session data and cross-process locks
+BUILTIN_POLICIES = {
+    "django.contrib.sessions": PrefixPolicy(local_timeout=0),
+    SINGLE_FLIGHT_KEY_PREFIX: PrefixPolicy(local_timeout=0),
+}
+
+
+class LocalLRU:
+    """Thread-safe bounded LRU with per-entry expiry, holding pickled values"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return (value, stamp) or _MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, stamp, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(value), stamp
+
+    def set(self, key, value, ttl, stamp):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (value, stamp, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+
+        shared = dict(options.get("SHARED") or {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"})
+        backend = import_string(shared.pop("BACKEND"))
+        self.shared = backend(shared.pop("LOCATION", location), shared)
+
+        self.local = LocalLRU(options.get("LOCAL_MAX_ENTRIES", 1000))
+        self.stamp_interval = options.get("STAMP_CHECK_INTERVAL", 1.0)
+        self.default_policy = PrefixPolicy(
+            local_timeout=options.get("LOCAL_TIMEOUT", 0),
+            coherent=options.get("COHERENT", False),
+        )
+        policies = dict(BUILTIN_POLICIES)
+        policies.update({
+            prefix: PrefixPolicy(**policy) for prefix, policy in options.get("PREFIX_POLICIES", {}).items()
+        })
+        # Longest prefix wins
+        self.policies = sorted(policies.items(), key=lambda item: len(item[0]), reverse=True)
+
+        self._stamps = {}
+        self._stamps_lock = threading.Lock()
+        self.local_hits = 0
+        self.local_misses = 0
+
+    # ============================================
+    # Policies and stamps
+    # ============================================
+
+    def policy_for(self, key):
+        """Return (prefix, policy) for a key; the default policy uses the prefix ''"""
+        for prefix, policy in self.policies:
+            if key.startswith(prefix):
+                return prefix, policy
+        return "", self.default_policy
+
+    def _current_stamp(self, prefix):
+        now = time.monotonic()
+        with self._stamps_lock:
+            cached = self._stamps.get(prefix)
+        if cached is not None and now - cached[1] < self.stamp_interval:
+            return cached[0]
+        stamp = self.shared.get(STAMP_KEY_PREFIX + prefix, 0)
+        with self._stamps_lock:
+            self._stamps[prefix] = (stamp, now)
+        return stamp
+
+    def _bump_stamp(self, prefix):
+        key = STAMP_KEY_PREFIX + prefix
+        if self.shared.add(key, 1, timeout=None):
+            stamp = 1
+        else:
+            try:
+                stamp = self.shared.incr(key)
+            except ValueError:
+                # Evicted between add() and incr()
+                self.shared.set(key, 1, timeout=None)
+                stamp = 1
+        with self._stamps_lock:
+            self._stamps[prefix] = (stamp, time.monotonic())
+        return stamp
+
+    def _after_write(self, key, version, value=_MISSING, timeout=DEFAULT_TIMEOUT):
+        """Bring the local tier (and other processes' stamps) in line with a shared write"""
+        local_key = self.make_and_validate_key(key, version=version)
+        prefix, policy = self.policy_for(key)
+        # Prefixes never held locally have no copies to invalidate
+        stamp = self._bump_stamp(prefix) if policy.coherent and policy.local_timeout else None
+        if value is _MISSING or not policy.local_timeout:
+            self.local.delete(local_key)
+            return
+        ttl = policy.local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            ttl = min(ttl, backend_timeout - time.time())
+        if ttl > 0:
+            self.local.set(local_key, value, ttl, stamp)
+        else:
+            self.local.delete(local_key)
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # ============================================
+    # Cache API
+    # ============================================
+
+    def get(self, key, default=None, version=None):
+        prefix, policy = self.policy_for(key)
+        if policy.local_timeout:
+            local_key = self.make_and_validate_key(key, version=version)
+            # Read the stamp before the value so a concurrent write can only
+            # make the local copy look older than it is, never newer
+            stamp = self._current_stamp(prefix) if policy.coherent else None
+            entry = self.local.get(local_key)
+            if entry is not _MISSING and entry[1] == stamp:
+                self.local_hits += 1
+                return entry[0]
+            self.local_misses += 1
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        if policy.local_timeout:
+            self.local.set(local_key, value, policy.local_timeout, stamp)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, self._shared_timeout(timeout), version=version)
+        self._after_write(key, version, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, self._shared_timeout(timeout), version=version)
+        if added:
+            self._after_write(key, version, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._shared_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        self._after_write(key, version)
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._after_write(key, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, self._shared_timeout(timeout), version=version)
+        for key, value in data.items():
+            self._after_write(key, version, value, timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        for key in keys:
+            self._after_write(key, version)
+
+    def clear(self):
+        """Clear both tiers. Other processes drop their local copies within LOCAL_TIMEOUT."""
+        self.shared.clear()
+        self.local.clear()
+        with self._stamps_lock:
+            self._stamps.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def stats(self):
+        lookups = self.local_hits + self.local_misses
+        return {
+            "local_entries": len(self.local),
+            "local_hits": self.local_hits,
+            "local_misses": self.local_misses,
+            "local_hit_rate": round(self.local_hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# ============================================
+# Stampede protection
+# ============================================
+
+_flight_locks = [threading.Lock() for _ in range(64)]
+
+
+def single_flight(key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, poll_interval=0.05, cache=None):
+    """
+    Return the cached value for `key`, computing it with compute() on a miss.
+
+    Only one caller computes a missing value at a time: threads of this process
+    wait on a local lock, other processes wait on a short-lived lock key in the
+    shared store and pick up the value once it is written. If the holder does
+    not finish within `lock_timeout` seconds the waiter computes it itself.
+    None results are returned but not cached.
+    """
+    cache = cache or default_cache
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _flight_locks[zlib.crc32(key.encode()) % len(_flight_locks)]:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = SINGLE_FLIGHT_KEY_PREFIX + key
+        deadline = time.monotonic() + lock_timeout
+        locked = cache.add(lock_key, 1, lock_timeout)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            locked = cache.add(lock_key, 1, lock_timeout)
+
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return value
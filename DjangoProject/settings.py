@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -209,14 +210,61 @@ if not DEBUG:
 # Caching Configuration
 # ============================================
 
+# Test runs (manage.py test or pytest) must not clear or fill a real cache
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+
+# Shared tier: Redis when REDIS_CACHE_URL is set, otherwise files on local disk
+REDIS_CACHE_URL = config("REDIS_CACHE_URL", default="")
+if TESTING:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "learnonline-tests",
+    }
+elif REDIS_CACHE_URL:
+    SHARED_CACHE = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_CACHE_URL,
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("CACHE_FILE_LOCATION", default=str(BASE_DIR / ".cache")),
+    }
+
+# Per-process LRU in front of the shared tier (see DjangoProject/cache.py)
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
-        "LOCATION": "django_cache_table",
+        "BACKEND": "DjangoProject.cache.TieredCache",
+        "OPTIONS": {
+            "SHARED": SHARED_CACHE,
+            "LOCAL_MAX_ENTRIES": config("CACHE_LOCAL_MAX_ENTRIES", default=1000, cast=int),
+            # Seconds keys without a prefix policy may be served from process memory;
+            # 0 reads them from the shared store only
+            "LOCAL_TIMEOUT": config("CACHE_LOCAL_TIMEOUT", default=0, cast=int),
+            # Seconds between checks of the shared invalidation stamps
+            "STAMP_CHECK_INTERVAL": 1,
+            "PREFIX_POLICIES": {
+                # Page cache invalidation versions; bumps invalidate other workers' copies
+                "page-tag:": {"local_timeout": 5},
+                # Estimated list totals; a few seconds stale is fine
+                "pagination:count:": {"local_timeout": 5, "coherent": False},
+                # Keys contain the course content version, so they never change
+                "course-content:": {"local_timeout": 300, "coherent": False},
+                # Version counters are compared across workers
+                "autocomplete:": {"local_timeout": 0},
+                # Per-user unread counters change on every read/write
+                "notifications:": {"local_timeout": 0},
+                # Rendered pages are refreshed in place when stale; read them from the shared store
+                "page:": {"local_timeout": 0, "coherent": False},
+                # Template fragments ({% fragment_cache %}) vary on the content version
+                "template.cache.": {"local_timeout": 300, "coherent": False},
+            },
+        },
     }
 }
 
-# Session using cache (faster than database)
+# Session using cache (faster than database); session keys skip the local tier
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 
 # ============================================
@@ -230,6 +278,55 @@ STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", default="")
 VNPAY_TMN_CODE = config("VNPAY_TMN_CODE", default="")
 VNPAY_HASH_SECRET = config("VNPAY_HASH_SECRET", default="")
 
+# ============================================
+# Search configuration
+# ============================================
+# Backend: auto (default, postgres on PostgreSQL) | database | postgres
+SEARCH_BACKEND = config("SEARCH_BACKEND", default="auto")
+SEARCH_MAX_RESULTS = config("SEARCH_MAX_RESULTS", default=500, cast=int)
+# Seconds between checks of the shared autocomplete version / full rebuilds per worker
+AUTOCOMPLETE_REFRESH_INTERVAL = config("AUTOCOMPLETE_REFRESH_INTERVAL", default=30, cast=int)
+AUTOCOMPLETE_MAX_AGE = config("AUTOCOMPLETE_MAX_AGE", default=600, cast=int)
+# Search query logging is buffered per worker and written in batches
+SEARCH_LOG_BUFFER_SIZE = config("SEARCH_LOG_BUFFER_SIZE", default=100, cast=int)
+SEARCH_LOG_FLUSH_INTERVAL = config("SEARCH_LOG_FLUSH_INTERVAL", default=10, cast=int)
+# Raw search query rows older than this are deleted once rolled up (0 keeps them)
+SEARCH_LOG_RETENTION_DAYS = config("SEARCH_LOG_RETENTION_DAYS", default=90, cast=int)
+
+# ============================================
+# Notifications configuration
+# ============================================
+# Rows per bulk insert when fanning a notification out to its recipients
+NOTIFICATION_FANOUT_BATCH_SIZE = config("NOTIFICATION_FANOUT_BATCH_SIZE", default=1000, cast=int)
+# Seconds a user's cached unread count is kept
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = config("NOTIFICATION_UNREAD_CACHE_TIMEOUT", default=86400, cast=int)
+# Server-Sent Events stream: heartbeat and lifetime in seconds, reconnect delay in ms
+NOTIFICATION_STREAM_HEARTBEAT = config("NOTIFICATION_STREAM_HEARTBEAT", default=15, cast=int)
+NOTIFICATION_STREAM_MAX_SECONDS = config("NOTIFICATION_STREAM_MAX_SECONDS", default=300, cast=int)
+NOTIFICATION_STREAM_RETRY_MS = config("NOTIFICATION_STREAM_RETRY_MS", default=15000, cast=int)
+# Redis URL relaying stream events between processes (empty: in-process only)
+NOTIFICATION_STREAM_BROKER_URL = config("NOTIFICATION_STREAM_BROKER_URL", default="")
+# Read notifications older than this are moved to the archive table, in batches
+NOTIFICATION_ARCHIVE_AFTER_DAYS = config("NOTIFICATION_ARCHIVE_AFTER_DAYS", default=90, cast=int)
+NOTIFICATION_ARCHIVE_BATCH_SIZE = config("NOTIFICATION_ARCHIVE_BATCH_SIZE", default=1000, cast=int)
+
+# ============================================
+# Course content caching
+# ============================================
+# Course content is cached per content version, so this only bounds memory use
+COURSE_CONTENT_CACHE_TIMEOUT = config("COURSE_CONTENT_CACHE_TIMEOUT", default=3600, cast=int)
+# Seconds shared caches (nginx, CDNs) may serve public catalog API responses
+# before revalidating them with If-None-Match / If-Modified-Since
+CATALOG_API_CACHE_SECONDS = config("CATALOG_API_CACHE_SECONDS", default=60, cast=int)
+# Anonymous catalog pages: seconds fresh, then seconds served stale while one request re-renders
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=30, cast=int)
+PAGE_CACHE_STALE_TIMEOUT = config("PAGE_CACHE_STALE_TIMEOUT", default=300, cast=int)
+# Deeper course list pages are rendered on every request
+PAGE_CACHE_MAX_PAGE = config("PAGE_CACHE_MAX_PAGE", default=20, cast=int)
+# Cached course-card and outline fragments; keys change with the course, so this bounds staleness
+# of details the key does not cover (e.g. the instructor's name)
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = config("TEMPLATE_FRAGMENT_CACHE_TIMEOUT", default=600, cast=int)
+
 # ============================================
 # Django REST Framework Configuration
 # ============================================
@@ -311,3 +408,14 @@ CELERY_TIMEZONE = TIME_ZONE
 # Change to False in production
 CELERY_TASK_ALWAYS_EAGER = True
 
+CELERY_BEAT_SCHEDULE = {
+    "rollup-search-queries": {
+        "task": "apps.courses.tasks.rollup_search_queries_task",
+        "schedule": crontab(hour=0, minute=15),
+    },
+    "archive-notifications": {
+        "task": "apps.notifications.tasks.archive_notifications_task",
+        "schedule": crontab(hour=0, minute=45),
+    },
+}
+
@@ -33,11 +33,17 @@ STATIC_ROOT = '/app/staticfiles/'
 # Cache configuration (Redis)
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://redis_cache:6379/1",
+        **CACHES["default"],
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        }
+            **CACHES["default"]["OPTIONS"],
+            "SHARED": {
+                "BACKEND": "django_redis.cache.RedisCache",
+                "LOCATION": "redis://redis_cache:6379/1",
+                "OPTIONS": {
+                    "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                }
+            },
+        },
     },
     "session_storage": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -48,6 +54,9 @@ CACHES = {
     }
 }
 
+# Notification stream events are relayed between web processes through Redis
+NOTIFICATION_STREAM_BROKER_URL = os.environ.get('NOTIFICATION_STREAM_BROKER_URL', 'redis://redis:6379/2')
+
 # Session configuration (Redis)
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "session_storage"
@@ -0,0 +1,160 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from DjangoProject.cache import STAMP_KEY_PREFIX, TieredCache, single_flight
+
+
+def make_cache(location="tiered-tests", **options):
+    """Caches built with the same location share one LocMemCache, like two workers sharing Redis"""
+    options.setdefault("STAMP_CHECK_INTERVAL", 0)
+    return TieredCache("", {
+        "OPTIONS": {
+            "SHARED": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": location},
+            **options,
+        },
+    })
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        make_cache().clear()
+
+    def test_reads_are_served_locally_after_first_hit(self):
+        cache = make_cache(LOCAL_TIMEOUT=60)
+        cache.set("greeting", "hello")
+        cache.shared.set("greeting", "changed behind our back")
+
+        self.assertEqual(cache.get("greeting"), "hello")
+        self.assertEqual(cache.stats()["local_hits"], 1)
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.get("missing", "default"), "default")
+
+    def test_writes_invalidate_other_processes(self):
+        worker_a = make_cache(LOCAL_TIMEOUT=60, COHERENT=True)
+        worker_b = make_cache(LOCAL_TIMEOUT=60, COHERENT=True)
+        worker_a.set("title", "v1")
+        self.assertEqual(worker_b.get("title"), "v1")
+
+        worker_a.set("title", "v2")
+        self.assertEqual(worker_b.get("title"), "v2")
+
+        worker_a.delete("title")
+        self.assertIsNone(worker_b.get("title"))
+
+    def test_stamp_is_rechecked_only_after_interval(self):
+        worker_a = make_cache(LOCAL_TIMEOUT=60, COHERENT=True)
+        worker_b = make_cache(LOCAL_TIMEOUT=60, COHERENT=True, STAMP_CHECK_INTERVAL=60)
+        worker_a.set("title", "v1")
+        self.assertEqual(worker_b.get("title"), "v1")
+
+        worker_a.set("title", "v2")
+        self.assertEqual(worker_b.get("title"), "v1")
+
+    def test_prefix_policies(self):
+        options = {
+            "LOCAL_TIMEOUT": 60,
+            "COHERENT": True,
+            "PREFIX_POLICIES": {
+                "immutable:": {"local_timeout": 60, "coherent": False},
+                "counter:": {"local_timeout": 0},
+            },
+        }
+        worker_a = make_cache(**options)
+        worker_b = make_cache(**options)
+
+        worker_a.set("counter:hits", 1)
+        worker_b.incr("counter:hits")
+        self.assertEqual(worker_a.get("counter:hits"), 2)
+
+        # Non-coherent writes do not bump the stamp of other prefixes
+        worker_a.set("plain", "kept")
+        self.assertEqual(worker_b.get("plain"), "kept")
+        worker_b.set("immutable:1", "x")
+        worker_b.shared.set("plain", "changed")
+        self.assertEqual(worker_b.get("plain"), "kept")
+
+        # Keys that are never held locally do not touch the shared stamp
+        self.assertIsNone(worker_a.shared.get(STAMP_KEY_PREFIX + "counter:"))
+
+        self.assertEqual(worker_b.policy_for("immutable:1")[0], "immutable:")
+        self.assertEqual(worker_b.policy_for("other")[0], "")
+
+    def test_default_policy_reads_shared_store_only(self):
+        cache = make_cache()
+        cache.set("plain", "v1")
+        cache.shared.set("plain", "v2")
+        self.assertEqual(cache.get("plain"), "v2")
+        self.assertEqual(len(cache.local), 0)
+        self.assertIsNone(cache.shared.get(STAMP_KEY_PREFIX))
+
+    def test_local_reads_return_copies(self):
+        cache = make_cache(LOCAL_TIMEOUT=60)
+        cache.set("items", [1])
+        cache.get("items").append(2)
+        self.assertEqual(cache.get("items"), [1])
+        self.assertIsNot(cache.get("items"), cache.get("items"))
+
+    def test_local_tier_respects_short_timeouts_and_size(self):
+        cache = make_cache(LOCAL_TIMEOUT=60, LOCAL_MAX_ENTRIES=2)
+        cache.set("short", "value", timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("short"))
+
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        self.assertEqual(len(cache.local), 2)
+        self.assertEqual(cache.get("a"), "a")
+
+    def test_add_and_get_many(self):
+        cache = make_cache()
+        self.assertTrue(cache.add("k", 1))
+        self.assertFalse(cache.add("k", 2))
+        cache.set_many({"x": 1, "y": 2})
+        self.assertEqual(cache.get_many(["k", "x", "y", "z"]), {"k": 1, "x": 1, "y": 2})
+        cache.delete_many(["x", "y"])
+        self.assertFalse(cache.has_key("x"))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = make_cache("single-flight-tests")
+        self.cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "expensive"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight("report", compute, cache=self.cache)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["expensive"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(self.cache.has_key("single-flight:report"))
+
+    def test_waits_for_lock_held_elsewhere(self):
+        self.cache.add("single-flight:report", 1, 30)
+
+        def finish_elsewhere():
+            time.sleep(0.1)
+            self.cache.set("report", "from other worker")
+
+        threading.Thread(target=finish_elsewhere).start()
+        value = single_flight("report", lambda: "computed here", cache=self.cache)
+        self.assertEqual(value, "from other worker")
+
+    def test_none_is_not_cached(self):
+        self.assertIsNone(single_flight("nothing", lambda: None, cache=self.cache))
+        self.assertFalse(self.cache.has_key("nothing"))
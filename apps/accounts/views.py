@@ -11,6 +11,7 @@ from django.utils.translation import gettext_lazy
 from django.views import View
 from django.http import HttpResponseRedirect
 from apps.courses.models import Course, Enrollment
+from apps.courses.services.progress_service import with_course_progress
 from apps.payments.models import Payment
 from .forms import UserRegistrationForm, UserUpdateForm, ProfileUpdateForm
 from apps.accounts.tasks import send_activation_email_task
@@ -138,10 +139,11 @@ def profile(request, sub_page=None):
     
     if user_role == 'student':
         # Student dashboard
-        enrollments = request.user.enrollments.all()
+        enrollments = with_course_progress(request.user.enrollments.select_related('course__instructor'))
         payments = Payment.objects.filter(user=request.user).order_by('-created_at')
         context['enrollments'] = enrollments
         context['payments'] = payments
+        context['certificates'] = request.user.certificates.select_related('course')
     elif user_role == 'instructor':
         # Instructor dashboard
         courses = Course.objects.filter(instructor=request.user)
@@ -159,10 +161,11 @@ def profile(request, sub_page=None):
         context['total_courses'] = total_courses
     else:
         # Default to student dashboard
-        enrollments = request.user.enrollments.all()
+        enrollments = with_course_progress(request.user.enrollments.select_related('course__instructor'))
         payments = Payment.objects.filter(user=request.user).order_by('-created_at')
         context['enrollments'] = enrollments
         context['payments'] = payments
+        context['certificates'] = request.user.certificates.select_related('course')
     
     template = 'accounts/user_dashboard.html'
     
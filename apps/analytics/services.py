@@ -1,37 +1,28 @@
 from django.db.models import Count, Sum
 from django.db.models.functions import TruncMonth, TruncDate
 from django.utils import timezone
-from apps.courses.models import Course, Enrollment, Progress, Lesson
+from apps.courses.models import Course, Enrollment
+from apps.courses.services.progress_service import with_course_progress
 from apps.payments.models import Payment
 
 def get_student_progress(user):
     """
     Returns progress for each course the student is enrolled in.
+    Reads the CourseProgress aggregates in a single query.
     """
-    enrollments = Enrollment.objects.filter(user=user).select_related('course')
-    data = []
+    enrollments = with_course_progress(
+        Enrollment.objects.filter(user=user).select_related('course')
+    )
 
-    for enrollment in enrollments:
-        course = enrollment.course
-        # Calculate progress using Progress model
-        total_lessons = Lesson.objects.filter(subsection__section__course=course).count()
-        completed_lessons = Progress.objects.filter(
-            user=user, 
-            lesson__section__course=course, 
-            completed=True
-        ).count()
-        
-        progress_percent = 0
-        if total_lessons > 0:
-            progress_percent = int((completed_lessons / total_lessons) * 100)
-            
-        data.append({
-            'course_title': course.title,
-            'progress_percent': progress_percent,
-            'total_lessons': total_lessons,
-            'completed_lessons': completed_lessons
-        })
-    return data
+    return [
+        {
+            'course_title': enrollment.course.title,
+            'progress_percent': int(enrollment.progress_percent),
+            'total_lessons': enrollment.total_lessons,
+            'completed_lessons': enrollment.completed_lessons
+        }
+        for enrollment in enrollments
+    ]
 
 def get_instructor_stats(user):
     """
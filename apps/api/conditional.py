@@ -0,0 +1,76 @@
+"""
+Conditional GET support for read-only API viewsets.
+
+Views describe their current state with a few cheap validators (row
+timestamps, content versions, counts), read in one small query. When the
+client's If-None-Match / If-Modified-Since still matches, the view answers
+304 Not Modified without loading or serializing the objects.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to list/retrieve and answers 304 when they match.
+
+    Subclasses implement get_list_validators() and get_object_validators(),
+    each returning (parts, last_modified) where parts is a sequence of values
+    that change whenever the response would, or None to skip the check.
+
+    Anonymous responses are marked public for CATALOG_API_CACHE_SECONDS so
+    nginx and CDNs can serve them; authenticated ones are private and must
+    be revalidated.
+    """
+
+    def get_list_validators(self):
+        return None
+
+    def get_object_validators(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, self.get_list_validators(), super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, self.get_object_validators(), super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, validators, view, *args, **kwargs):
+        etag = last_modified = None
+        if validators is not None:
+            parts, modified = validators
+            if request.user.is_authenticated:
+                parts = (*parts, "user", request.user.pk)
+            digest = hashlib.md5(repr((request.get_full_path(), *parts)).encode()).hexdigest()
+            etag = f'W/"{digest}"'
+            last_modified = int(modified.timestamp()) if modified else None
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                self._set_cache_headers(request, not_modified, etag, last_modified)
+                return not_modified
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_cache_headers(request, response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def latest(*timestamps):
+        """The newest of some possibly-null timestamps"""
+        return max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+
+    def _set_cache_headers(self, request, response, etag, last_modified):
+        if etag:
+            response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, "CATALOG_API_CACHE_SECONDS", 60))
+        patch_vary_headers(response, ("Authorization", "Cookie"))
@@ -2,7 +2,20 @@
 Pagination classes for LearnOnline API.
 """
 
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+import operator
+from functools import reduce
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -27,3 +40,178 @@ class SmallResultsSetPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 20
+
+
+class _CursorEncoder(json.JSONEncoder):
+    """Keeps full microsecond precision, unlike DjangoJSONEncoder"""
+
+    def default(self, o):
+        if hasattr(o, "isoformat"):
+            return o.isoformat()
+        return str(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the queryset's sort key.
+
+    The cursor is an opaque token holding the sort values of the last row
+    served (the primary key is always appended as a tie-breaker), so each
+    page is a single indexed range query with no OFFSET and no COUNT(*),
+    and rows inserted meanwhile never shift a page.
+
+    Views may opt into a total with `pagination_count`:
+    "cached" counts once per `count_timeout` seconds, "estimate" uses the
+    PostgreSQL planner's row estimate (cached count on other databases).
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    # Used when the queryset has no ordering of its own
+    ordering = ("-pk",)
+    count_timeout = 60
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_fields = self.get_ordering(queryset)
+        self.count = self.get_count(queryset, getattr(view, "pagination_count", None))
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+        ordering = [self._flip(field) for field in self.ordering_fields] if reverse else self.ordering_fields
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, cursor["position"]))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None and bool(rows)
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by)
+        if not ordering and queryset.query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) and field != "?" for field in ordering):
+            ordering = list(self.ordering)
+        pk_names = {"pk", queryset.model._meta.pk.name}
+        if not any(field.lstrip("-") in pk_names for field in ordering):
+            ordering.append("-pk" if ordering[-1].startswith("-") else "pk")
+        return ordering
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """Rows after `position` in `ordering`: (a > x) or (a = x and b > y) or ..."""
+        steps = []
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{field.lstrip('-')}__{lookup}": position[index]})
+            for previous, value in zip(ordering[:index], position):
+                step &= Q(**{previous.lstrip("-"): value})
+            steps.append(step)
+        return reduce(operator.or_, steps)
+
+    def position_of(self, row):
+        values = []
+        for field in self.ordering_fields:
+            value = row
+            for part in field.lstrip("-").split("__"):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        payload = json.dumps({"p": self.position_of(row), "r": int(reverse)}, cls=_CursorEncoder)
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            position, reverse = payload["p"], bool(payload["r"])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering_fields):
+            raise NotFound(self.invalid_cursor_message)
+        return {"position": position, "reverse": reverse}
+
+    def get_count(self, queryset, mode):
+        if not mode:
+            return None
+        queryset = queryset.order_by()
+        sql, params = queryset.query.sql_with_params()
+        if mode == "estimate" and connections[queryset.db].vendor == "postgresql":
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return plan[0]["Plan"]["Plan Rows"]
+
+        key = "pagination:count:" + hashlib.md5(f"{sql}{params!r}".encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1], reverse=False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.page[0], reverse=True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.count is not None:
+            response["count"] = self.count
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer", "description": "Only for views that opt in"},
+                "results": schema,
+            },
+        }
+
+
+class StandardCursorPagination(KeysetPagination):
+    """Cursor pagination for large or fast-growing lists."""
+
+    page_size = 10
+
+
+class LargeCursorPagination(KeysetPagination):
+    """Larger cursor pagination for list views."""
+
+    page_size = 25
@@ -42,16 +42,18 @@ class IsEnrolled(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        # Get the course from the object (lesson -> section -> course)
-        if hasattr(obj, 'section'):
-            course = obj.section.course
+        # Get the course from the object (lesson -> subsection -> section -> course)
+        if hasattr(obj, 'subsection'):
+            course_id = obj.subsection.section.course_id
+        elif hasattr(obj, 'section'):
+            course_id = obj.section.course_id
         elif hasattr(obj, 'course'):
-            course = obj.course
+            course_id = obj.course_id
         else:
             return False
 
         return Enrollment.objects.filter(
-            user=request.user, course=course
+            user=request.user, course_id=course_id
         ).exists()
 
 
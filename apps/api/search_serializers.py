@@ -6,6 +6,7 @@ Handles serialization of search results with relevance highlighting.
 from rest_framework import serializers
 
 from apps.courses.models import Course, Lesson
+from apps.courses.services.stats_service import get_stats_for_course
 
 
 class SearchCourseSerializer(serializers.ModelSerializer):
@@ -38,7 +39,7 @@ class SearchCourseSerializer(serializers.ModelSerializer):
         return f"{obj.instructor.first_name} {obj.instructor.last_name}".strip() or obj.instructor.username
 
     def get_enrollment_count(self, obj):
-        return obj.enrollments.count()
+        return get_stats_for_course(obj).enrollment_count
 
     def get_is_free(self, obj):
         return obj.price == 0
@@ -47,9 +48,9 @@ class SearchCourseSerializer(serializers.ModelSerializer):
 class SearchLessonSerializer(serializers.ModelSerializer):
     """Serializer for lesson search results."""
 
-    course_title = serializers.CharField(source="section.course.title", read_only=True)
-    course_slug = serializers.CharField(source="section.course.slug", read_only=True)
-    section_title = serializers.CharField(source="section.title", read_only=True)
+    course_title = serializers.CharField(source="subsection.section.course.title", read_only=True)
+    course_slug = serializers.CharField(source="subsection.section.course.slug", read_only=True)
+    section_title = serializers.CharField(source="subsection.section.title", read_only=True)
     relevance_score = serializers.FloatField(read_only=True, required=False)
 
     class Meta:
@@ -137,6 +138,6 @@ class AutocompleteSuggestionSerializer(serializers.Serializer):
     """Serializer for autocomplete suggestion results."""
 
     text = serializers.CharField()
-    type = serializers.CharField()  # 'course', 'category', 'instructor'
-    id = serializers.IntegerField()
+    type = serializers.CharField()  # 'course', 'category', 'instructor', 'query'
+    id = serializers.IntegerField(allow_null=True)
     url = serializers.CharField(required=False)
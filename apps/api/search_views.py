@@ -3,7 +3,7 @@ Search views for LearnOnline API.
 Provides full-text search for courses and lessons with filtering and autocomplete.
 """
 
-from django.db.models import Q, F, Value, FloatField, Case, When, Count
+from django.db.models.functions import Coalesce
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -19,19 +19,29 @@ from .search_serializers import (
     AutocompleteSerializer,
     AutocompleteSuggestionSerializer,
 )
-from .pagination import StandardResultsSetPagination
+from .pagination import StandardCursorPagination
 
 
 from apps.courses.services.search_service import log_search_query, get_popular_search_terms
+from apps.courses.services.autocomplete_service import get_suggestions
+from apps.courses.services.search_index import (
+    annotate_relevance,
+    search_categories,
+    search_courses,
+    search_lessons,
+)
+
 
 class SearchCoursesView(APIView):
     """
     Search courses by title, description, or instructor name.
-    Supports filtering by category, price range, and sorting options.
+    Matching and ranking go through the configured search backend;
+    filters and sorting are applied to the matched courses.
     """
 
     permission_classes = [AllowAny]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = StandardCursorPagination
+    pagination_count = "estimate"
 
     @extend_schema(
         parameters=[
@@ -59,23 +69,9 @@ class SearchCoursesView(APIView):
         # Log search query
         log_search_query(query, request.user if request.user.is_authenticated else None)
 
-        # Build search query
+        # Apply filters
         queryset = Course.objects.filter(is_active=True)
 
-
-        # Full-text search across multiple fields
-        search_query = (
-            Q(title__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(description__icontains=query) |
-            Q(instructor__username__icontains=query) |
-            Q(instructor__first_name__icontains=query) |
-            Q(instructor__last_name__icontains=query) |
-            Q(category__name__icontains=query)
-        )
-        queryset = queryset.filter(search_query)
-
-        # Apply filters
         if filters.get("category"):
             queryset = queryset.filter(category_id=filters["category"])
 
@@ -91,12 +87,15 @@ class SearchCoursesView(APIView):
         if filters.get("instructor"):
             queryset = queryset.filter(instructor_id=filters["instructor"])
 
-        # Calculate relevance score and apply ordering
-        queryset = self._apply_relevance_and_ordering(queryset, query, filters.get("ordering", "relevance"))
+        # Match and score the filtered courses through the search index
+        queryset = annotate_relevance(queryset, search_courses(query, candidates=queryset))
+
+        queryset = self._apply_ordering(queryset, filters.get("ordering", "relevance"))
+        queryset = queryset.select_related("instructor", "category", "stats")
 
         # Pagination
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(queryset, request)
+        page = paginator.paginate_queryset(queryset, request, view=self)
 
         if page is not None:
             serializer = SearchCourseSerializer(page, many=True)
@@ -105,32 +104,11 @@ class SearchCoursesView(APIView):
         serializer = SearchCourseSerializer(queryset, many=True)
         return Response(serializer.data)
 
-    def _apply_relevance_and_ordering(self, queryset, query, ordering):
-        """Apply relevance scoring and ordering to queryset."""
-
-        # Simple relevance scoring based on field matches
-        queryset = queryset.annotate(
-            title_match=Case(
-                When(title__iexact=query, then=Value(10.0)),
-                When(title__istartswith=query, then=Value(5.0)),
-                When(title__icontains=query, then=Value(3.0)),
-                default=Value(0.0),
-                output_field=FloatField(),
-            ),
-            desc_match=Case(
-                When(short_description__icontains=query, then=Value(2.0)),
-                When(description__icontains=query, then=Value(1.0)),
-                default=Value(0.0),
-                output_field=FloatField(),
-            ),
-            enrollment_count=Count("enrollments"),
-        ).annotate(
-            relevance_score=F("title_match") + F("desc_match")
-        )
-
-        # Apply ordering
+    def _apply_ordering(self, queryset, ordering):
+        """Apply ordering to queryset already annotated with relevance_score."""
+
         if ordering == "relevance":
-            queryset = queryset.order_by("-relevance_score", "-enrollment_count", "-created_at")
+            queryset = queryset.order_by("-relevance_score", "-created_at")
         elif ordering == "newest":
             queryset = queryset.order_by("-created_at")
         elif ordering == "oldest":
@@ -140,7 +118,10 @@ class SearchCoursesView(APIView):
         elif ordering == "price_high":
             queryset = queryset.order_by("-price", "-relevance_score")
         elif ordering == "popular":
-            queryset = queryset.order_by("-enrollment_count", "-relevance_score")
+            # Courses without stats yet sort as unenrolled; the cursor needs a non-null key
+            queryset = queryset.annotate(
+                popularity=Coalesce("stats__enrollment_count", 0)
+            ).order_by("-popularity", "-relevance_score")
 
         return queryset
 
@@ -152,7 +133,8 @@ class SearchLessonsView(APIView):
     """
 
     permission_classes = [AllowAny]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = StandardCursorPagination
+    pagination_count = "estimate"
 
     @extend_schema(
         parameters=[
@@ -173,42 +155,28 @@ class SearchLessonsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build search query
+        # Apply filters
         queryset = Lesson.objects.filter(is_published=True)
 
-        search_query = (
-            Q(title__icontains=query) |
-            Q(content__icontains=query)
-        )
-        queryset = queryset.filter(search_query)
-
-        # Apply filters
         course_slug = request.query_params.get("course")
         if course_slug:
-            queryset = queryset.filter(section__course__slug=course_slug)
+            queryset = queryset.filter(subsection__section__course__slug=course_slug)
 
         lesson_type = request.query_params.get("lesson_type")
         if lesson_type in ["text", "video", "quiz"]:
             queryset = queryset.filter(lesson_type=lesson_type)
 
-        # Annotate with relevance score
-        queryset = queryset.annotate(
-            relevance_score=Case(
-                When(title__iexact=query, then=Value(10.0)),
-                When(title__istartswith=query, then=Value(5.0)),
-                When(title__icontains=query, then=Value(3.0)),
-                When(content__icontains=query, then=Value(1.0)),
-                default=Value(0.0),
-                output_field=FloatField(),
-            )
-        ).order_by("-relevance_score", "order")
+        # Match and score the filtered lessons through the search index
+        queryset = annotate_relevance(queryset, search_lessons(query, candidates=queryset))
+
+        queryset = queryset.order_by("-relevance_score", "order")
 
         # Select related for efficiency
-        queryset = queryset.select_related("section", "section__course")
+        queryset = queryset.select_related("subsection__section__course")
 
         # Pagination
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(queryset, request)
+        page = paginator.paginate_queryset(queryset, request, view=self)
 
         if page is not None:
             serializer = SearchLessonSerializer(page, many=True)
@@ -221,7 +189,7 @@ class SearchLessonsView(APIView):
 class AutocompleteView(APIView):
     """
     Provide autocomplete suggestions for search queries.
-    Returns suggestions from courses, categories, and instructors.
+    Returns suggestions from courses, categories, instructors and popular queries.
     """
 
     permission_classes = [AllowAny]
@@ -240,39 +208,11 @@ class AutocompleteView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        query = serializer.validated_data["q"].strip().lower()
+        query = serializer.validated_data["q"]
         limit = serializer.validated_data.get("limit", 5)
 
-        suggestions = []
-
-        # Course suggestions
-        courses = Course.objects.filter(
-            is_active=True,
-            title__icontains=query
-        ).values("id", "title", "slug")[:limit]
-
-        for course in courses:
-            suggestions.append({
-                "text": course["title"],
-                "type": "course",
-                "id": course["id"],
-                "url": f"/courses/{course['slug']}/"
-            })
-
-        # Category suggestions
-        if len(suggestions) < limit:
-            remaining = limit - len(suggestions)
-            categories = Category.objects.filter(
-                name__icontains=query
-            ).values("id", "name")[:remaining]
-
-            for category in categories:
-                suggestions.append({
-                    "text": category["name"],
-                    "type": "category",
-                    "id": category["id"],
-                    "url": f"/courses/?category={category['id']}"
-                })
+        # Answered from the per-worker in-memory index
+        suggestions = get_suggestions(query, limit)
 
         return Response(suggestions)
 
@@ -309,29 +249,25 @@ class SearchGlobalView(APIView):
         }
 
         # Search courses (limit 5)
-        courses = Course.objects.filter(
-            is_active=True
-        ).filter(
-            Q(title__icontains=query) |
-            Q(short_description__icontains=query)
-        ).select_related("instructor", "category")[:5]
+        active_courses = Course.objects.filter(is_active=True)
+        courses = annotate_relevance(
+            active_courses, search_courses(query, candidates=active_courses)
+        ).select_related("instructor", "category", "stats").order_by("-relevance_score", "-created_at")[:5]
 
         results["courses"] = SearchCourseSerializer(courses, many=True).data
 
         # Search lessons (limit 5)
-        lessons = Lesson.objects.filter(
-            is_published=True
-        ).filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query)
-        ).select_related("section", "section__course")[:5]
+        published_lessons = Lesson.objects.filter(is_published=True)
+        lessons = annotate_relevance(
+            published_lessons, search_lessons(query, candidates=published_lessons)
+        ).select_related("subsection__section__course").order_by("-relevance_score", "order")[:5]
 
         results["lessons"] = SearchLessonSerializer(lessons, many=True).data
 
         # Search categories (limit 3)
-        categories = Category.objects.filter(
-            name__icontains=query
-        )[:3]
+        categories = annotate_relevance(
+            Category.objects.all(), search_categories(query, limit=3)
+        ).order_by("-relevance_score", "name")
 
         results["categories"] = [
             {"id": cat.id, "name": cat.name, "description": cat.description}
@@ -24,6 +24,8 @@ from apps.courses.models import (
     QuizAttempt,
     UserAnswer,
 )
+from apps.courses.services.outline_service import get_course_outline
+from apps.courses.services.stats_service import get_stats_for_category, get_stats_for_course
 from apps.discussions.models import Discussion, Reply, Vote
 
 
@@ -144,7 +146,7 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
     def get_course_count(self, obj):
-        return obj.courses.count()
+        return get_stats_for_category(obj).course_count
 
 
 class InstructorSerializer(serializers.ModelSerializer):
@@ -181,7 +183,7 @@ class CourseListSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "slug", "created_at"]
 
     def get_enrollment_count(self, obj):
-        return obj.enrollments.count()
+        return get_stats_for_course(obj).enrollment_count
 
     def get_is_free(self, obj):
         """Course is free if price is 0."""
@@ -209,7 +211,7 @@ class LessonSerializer(serializers.ModelSerializer):
 class SectionSerializer(serializers.ModelSerializer):
     """Serializer for Section model (formerly Module)"""
 
-    lessons = LessonSerializer(many=True, read_only=True)
+    lessons = serializers.SerializerMethodField()
     lesson_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -225,8 +227,41 @@ class SectionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id"]
 
+    def _lessons(self, obj):
+        # Lessons live in subsections; prefetch "subsections__lessons" to avoid per-section queries
+        return [lesson for subsection in obj.subsections.all() for lesson in subsection.lessons.all()]
+
+    def get_lessons(self, obj):
+        return LessonSerializer(self._lessons(obj), many=True).data
+
     def get_lesson_count(self, obj):
-        return obj.lessons.count()
+        if hasattr(obj, "lesson_count"):
+            return obj.lesson_count
+        return len(self._lessons(obj))
+
+
+class OutlineLessonSerializer(serializers.Serializer):
+    """Serializer for a LessonOutline (lesson without its body)"""
+
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    slug = serializers.CharField()
+    lesson_type = serializers.CharField()
+    video_url = serializers.URLField(allow_null=True)
+    video_duration = serializers.DurationField(allow_null=True)
+    order = serializers.IntegerField()
+
+
+class OutlineSectionSerializer(serializers.Serializer):
+    """Serializer for a SectionOutline, same shape as SectionSerializer"""
+
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    description = serializers.CharField()
+    order = serializers.IntegerField()
+    duration_days = serializers.IntegerField()
+    lessons = OutlineLessonSerializer(many=True)
+    lesson_count = serializers.IntegerField()
 
 
 class CourseDetailSerializer(serializers.ModelSerializer):
@@ -234,7 +269,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
 
     instructor = InstructorSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
-    sections = SectionSerializer(many=True, read_only=True)
+    sections = serializers.SerializerMethodField()
     enrollment_count = serializers.SerializerMethodField()
     is_enrolled = serializers.SerializerMethodField()
     is_free = serializers.SerializerMethodField()
@@ -263,8 +298,12 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "slug", "created_at", "updated_at"]
 
+    def get_sections(self, obj):
+        # The cached outline replaces a sections/subsections/lessons prefetch
+        return OutlineSectionSerializer(get_course_outline(obj).sections, many=True).data
+
     def get_enrollment_count(self, obj):
-        return obj.enrollments.count()
+        return get_stats_for_course(obj).enrollment_count
 
     def get_is_enrolled(self, obj):
         request = self.context.get("request")
@@ -398,7 +437,20 @@ class DiscussionAuthorSerializer(serializers.Serializer):
     avatar = serializers.ImageField(source='profile.profile_picture', read_only=True, allow_null=True)
 
 
-class ReplySerializer(serializers.ModelSerializer):
+class ScoredUpdateMixin:
+    """
+    Save only the fields a request changed. score is maintained by votes with
+    queryset updates, so a full save() could write back a stale value.
+    """
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class ReplySerializer(ScoredUpdateMixin, serializers.ModelSerializer):
     author = DiscussionAuthorSerializer(read_only=True)
     is_author = serializers.SerializerMethodField()
     vote_count = serializers.SerializerMethodField()
@@ -406,29 +458,29 @@ class ReplySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Reply
-        fields = ['id', 'discussion', 'author', 'parent', 'body', 'created_at', 'updated_at', 'is_answer', 'is_author', 'vote_count', 'user_vote']
-        read_only_fields = ['discussion', 'created_at', 'updated_at', 'is_answer']
+        fields = ['id', 'discussion', 'author', 'parent', 'depth', 'body', 'created_at', 'updated_at', 'is_answer', 'is_author', 'vote_count', 'user_vote']
+        read_only_fields = ['discussion', 'depth', 'created_at', 'updated_at', 'is_answer']
 
     def get_is_author(self, obj):
         request = self.context.get('request')
-        return request and request.user == obj.author
+        return request and request.user.pk == obj.author_id
 
     def get_vote_count(self, obj):
-        return obj.votes.filter(vote_type=1).count() - obj.votes.filter(vote_type=-1).count()
+        return obj.score
 
     def get_user_vote(self, obj):
+        # Annotated by the viewsets; fall back to a lookup for freshly created objects
+        if hasattr(obj, 'user_vote'):
+            return obj.user_vote
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                vote = obj.votes.filter(user=request.user).first()
-                if vote:
-                    return vote.vote_type
-            except:
-                pass
+            vote = obj.votes.filter(user=request.user).values_list('vote_type', flat=True).first()
+            if vote:
+                return vote
         return 0
 
 
-class DiscussionSerializer(serializers.ModelSerializer):
+class DiscussionSerializer(ScoredUpdateMixin, serializers.ModelSerializer):
     author = DiscussionAuthorSerializer(read_only=True)
     replies = ReplySerializer(many=True, read_only=True)
     reply_count = serializers.IntegerField(read_only=True)
@@ -443,20 +495,20 @@ class DiscussionSerializer(serializers.ModelSerializer):
 
     def get_is_author(self, obj):
         request = self.context.get('request')
-        return request and request.user == obj.author
+        return request and request.user.pk == obj.author_id
 
     def get_vote_count(self, obj):
-        return obj.votes.filter(vote_type=1).count() - obj.votes.filter(vote_type=-1).count()
+        return obj.score
 
     def get_user_vote(self, obj):
+        # Annotated by the viewsets; fall back to a lookup for freshly created objects
+        if hasattr(obj, 'user_vote'):
+            return obj.user_vote
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                vote = obj.votes.filter(user=request.user).first()
-                if vote:
-                    return vote.vote_type
-            except:
-                pass
+            vote = obj.votes.filter(user=request.user).values_list('vote_type', flat=True).first()
+            if vote:
+                return vote
         return 0
 
 
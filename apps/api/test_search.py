@@ -3,11 +3,13 @@ Tests for Search API endpoints.
 """
 
 from django.contrib.auth.models import User
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from apps.courses.models import Category, Course, Section, Lesson
+from apps.courses.models import Category, Course, Section, Subsection, Lesson
+from apps.courses.services.autocomplete_service import reset_autocomplete_index
 
 
 class SearchCoursesAPITestCase(APITestCase):
@@ -103,6 +105,33 @@ class SearchCoursesAPITestCase(APITestCase):
         for course in response.data['results']:
             self.assertEqual(course['category_name'], 'Programming')
 
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_filters_apply_before_the_result_cap(self):
+        """Filtered matches are found even when more than the cap match the text."""
+        for n in range(3):
+            Course.objects.create(
+                title=f'Python Projects {n}', slug=f'python-projects-{n}', instructor=self.instructor,
+                category=self.category1, is_active=True,
+            )
+        Course.objects.create(
+            title='Design Automation', slug='design-automation', description='Scripting tools in python',
+            instructor=self.instructor, category=self.category2, is_active=True,
+        )
+
+        response = self.client.get(self.search_url, {'q': 'python', 'category': self.category2.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([course['title'] for course in response.data['results']], ['Design Automation'])
+
+    def test_search_courses_reports_estimated_count(self):
+        """The view opts into a total, which stays the same on every page."""
+        response = self.client.get(self.search_url, {'q': 'John', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual((response.data['count'], len(response.data['results'])), (3, 1))
+
     def test_search_courses_filter_free(self):
         """Test filtering free courses."""
         response = self.client.get(self.search_url, {
@@ -212,6 +241,30 @@ class SearchLessonsAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class SearchLessonsCountTestCase(APITestCase):
+    """The lesson search reports an estimated total."""
+
+    def setUp(self):
+        instructor = User.objects.create_user(username='instructor', password='InstructorPass123!')
+        course = Course.objects.create(
+            title='Python Course', slug='python-course', instructor=instructor,
+            category=Category.objects.create(name='Programming'),
+        )
+        subsection = Subsection.objects.create(
+            section=Section.objects.create(course=course, title='Getting Started', order=1),
+            title='Basics', order=1,
+        )
+        for n in range(3):
+            Lesson.objects.create(subsection=subsection, title=f'Python lesson {n}', order=n)
+        Lesson.objects.create(subsection=subsection, title='Python draft', order=9, is_published=False)
+
+    def test_search_lessons_reports_estimated_count(self):
+        response = self.client.get(reverse('search-lessons'), {'q': 'python', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+
+
 class AutocompleteAPITestCase(APITestCase):
     """Test cases for autocomplete endpoint."""
 
@@ -219,6 +272,7 @@ class AutocompleteAPITestCase(APITestCase):
         """Set up test data."""
         self.client = APIClient()
         self.autocomplete_url = reverse('search-autocomplete')
+        reset_autocomplete_index()
 
         self.instructor = User.objects.create_user(
             username='instructor',
@@ -326,10 +380,12 @@ class PopularSearchTermsTests(APITestCase):
         self.url = reverse('search-popular')
         
         # Create some search history
-        from apps.courses.services.search_service import log_search_query
+        from apps.courses.services.search_service import flush_search_log, log_search_query, search_log_buffer
+        search_log_buffer.clear()
         log_search_query("python", self.user)
         log_search_query("python", self.user)
         log_search_query("django", self.user)
+        flush_search_log()
 
     def test_get_popular_terms(self):
         """Test retrieving popular search terms"""
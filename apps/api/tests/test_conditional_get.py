@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from apps.courses.models import Category, Course, Enrollment, Lesson, Section, Subsection
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.instructor = User.objects.create_user(username='instructor', password='pass')
+        self.student = User.objects.create_user(username='student', password='pass')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category, is_active=True
+        )
+        section = Section.objects.create(course=self.course, title='Basics', order=1)
+        subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        self.lesson = Lesson.objects.create(subsection=subsection, title='Hello', content='Body')
+        self.detail_url = reverse('course-detail', kwargs={'slug': 'python'})
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_course_is_not_reserialized(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.revalidate(self.detail_url, response)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        not_modified = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_course_and_outline_edits_change_validators(self):
+        response = self.client.get(self.detail_url)
+
+        self.lesson.title = 'Hello again'
+        self.lesson.save()
+        changed = self.revalidate(self.detail_url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['sections'][0]['lessons'][0]['title'], 'Hello again')
+
+        Course.objects.get(pk=self.course.pk).save()
+        self.assertEqual(self.revalidate(self.detail_url, changed).status_code, 200)
+
+    def test_catalog_list_tracks_enrollments_and_categories(self):
+        url = reverse('course-list')
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        Enrollment.objects.create(user=self.student, course=self.course)
+        response_after_enroll = self.revalidate(url, response)
+        self.assertEqual(response_after_enroll.status_code, 200)
+        self.assertEqual(response_after_enroll.data['results'][0]['enrollment_count'], 1)
+
+        self.category.name = 'Software'
+        self.category.save()
+        self.assertEqual(self.revalidate(url, response_after_enroll).status_code, 200)
+
+        categories = reverse('category-list')
+        response = self.client.get(categories)
+        self.assertEqual(self.revalidate(categories, response).status_code, 304)
+        Category.objects.create(name='Design')
+        self.assertEqual(self.revalidate(categories, response).status_code, 200)
+
+    def test_authenticated_responses_are_private_and_track_enrollment(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.detail_url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.revalidate(self.detail_url, response).status_code, 304)
+
+        Enrollment.objects.create(user=self.student, course=self.course)
+        changed = self.revalidate(self.detail_url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertTrue(changed.data['is_enrolled'])
+
+    def test_sections(self):
+        url = reverse('course-sections', kwargs={'course_slug': 'python'})
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        self.lesson.content = 'Changed'
+        self.lesson.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        self.assertEqual(self.client.get(reverse('course-detail', kwargs={'slug': 'missing'})).status_code, 404)
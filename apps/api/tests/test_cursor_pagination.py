@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from apps.courses.models import Category, Course, Enrollment
+from apps.notifications.models import Notification
+
+
+class CursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.instructor = User.objects.create_user(username='instructor', password='pass')
+        self.student = User.objects.create_user(username='student', password='pass')
+        category = Category.objects.create(name='Programming')
+        self.courses = [
+            Course.objects.create(
+                title=f'Python {n}', slug=f'python-{n}', instructor=self.instructor, category=category,
+                price=n % 4, is_active=True,
+            )
+            for n in range(23)
+        ]
+        for course in self.courses:
+            Enrollment.objects.create(user=self.student, course=course)
+        self.client.force_authenticate(self.student)
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_enrollments_are_paged_by_cursor(self):
+        pages = self.walk(reverse('enrollment-list'))
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 3])
+        slugs = [row['course']['slug'] for page in pages for row in page['results']]
+        self.assertEqual(slugs, [f'python-{n}' for n in reversed(range(23))])
+        self.assertEqual({page['count'] for page in pages}, {23})
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+
+    def test_later_pages_skip_offset_and_count(self):
+        first = self.client.get(reverse('enrollment-list')).data
+        # A new row at the head does not shift the next page
+        Enrollment.objects.filter(course=self.courses[0]).delete()
+        Enrollment.objects.create(user=self.student, course=self.courses[0])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first['next']).data
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+        self.assertEqual(second['results'][0]['course']['slug'], 'python-12')
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('enrollment-list'), {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_search_pages_follow_requested_ordering(self):
+        pages = self.walk(reverse('search-courses') + '?q=python&ordering=price_low&page_size=7')
+        prices = [float(row['price']) for page in pages for row in page['results']]
+        self.assertEqual(len(prices), 23)
+        self.assertEqual(prices, sorted(prices))
+
+    def test_notifications_api_has_no_count(self):
+        for n in range(12):
+            Notification.objects.create(recipient=self.student, title=f'N{n}', message='x')
+        pages = self.walk(reverse('notifications:api_list'))
+        self.assertEqual([len(page['results']) for page in pages], [10, 2])
+        self.assertNotIn('count', pages[0])
+        self.assertEqual(pages[0]['results'][0]['title'], 'N11')
+
@@ -17,6 +17,7 @@ from ..serializers import (
     ProfileSerializer, CourseListSerializer, EnrollmentSerializer,
     CertificateSerializer, InstructorInviteSerializer
 )
+from ..pagination import LargeCursorPagination
 from ..permissions import IsSchoolAdmin
 
 
@@ -167,7 +168,7 @@ class SchoolAdminCoursesView(_SchoolScopedMixin, generics.ListAPIView):
     def get_queryset(self):
         school_id = self.kwargs.get('school_id')
         school = self._get_and_validate_school(self.request, school_id)
-        return Course.objects.select_related('instructor', 'category') \
+        return Course.objects.select_related('instructor', 'category__stats', 'stats') \
             .filter(instructor__profile__school=school)
 
 
@@ -178,12 +179,17 @@ class SchoolAdminEnrollmentsView(_SchoolScopedMixin, generics.ListAPIView):
     """
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated, IsSchoolAdmin]
+    pagination_class = LargeCursorPagination
+    pagination_count = "cached"
 
     def get_queryset(self):
         school_id = self.kwargs.get('school_id')
         school = self._get_and_validate_school(self.request, school_id)
-        return Enrollment.objects.select_related('course__instructor', 'course__category', 'user') \
-            .filter(course__instructor__profile__school=school)
+        return Enrollment.objects.select_related(
+            'course__instructor', 'course__category__stats', 'course__stats', 'user'
+        ) \
+            .filter(course__instructor__profile__school=school) \
+            .order_by('-enrolled_at')
 
 
 class SchoolAdminCertificatesView(_SchoolScopedMixin, generics.ListAPIView):
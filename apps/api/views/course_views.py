@@ -3,32 +3,58 @@ Course API Views.
 Contains views for categories, courses, sections, and lessons.
 """
 
-from django.shortcuts import get_object_or_404
+from django.db.models import Count, Exists, Max, OuterRef
+from django.http import Http404
 from rest_framework import viewsets, generics, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 
 from apps.courses.models import Category, Course, Section, Lesson, Enrollment
+from apps.courses.services.content_cache import get_cached_lesson
 from ..serializers import (
     CategorySerializer, CourseListSerializer, CourseDetailSerializer,
     SectionSerializer, LessonSerializer, EnrollmentSerializer
 )
+from ..conditional import ConditionalGetMixin
 from ..permissions import IsEnrolled
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+def _sections_with_lessons():
+    """Sections with their lessons prefetched and lesson_count annotated for SectionSerializer."""
+    return Section.objects.annotate(
+        lesson_count=Count('subsections__lessons')
+    ).prefetch_related('subsections__lessons').order_by('order')
+
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for categories (read-only).
     GET /api/categories/
     GET /api/categories/{id}/
     """
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('stats')
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
+    def get_list_validators(self):
+        state = Category.objects.aggregate(
+            count=Count('pk'), updated=Max('updated_at'), stats=Max('stats__updated_at')
+        )
+        return tuple(state.values()), self.latest(state['updated'], state['stats'])
+
+    def get_object_validators(self):
+        try:
+            state = Category.objects.filter(pk=self.kwargs['pk']) \
+                .values_list('updated_at', 'stats__updated_at').first()
+        except (TypeError, ValueError):
+            return None
+        if state is None:
+            return None
+        return state, self.latest(*state)
+
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for courses (read-only for public, enrollable for authenticated).
     GET /api/courses/
@@ -36,8 +62,8 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
     POST /api/courses/{slug}/enroll/
     """
     queryset = Course.objects.select_related(
-        'instructor', 'category'
-    ).prefetch_related('sections__lessons')
+        'instructor', 'category__stats', 'stats'
+    )
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
 
@@ -57,7 +83,10 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
         # Filter by price
         is_free = self.request.query_params.get('is_free')
         if is_free is not None:
-            queryset = queryset.filter(is_free=is_free.lower() == 'true')
+            if is_free.lower() == 'true':
+                queryset = queryset.filter(price=0)
+            else:
+                queryset = queryset.filter(price__gt=0)
         
         # Search by title
         search = self.request.query_params.get('search')
@@ -66,6 +95,29 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
+    # Everything the course serializers read, as timestamps and versions
+    VALIDATOR_FIELDS = ('updated_at', 'stats__updated_at', 'category__updated_at', 'category__stats__updated_at')
+
+    def get_list_validators(self):
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            count=Count('pk'), **{field: Max(field) for field in self.VALIDATOR_FIELDS}
+        )
+        return tuple(state.values()), self.latest(*(state[field] for field in self.VALIDATOR_FIELDS))
+
+    def get_object_validators(self):
+        courses = Course.objects.filter(slug=self.kwargs['slug'])
+        fields = ('stats__content_version', *self.VALIDATOR_FIELDS)
+        if self.request.user.is_authenticated:
+            # is_enrolled is part of the detail response
+            courses = courses.annotate(enrolled=Exists(
+                Enrollment.objects.filter(course=OuterRef('pk'), user=self.request.user)
+            ))
+            fields += ('enrolled',)
+        state = courses.values_list(*fields).first()
+        if state is None:
+            return None
+        return state, self.latest(*state[1:len(self.VALIDATOR_FIELDS) + 1])
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def enroll(self, request, slug=None):
         """Enroll current user in this course."""
@@ -92,7 +144,7 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class SectionViewSet(viewsets.ReadOnlyModelViewSet):
+class SectionViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for sections (formerly modules).
     GET /api/courses/{course_slug}/sections/
@@ -103,7 +155,17 @@ class SectionViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         course_slug = self.kwargs.get('course_slug')
-        return Section.objects.filter(course__slug=course_slug).prefetch_related('lessons')
+        return _sections_with_lessons().filter(course__slug=course_slug)
+
+    def get_list_validators(self):
+        # Any section, subsection or lesson edit bumps the course content version
+        state = Course.objects.filter(slug=self.kwargs.get('course_slug')) \
+            .values_list('stats__content_version', 'updated_at').first()
+        if state is None:
+            return None
+        return state, state[1]
+
+    get_object_validators = get_list_validators
 
 
 class LessonDetailView(generics.RetrieveAPIView):
@@ -118,7 +180,9 @@ class LessonDetailView(generics.RetrieveAPIView):
         return Lesson.objects.select_related('subsection__section__course')
 
     def get_object(self):
-        queryset = self.get_queryset()
-        obj = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        # Lesson bodies are served from the course content cache
+        course, obj = get_cached_lesson(self.kwargs['pk'])
+        if obj is None:
+            raise Http404("No Lesson matches the given query.")
         self.check_object_permissions(self.request, obj)
         return obj
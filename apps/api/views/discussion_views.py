@@ -12,11 +12,38 @@ from rest_framework import status
 from django.db.models import Count, Prefetch
 
 from apps.courses.models import Course, Enrollment
-from apps.discussions.models import Discussion, Reply, Vote
+from apps.discussions.models import Discussion, Reply
+from apps.discussions.services import (
+    REPLY_CHILDREN_PER_NODE, REPLY_PAGE_SIZE, REPLY_TREE_DEPTH,
+    cast_vote, load_reply_children, load_reply_tree, with_user_vote
+)
 from apps.notifications.services import create_notification
 from ..serializers import DiscussionSerializer, ReplySerializer, VoteSerializer
 
 
+def _bounded_param(request, name, default, maximum):
+    """Read a non-negative integer query parameter, clamped to maximum"""
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return max(0, min(value, maximum))
+
+
+def _reply_tree_data(page, request):
+    """Serialize a ReplyPage into nested reply dicts with their continuation cursors"""
+    def serialize(node):
+        data = ReplySerializer(node.reply, context={'request': request}).data
+        data['children'] = [serialize(child) for child in node.children]
+        data['more_children_after'] = node.more_children_after
+        return data
+
+    return {
+        'results': [serialize(node) for node in page.nodes],
+        'next_after': page.next_after,
+    }
+
+
 class IsEnrolledOrInstructor(permissions.BasePermission):
     """Permission class to check if user is enrolled or is the instructor."""
     def has_object_permission(self, request, view, obj):
@@ -41,6 +68,7 @@ class DiscussionViewSet(viewsets.ModelViewSet):
     ViewSet for discussions.
     GET /api/discussions/
     POST /api/discussions/
+    GET /api/discussions/{id}/replies/?after=&depth=&children=
     POST /api/discussions/{id}/reply/
     POST /api/discussions/{id}/vote/
     """
@@ -48,11 +76,19 @@ class DiscussionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsEnrolledOrInstructor]
 
     def get_queryset(self):
-        # Optimizations
-        queryset = Discussion.objects.select_related('author', 'author__profile').prefetch_related(
-            'votes',
-            Prefetch('replies', queryset=Reply.objects.select_related('author', 'author__profile').order_by('created_at'))
-        ).annotate(reply_count=Count('replies'))
+        # Vote scores are denormalized and the current user's vote is annotated,
+        # so a thread costs two queries however many replies it has
+        user = self.request.user
+        replies = with_user_vote(
+            Reply.objects.select_related('author', 'author__profile').order_by('created_at'), user, 'reply'
+        )
+        queryset = with_user_vote(
+            Discussion.objects.select_related('author', 'author__profile').prefetch_related(
+                Prefetch('replies', queryset=replies)
+            ).annotate(reply_count=Count('replies')),
+            user,
+            'discussion',
+        )
         
         course_slug = self.request.query_params.get('course_slug')
         if course_slug:
@@ -70,17 +106,36 @@ class DiscussionViewSet(viewsets.ModelViewSet):
 
         serializer.save(author=self.request.user, course=course)
 
+    @action(detail=True, methods=['get'])
+    def replies(self, request, pk=None):
+        """A page of top-level replies with a few levels of nested children."""
+        discussion = self.get_object()
+        queryset = with_user_vote(Reply.objects.select_related('author', 'author__profile'), request.user, 'reply')
+        page = load_reply_tree(
+            discussion,
+            after=_bounded_param(request, 'after', 0, 2 ** 31),
+            page_size=_bounded_param(request, 'page_size', REPLY_PAGE_SIZE, 100) or REPLY_PAGE_SIZE,
+            depth=_bounded_param(request, 'depth', REPLY_TREE_DEPTH, 5),
+            children_per_node=_bounded_param(request, 'children', REPLY_CHILDREN_PER_NODE, 20),
+            queryset=queryset,
+        )
+        return Response(_reply_tree_data(page, request))
+
     @action(detail=True, methods=['post'])
     def reply(self, request, pk=None):
         """Add a reply to a discussion."""
         discussion = self.get_object()
         serializer = ReplySerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
+            parent = serializer.validated_data.get('parent')
+            if parent is not None and parent.discussion_id != discussion.pk:
+                return Response({'parent': ['Reply to a reply in the same discussion.']},
+                                status=status.HTTP_400_BAD_REQUEST)
             reply = serializer.save(author=request.user, discussion=discussion)
             
             # Notify discussion author if someone else replied
             if discussion.author != request.user:
-                link = reverse('discussions:discussion_detail', kwargs={'course_slug': discussion.course.slug, 'slug': discussion.slug, 'pk': discussion.pk})
+                link = reverse('discussions:discussion_detail', kwargs={'slug': discussion.course.slug, 'pk': discussion.pk})
                 create_notification(
                     recipient=discussion.author,
                     title=f"New reply in {discussion.title}",
@@ -105,19 +160,15 @@ class DiscussionViewSet(viewsets.ModelViewSet):
         if vote_type not in [1, -1, 0]:
             return Response({'error': 'Invalid vote type'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Remove existing vote
-        Vote.objects.filter(user=request.user, discussion=discussion).delete()
-
-        if vote_type != 0:
-            Vote.objects.create(user=request.user, discussion=discussion, vote_type=vote_type)
-
-        return Response({'status': 'voted'})
+        score = cast_vote(request.user, vote_type, discussion=discussion)
+        return Response({'status': 'voted', 'score': score})
 
 
 class ReplyViewSet(viewsets.ModelViewSet):
     """
     ViewSet for replies.
     GET /api/replies/
+    GET /api/replies/{id}/children/?after=&limit=
     POST /api/replies/{id}/vote/
     POST /api/replies/{id}/mark_answer/
     """
@@ -126,7 +177,20 @@ class ReplyViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return super().get_queryset()
+        queryset = super().get_queryset().select_related('author', 'author__profile')
+        return with_user_vote(queryset, self.request.user, 'reply')
+
+    @action(detail=True, methods=['get'])
+    def children(self, request, pk=None):
+        """The next batch of direct children of a reply."""
+        reply = self.get_object()
+        page = load_reply_children(
+            reply,
+            after=_bounded_param(request, 'after', 0, 2 ** 31),
+            limit=_bounded_param(request, 'limit', REPLY_CHILDREN_PER_NODE, 100) or REPLY_CHILDREN_PER_NODE,
+            queryset=self.get_queryset(),
+        )
+        return Response(_reply_tree_data(page, request))
 
     @action(detail=True, methods=['post'])
     def vote(self, request, pk=None):
@@ -137,13 +201,8 @@ class ReplyViewSet(viewsets.ModelViewSet):
         if vote_type not in [1, -1, 0]:
             return Response({'error': 'Invalid vote type'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Remove existing vote
-        Vote.objects.filter(user=request.user, reply=reply).delete()
-
-        if vote_type != 0:
-            Vote.objects.create(user=request.user, reply=reply, vote_type=vote_type)
-
-        return Response({'status': 'voted'})
+        score = cast_vote(request.user, vote_type, reply=reply)
+        return Response({'status': 'voted', 'score': score})
 
     @action(detail=True, methods=['post'])
     def mark_answer(self, request, pk=None):
@@ -158,15 +217,16 @@ class ReplyViewSet(viewsets.ModelViewSet):
         # Unmark other answers in this discussion
         discussion.replies.filter(is_answer=True).update(is_answer=False)
         
+        # update_fields keeps vote scores written concurrently
         reply.is_answer = True
-        reply.save()
+        reply.save(update_fields=['is_answer', 'updated_at'])
         
         discussion.is_resolved = True
-        discussion.save()
+        discussion.save(update_fields=['is_resolved', 'updated_at'])
         
         # Notify reply author if their answer was marked
         if reply.author != request.user:
-            link = reverse('discussions:discussion_detail', kwargs={'course_slug': discussion.course.slug, 'slug': discussion.slug, 'pk': discussion.pk})
+            link = reverse('discussions:discussion_detail', kwargs={'slug': discussion.course.slug, 'pk': discussion.pk})
             create_notification(
                 recipient=reply.author,
                 title="Your reply marked as answer",
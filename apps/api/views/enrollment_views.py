@@ -2,6 +2,8 @@
 Enrollment, Progress, Quiz, and Certificate API Views.
 """
 
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, generics, permissions, status
 from rest_framework.decorators import action
@@ -11,6 +13,10 @@ from rest_framework.views import APIView
 from apps.courses.models import (
     Lesson, Quiz, Enrollment, Progress, Certificate, QuizAttempt
 )
+from apps.courses.services.content_cache import get_cached_lesson, get_quiz_structure
+from apps.courses.services.progress_service import mark_lesson_completed
+from apps.courses.services.quiz_service import get_answer_key, grade_quiz_attempt
+from ..pagination import StandardCursorPagination
 from ..serializers import (
     EnrollmentSerializer, ProgressSerializer, QuizSerializer,
     QuizSubmitSerializer, QuizAttemptSerializer, CertificateSerializer
@@ -24,11 +30,14 @@ class EnrollmentListView(generics.ListAPIView):
     """
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardCursorPagination
+    pagination_count = "cached"
 
     def get_queryset(self):
         return Enrollment.objects.filter(
             user=self.request.user
-        ).select_related('course__instructor', 'course__category')
+        ).select_related('course__instructor', 'course__category__stats', 'course__stats') \
+            .order_by('-enrolled_at')
 
 
 class ProgressViewSet(viewsets.ModelViewSet):
@@ -44,7 +53,7 @@ class ProgressViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Progress.objects.filter(
             user=self.request.user
-        ).select_related('lesson__section__course')
+        ).select_related('lesson__subsection__section__course')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -70,12 +79,8 @@ class ProgressViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Create or update progress
-        progress, created = Progress.objects.update_or_create(
-            user=request.user,
-            lesson=lesson,
-            defaults={'completed': True}
-        )
+        # Create or update progress; also bumps the course progress aggregate
+        progress = mark_lesson_completed(request.user, lesson)
         
         serializer = ProgressSerializer(progress)
         return Response(serializer.data)
@@ -91,15 +96,20 @@ class QuizDetailView(generics.RetrieveAPIView):
 
     def get_object(self):
         lesson_id = self.kwargs.get('lesson_id')
-        lesson = get_object_or_404(Lesson, pk=lesson_id, lesson_type='quiz')
+        course, lesson = get_cached_lesson(lesson_id, lesson_type='quiz')
+        if lesson is None:
+            raise Http404("No Lesson matches the given query.")
         
         # Check enrollment
         if not Enrollment.objects.filter(
-            user=self.request.user, course=lesson.subsection.section.course
+            user=self.request.user, course=course
         ).exists():
             self.permission_denied(self.request, message="Not enrolled in this course.")
         
-        return lesson.quiz
+        quiz = get_quiz_structure(course, lesson.pk)
+        if quiz is None:
+            raise Http404("This quiz is not configured yet.")
+        return quiz
 
 
 class QuizSubmitView(APIView):
@@ -110,11 +120,13 @@ class QuizSubmitView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, lesson_id):
-        lesson = get_object_or_404(Lesson, pk=lesson_id, lesson_type='quiz')
+        course, lesson = get_cached_lesson(lesson_id, lesson_type='quiz')
+        if lesson is None:
+            raise Http404("No Lesson matches the given query.")
         
         # Check enrollment
         if not Enrollment.objects.filter(
-            user=request.user, course=lesson.subsection.section.course
+            user=request.user, course=course
         ).exists():
             return Response(
                 {"error": "Not enrolled in this course."},
@@ -135,37 +147,24 @@ class QuizSubmitView(APIView):
         serializer = QuizSubmitSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Calculate score
-        quiz = lesson.quiz
-        total_points = 0
-        earned_points = 0
-        
-        for question in quiz.questions.all():
-            total_points += question.points
-            submitted_answers = serializer.validated_data['answers'].get(str(question.id), [])
-            correct_answers = set(question.answers.filter(is_correct=True).values_list('id', flat=True))
-            
-            if set(submitted_answers) == correct_answers:
-                earned_points += question.points
-
-        score = (earned_points / total_points * 100) if total_points > 0 else 0
+        answer_key = get_answer_key(course, lesson.pk)
+        if answer_key is None:
+            raise Http404("This quiz is not configured yet.")
 
         # Create attempt record
-        attempt_number = QuizAttempt.objects.filter(
-            user=request.user, lesson=lesson
-        ).count() + 1
-
-        attempt = QuizAttempt.objects.create(
-            user=request.user,
-            lesson=lesson,
-            attempt_number=attempt_number,
-            score=score
-        )
+        attempt_number = current_attempts + 1
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.create(
+                user=request.user,
+                lesson=lesson,
+                attempt_number=attempt_number
+            )
+            result = grade_quiz_attempt(attempt, serializer.validated_data['answers'], answer_key)
 
         return Response({
-            "score": score,
-            "earned_points": earned_points,
-            "total_points": total_points,
+            "score": result['score'],
+            "earned_points": result['earned_points'],
+            "total_points": result['total_points'],
             "attempt_number": attempt_number
         })
 
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.courses.services.autocomplete_service import build_autocomplete_index
+
+
+class Command(BaseCommand):
+    help = 'Build the autocomplete index and report its size and build time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', help='Print suggestions for this prefix after building')
+        parser.add_argument('--limit', type=int, default=5)
+
+    def handle(self, *args, **options):
+        index = build_autocomplete_index()
+        stats = index.stats()
+
+        self.stdout.write(f"Entries:        {stats['entries']}")
+        self.stdout.write(f"Keys:           {stats['keys']}")
+        self.stdout.write(f"Short prefixes: {stats['short_prefixes']}")
+        self.stdout.write(f"Build time:     {stats['build_ms']} ms")
+        self.stdout.write(f"Memory:         {stats['memory_bytes'] / 1024:.1f} KiB")
+
+        if options['query']:
+            for suggestion in index.suggest(options['query'], options['limit']):
+                self.stdout.write(f"  [{suggestion.type}] {suggestion.text} ({suggestion.weight:.2f})")
+
+        self.stdout.write(self.style.SUCCESS('Autocomplete index built.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.courses.models import Course
+from apps.courses.services.course_package import export_course_package
+
+
+class Command(BaseCommand):
+    help = 'Export a course, its outline, quizzes and media into a course package directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug of the course to export')
+        parser.add_argument('destination', help='Directory to write the package into')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        course = Course.objects.select_related('category').filter(slug=options['slug']).first()
+        if course is None:
+            raise CommandError(f"Course not found: {options['slug']}")
+
+        result = export_course_package(course, options['destination'], chunk_size=options['chunk_size'])
+        counts = ', '.join(f'{count} {name}' for name, count in result.counts.items())
+        self.stdout.write(f'Exported {counts} and {result.media_files} media files in {result.seconds:.2f}s')
+        if result.missing_media:
+            self.stdout.write(self.style.WARNING(f'{result.missing_media} media files were missing from storage'))
+        self.stdout.write(self.style.SUCCESS(f"Course package written to {options['destination']}"))
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.courses.services.course_package import import_course_package
+
+
+class Command(BaseCommand):
+    help = 'Create a course from a course package directory written by export_course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Course package directory')
+        parser.add_argument('--instructor', required=True, help='Username of the instructor who will own the course')
+        parser.add_argument('--slug', help='Slug for the new course (default: the exported slug)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        instructor = User.objects.filter(username=options['instructor']).first()
+        if instructor is None:
+            raise CommandError(f"User not found: {options['instructor']}")
+
+        try:
+            result = import_course_package(
+                options['source'], instructor, slug=options['slug'], batch_size=options['batch_size']
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        counts = ', '.join(f'{count} {name}' for name, count in result.counts.items())
+        self.stdout.write(f'Imported {counts} and {result.media_files} media files in {result.seconds:.2f}s')
+        self.stdout.write(self.style.SUCCESS(f'Course {result.course_id} created.'))
@@ -1,45 +1,128 @@
 from django.core.management.base import BaseCommand
-from apps.courses.models import Section, Subsection
+from django.db import connection, transaction
+from django.db.models import Max
+from apps.courses.models import Lesson, Subsection
+
+DEFAULT_TITLE = 'General'
+
 
 class Command(BaseCommand):
-    help = 'Migrate existing lessons to default subsections'
+    help = (
+        'Migrate existing lessons to default subsections. Lessons still linked only to a '
+        'section (legacy section_id column, removed by courses migration 0006) are moved '
+        'into a "General" subsection of that section, created where missing. Run it after '
+        'courses migration 0005 and before 0006; later migrations build the derived stats.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk insert/update statement')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+
+    def _legacy_column_exists(self):
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, Lesson._meta.db_table)
+        return 'section_id' in {column.name for column in description}
+
+    def _fetch(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _chunks(self, ids, size):
+        ids = list(ids)
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
 
     def handle(self, *args, **options):
-        # Iterate over all sections that have lessons without a subsection
-        sections = Section.objects.all()
-        migrated_count = 0
-        
-        for section in sections:
-            # Find lessons in this section that do not have a subsection
-            lessons = section.lessons.filter(subsection__isnull=True).order_by('order')
-            
-            if lessons.exists():
-                self.stdout.write(f'Processing section: {section.title}...')
-                
-                # Check if a "Default" or "General" subsection already exists
-                default_subsection = section.subsections.filter(title="General").first()
-                if not default_subsection:
-                    # Get order for new subsection (append to end)
-                    last_subsection = section.subsections.order_by('-order').first()
-                    new_order = (last_subsection.order + 1) if last_subsection else 0
-                    
-                    default_subsection = Subsection.objects.create(
-                        section=section,
-                        title="General",
-                        description="Automatically created for existing lessons.",
-                        order=new_order
-                    )
-                    self.stdout.write(f'  Created subsection "General" for section {section.id}')
-
-                # Move lessons
-                for index, lesson in enumerate(lessons):
-                    lesson.subsection = default_subsection
-                    existing_count = default_subsection.lessons.count()
-
-                    lesson.order = existing_count
-                    lesson.order = existing_count + index
-
-                    lesson.save()
-                    migrated_count += 1
-                    
-        self.stdout.write(self.style.SUCCESS(f'Successfully migrated {migrated_count} lessons to subsections.'))
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if not self._legacy_column_exists():
+            self.stdout.write('Lessons have no legacy section column; nothing to migrate.')
+            return
+
+        table = connection.ops.quote_name(Lesson._meta.db_table)
+        order = connection.ops.quote_name('order')
+        legacy = f'{table} WHERE subsection_id IS NULL AND section_id IS NOT NULL'
+
+        # One query for the affected sections and how many lessons each has to move
+        pending = dict(self._fetch(f'SELECT section_id, COUNT(*) FROM {legacy} GROUP BY section_id'))
+        total = sum(pending.values())
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('Successfully migrated 0 lessons to subsections.'))
+            return
+        section_ids = sorted(pending)
+        self.stdout.write(f'Found {total} lessons in {len(section_ids)} sections.')
+
+        # Existing "General" subsections; the oldest one wins
+        targets = {}
+        for chunk in self._chunks(section_ids, batch_size):
+            targets.update(
+                Subsection.objects.filter(section_id__in=chunk, title=DEFAULT_TITLE)
+                .order_by('-id').values_list('section_id', 'id')
+            )
+        missing = [section_id for section_id in section_ids if section_id not in targets]
+
+        if dry_run:
+            self.stdout.write(f'Would create {len(missing)} "{DEFAULT_TITLE}" subsections '
+                              f'and move {total} lessons (dry run, nothing written).')
+            return
+
+        last_orders = {}
+        for chunk in self._chunks(missing, batch_size):
+            last_orders.update(
+                Subsection.objects.filter(section_id__in=chunk)
+                .values('section_id').annotate(last=Max('order')).values_list('section_id', 'last')
+            )
+        Subsection.objects.bulk_create(
+            [
+                Subsection(
+                    section_id=section_id,
+                    title=DEFAULT_TITLE,
+                    description='Automatically created for existing lessons.',
+                    order=(last_orders.get(section_id) or 0) + 1,
+                )
+                for section_id in missing
+            ],
+            batch_size=batch_size,
+        )
+        self.stdout.write(f'Created {len(missing)} "{DEFAULT_TITLE}" subsections.')
+        for chunk in self._chunks(missing, batch_size):
+            targets.update(
+                Subsection.objects.filter(section_id__in=chunk, title=DEFAULT_TITLE)
+                .order_by('-id').values_list('section_id', 'id')
+            )
+
+        # Moved lessons go after any lessons the subsection already holds
+        next_order = {}
+        for chunk in self._chunks(targets.values(), batch_size):
+            next_order.update(
+                (subsection_id, last + 1)
+                for subsection_id, last in Lesson.objects.filter(subsection_id__in=chunk)
+                .values('subsection_id').annotate(last=Max('order')).values_list('subsection_id', 'last')
+            )
+
+        migrated = 0
+        for section_id in section_ids:
+            subsection_id = targets[section_id]
+            start = next_order.get(subsection_id, 0)
+            lesson_ids = self._fetch(
+                f'SELECT id FROM {legacy} AND section_id = %s ORDER BY {order}, id', [section_id]
+            )
+            with transaction.atomic():
+                Lesson.objects.bulk_update(
+                    [
+                        Lesson(pk=lesson_id, subsection_id=subsection_id, order=start + index)
+                        for index, (lesson_id,) in enumerate(lesson_ids)
+                    ],
+                    ['subsection', 'order'],
+                    batch_size=batch_size,
+                )
+            reported = migrated // batch_size
+            migrated += len(lesson_ids)
+            if migrated // batch_size > reported or migrated == total:
+                self.stdout.write(f'  {migrated}/{total} lessons migrated')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully migrated {migrated} lessons to subsections.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from apps.courses.services.stats_service import rebuild_category_stats, rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalised course and category statistics from source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help='Only rebuild this course id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        courses = rebuild_course_stats(options['courses'], batch_size=batch_size)
+        self.stdout.write(f'Course stats rebuilt: {courses}')
+
+        if not options['courses']:
+            categories = rebuild_category_stats(batch_size=batch_size)
+            self.stdout.write(f'Category stats rebuilt: {categories}')
+
+        self.stdout.write(self.style.SUCCESS('Statistics reconciled.'))
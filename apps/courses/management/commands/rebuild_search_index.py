@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.courses.services.search_index import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for courses, lessons and categories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Rebuilding search index with {backend.__class__.__name__}...')
+
+        counts = rebuild_search_index(batch_size=options['batch_size'])
+        for doc_type, count in counts.items():
+            self.stdout.write(f'  {doc_type}: {count} documents')
+
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.courses.services.quiz_service import regrade_quiz_attempts
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored quiz attempt scores from the saved answers after an answer key change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help='Regrade attempts of this quiz id')
+        parser.add_argument('--lesson', type=int, help='Regrade attempts of this quiz lesson id')
+        parser.add_argument('--course', type=int, help='Regrade attempts of every quiz in this course id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['quiz'] is None and options['lesson'] is None and options['course'] is None:
+            raise CommandError('Pass --quiz, --lesson or --course')
+
+        def report(progress):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'  {progress.attempts} attempts, {progress.updated} changed ({progress.rate:.0f}/s)'
+                )
+
+        result = regrade_quiz_attempts(
+            quiz_id=options['quiz'],
+            lesson_id=options['lesson'],
+            course_id=options['course'],
+            batch_size=options['batch_size'],
+            on_batch=report,
+        )
+        self.stdout.write(
+            f'Attempts regraded: {result.attempts}, scores changed: {result.updated} '
+            f'in {result.seconds:.2f}s ({result.rate:.0f} attempts/s)'
+        )
+        self.stdout.write(self.style.SUCCESS('Quiz scores recomputed.'))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.10 on 2026-10-18 00:42
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS courses_searchdocument_vector_gin "
+        "ON courses_searchdocument USING GIN (search_vector)"
+    )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS courses_searchdocument_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0006_remove_lesson_section"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("doc_type", models.CharField(choices=[("course", "Course"), ("lesson", "Lesson"), ("category", "Category")], max_length=10)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("title", models.TextField(blank=True)),
+                ("summary", models.TextField(blank=True)),
+                ("body", models.TextField(blank=True)),
+                ("length", models.FloatField(default=0)),
+                ("search_vector", django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("doc_type", "object_id")},
+            },
+        ),
+        migrations.CreateModel(
+            name="SearchPosting",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("doc_type", models.CharField(max_length=10)),
+                ("term", models.CharField(max_length=64)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("weight", models.FloatField()),
+                ("doc_length", models.FloatField()),
+                ("document", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="postings", to="courses.searchdocument")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["doc_type", "term"], name="courses_sea_doc_typ_5b1b58_idx")],
+            },
+        ),
+        migrations.RunPython(create_search_vector_index, drop_search_vector_index),
+    ]
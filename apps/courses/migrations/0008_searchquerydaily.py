@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0007_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchQueryDaily",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("query", models.CharField(max_length=255)),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="courses_sea_day_ffeed5_idx")],
+                "unique_together": {("query", "day")},
+            },
+        ),
+    ]
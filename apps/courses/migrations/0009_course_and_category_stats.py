@@ -0,0 +1,89 @@
+# Generated by Django 5.2.10 on 2026-10-18 01:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _grouped_counts(queryset, key):
+    return dict(queryset.values_list(key).annotate(count=Count("pk")).order_by())
+
+
+def populate_stats(apps, schema_editor):
+    Category = apps.get_model("courses", "Category")
+    Course = apps.get_model("courses", "Course")
+    Enrollment = apps.get_model("courses", "Enrollment")
+    Section = apps.get_model("courses", "Section")
+    Lesson = apps.get_model("courses", "Lesson")
+    CourseStats = apps.get_model("courses", "CourseStats")
+    CategoryStats = apps.get_model("courses", "CategoryStats")
+
+    enrollments = _grouped_counts(Enrollment.objects.all(), "course_id")
+    completed = _grouped_counts(Enrollment.objects.filter(is_completed=True), "course_id")
+    sections = _grouped_counts(Section.objects.all(), "course_id")
+    lessons = _grouped_counts(Lesson.objects.all(), "subsection__section__course_id")
+    CourseStats.objects.bulk_create(
+        [
+            CourseStats(
+                course_id=course_id,
+                enrollment_count=enrollments.get(course_id, 0),
+                completed_enrollment_count=completed.get(course_id, 0),
+                section_count=sections.get(course_id, 0),
+                lesson_count=lessons.get(course_id, 0),
+            )
+            for course_id in Course.objects.values_list("pk", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+    courses = _grouped_counts(Course.objects.all(), "category_id")
+    active = _grouped_counts(Course.objects.filter(is_active=True), "category_id")
+    CategoryStats.objects.bulk_create(
+        [
+            CategoryStats(
+                category_id=category_id,
+                course_count=courses.get(category_id, 0),
+                active_course_count=active.get(category_id, 0),
+            )
+            for category_id in Category.objects.values_list("pk", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_searchquerydaily"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryStats",
+            fields=[
+                ("category", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="stats", serialize=False, to="courses.category")),
+                ("course_count", models.PositiveIntegerField(default=0)),
+                ("active_course_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name_plural": "Category stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="CourseStats",
+            fields=[
+                ("course", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="stats", serialize=False, to="courses.course")),
+                ("enrollment_count", models.PositiveIntegerField(default=0)),
+                ("completed_enrollment_count", models.PositiveIntegerField(default=0)),
+                ("section_count", models.PositiveIntegerField(default=0)),
+                ("lesson_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name_plural": "Course stats",
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
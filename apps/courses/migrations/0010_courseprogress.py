@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-18 02:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def populate_course_progress(apps, schema_editor):
+    Enrollment = apps.get_model("courses", "Enrollment")
+    Lesson = apps.get_model("courses", "Lesson")
+    Progress = apps.get_model("courses", "Progress")
+    CourseProgress = apps.get_model("courses", "CourseProgress")
+
+    totals = dict(
+        Lesson.objects.values_list("subsection__section__course_id")
+        .annotate(count=Count("pk")).order_by()
+    )
+    completed = {
+        (row["user_id"], row["lesson__subsection__section__course_id"]): row
+        for row in Progress.objects.filter(completed=True)
+        .values("user_id", "lesson__subsection__section__course_id")
+        .annotate(count=Count("pk"), last=Max("completed_at")).order_by()
+    }
+
+    rows = []
+    for user_id, course_id in Enrollment.objects.values_list("user_id", "course_id").iterator():
+        total = totals.get(course_id, 0)
+        done = completed.get((user_id, course_id), {"count": 0, "last": None})
+        rows.append(CourseProgress(
+            user_id=user_id,
+            course_id=course_id,
+            completed_lessons=done["count"],
+            total_lessons=total,
+            progress_percent=round(done["count"] / total * 100, 2) if total else 0,
+            last_activity_at=done["last"],
+        ))
+    CourseProgress.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0009_course_and_category_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseProgress",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("completed_lessons", models.PositiveIntegerField(default=0)),
+                ("total_lessons", models.PositiveIntegerField(default=0)),
+                ("progress_percent", models.FloatField(default=0)),
+                ("last_activity_at", models.DateTimeField(blank=True, null=True)),
+                ("course", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="user_progress", to="courses.course")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="course_progress", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name_plural": "Course progress",
+                "unique_together": {("user", "course")},
+            },
+        ),
+        migrations.RunPython(populate_course_progress, migrations.RunPython.noop),
+    ]
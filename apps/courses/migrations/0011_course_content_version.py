@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0010_courseprogress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="content_version",
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False,
+                help_text="Incremented whenever the course outline changes; used as a cache key",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+def fill_section_offsets(apps, schema_editor):
+    Section = apps.get_model("courses", "Section")
+    changed = []
+    course_id = None
+    offset = 0
+    for section in Section.objects.order_by("course_id", "order", "pk").only(
+        "course_id", "duration_days", "start_offset_days", "end_offset_days"
+    ).iterator():
+        if section.course_id != course_id:
+            course_id, offset = section.course_id, 0
+        section.start_offset_days = offset
+        offset += section.duration_days
+        section.end_offset_days = offset
+        changed.append(section)
+    Section.objects.bulk_update(changed, ["start_offset_days", "end_offset_days"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0012_category_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="section",
+            name="start_offset_days",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="end_offset_days",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_section_offsets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(fields=["course", "enrolled_at"], name="enroll_course_enrolled_idx"),
+        ),
+    ]
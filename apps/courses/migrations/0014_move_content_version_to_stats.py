@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_to_stats(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    CourseStats = apps.get_model("courses", "CourseStats")
+    CourseStats.objects.update(
+        content_version=Subquery(Course.objects.filter(pk=OuterRef("pk")).values("content_version")[:1])
+    )
+
+
+def copy_to_course(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    CourseStats = apps.get_model("courses", "CourseStats")
+    Course.objects.filter(stats__isnull=False).update(
+        content_version=Subquery(CourseStats.objects.filter(pk=OuterRef("pk")).values("content_version")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0013_section_offsets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coursestats",
+            name="content_version",
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False,
+                help_text="Incremented whenever the course outline changes; used as a cache key",
+            ),
+        ),
+        migrations.RunPython(copy_to_stats, copy_to_course),
+        migrations.RemoveField(
+            model_name="course",
+            name="content_version",
+        ),
+    ]
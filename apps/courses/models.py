@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from django.db import models
 from django.contrib.auth.models import User
@@ -8,12 +9,14 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Max
 from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -70,6 +73,14 @@ class Course(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def content_version(self):
+        """Version of the course content used in cache keys, or None if the course has no stats row"""
+        try:
+            return self.stats.content_version
+        except CourseStats.DoesNotExist:
+            return None
+
     def clean(self):
         # Validate thumbnail
         if self.thumbnail:
@@ -125,6 +136,7 @@ class Course(models.Model):
             # Ensure uniqueness
             while Course.objects.filter(slug=self.slug).exists():
                 self.slug = ''.join(secrets.choice(alphabet) for _ in range(12))
+
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
@@ -150,6 +162,11 @@ class Section(models.Model):
         default=False,
         help_text="If checked, only students who purchased certificate can access this section",
     )
+    # Days from the start date to the beginning / end of this section, i.e. the
+    # summed duration of the sections before it. Maintained by
+    # deadline_service.refresh_section_offsets whenever sections change.
+    start_offset_days = models.PositiveIntegerField(default=0, editable=False)
+    end_offset_days = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
 
@@ -173,20 +190,7 @@ class Section(models.Model):
         else:
             start_date = enrollment_date
 
-        # Get all sections in the course ordered by their order
-        sections = Section.objects.filter(course=self.course).order_by("order")
-
-        # Calculate cumulative days up to this section
-        cumulative_days = 0
-        for section in sections:
-            cumulative_days += section.duration_days
-            if section.id == self.id:
-                break
-
-        # Calculate deadline
-        from datetime import timedelta
-
-        return start_date + timedelta(days=cumulative_days)
+        return start_date + timedelta(days=self.end_offset_days)
 
 
 class Subsection(models.Model):
@@ -371,6 +375,9 @@ class Answer(models.Model):
         return f"Answer: {self.text}"
 
 
+QUIZ_TIME_LIMIT = timedelta(hours=2)
+
+
 class QuizAttempt(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="quiz_attempts"
@@ -390,6 +397,10 @@ class QuizAttempt(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.lesson.title} - Attempt {self.attempt_number}"
 
+    def is_time_limit_exceeded(self):
+        """Open attempts are submitted automatically after QUIZ_TIME_LIMIT (2 hours)"""
+        return self.completed_at is None and timezone.now() - self.started_at > QUIZ_TIME_LIMIT
+
 
 class UserAnswer(models.Model):
     quiz_attempt = models.ForeignKey(
@@ -417,6 +428,10 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ("user", "course")
+        indexes = [
+            # Enrollments of a course by date, for section deadline windows
+            models.Index(fields=["course", "enrolled_at"], name="enroll_course_enrolled_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} enrolled in {self.course.title}"
@@ -428,6 +443,50 @@ class Enrollment(models.Model):
         return self.enrolled_at
 
 
+
+class CourseStats(models.Model):
+    """
+    Denormalised per-course counters, kept current by signals and rebuilt
+    in bulk by the rebuild_course_stats command.
+    """
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    enrollment_count = models.PositiveIntegerField(default=0)
+    completed_enrollment_count = models.PositiveIntegerField(default=0)
+    section_count = models.PositiveIntegerField(default=0)
+    lesson_count = models.PositiveIntegerField(default=0)
+    # Kept here rather than on Course so saving a Course never writes back a
+    # stale value; only changed with F() updates by bump_content_version
+    content_version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        help_text="Incremented whenever the course outline changes; used as a cache key",
+    )
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Course stats"
+
+    def __str__(self):
+        return f"Stats for course {self.course_id}"
+
+
+class CategoryStats(models.Model):
+    """Denormalised per-category counters, see CourseStats."""
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    course_count = models.PositiveIntegerField(default=0)
+    active_course_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Category stats"
+
+    def __str__(self):
+        return f"Stats for category {self.category_id}"
+
 class Progress(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="progress_records"
@@ -447,6 +506,35 @@ class Progress(models.Model):
         )
 
 
+
+class CourseProgress(models.Model):
+    """
+    Per-user aggregate of lesson completion in a course.
+    Maintained incrementally by progress_service and the Progress/Lesson signals.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="course_progress"
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="user_progress"
+    )
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    progress_percent = models.FloatField(default=0)
+    last_activity_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ("user", "course")
+        verbose_name_plural = "Course progress"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.course.title}: {self.progress_percent}%"
+
+    @property
+    def is_completed(self):
+        return self.total_lessons > 0 and self.completed_lessons >= self.total_lessons
+
+
 class Certificate(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="certificates"
@@ -491,7 +579,8 @@ class SearchQuery(models.Model):
         blank=True,
         related_name="search_history",
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the search is queued, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
@@ -506,3 +595,73 @@ class SearchQuery(models.Model):
 
     def __str__(self):
         return f"{self.query} - {self.created_at}"
+
+
+class SearchQueryDaily(models.Model):
+    """Daily rollup of SearchQuery rows, used for popular search terms."""
+    query = models.CharField(max_length=255)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("query", "day")
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.query} - {self.day}: {self.count}"
+
+
+class SearchDocument(models.Model):
+    """
+    Normalised searchable text for a course, lesson or category.
+    Kept in sync by signals and queried through the pluggable search backends
+    in services/search_index.py.
+    """
+    COURSE = "course"
+    LESSON = "lesson"
+    CATEGORY = "category"
+    DOC_TYPES = (
+        (COURSE, "Course"),
+        (LESSON, "Lesson"),
+        (CATEGORY, "Category"),
+    )
+
+    doc_type = models.CharField(max_length=10, choices=DOC_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.TextField(blank=True)
+    summary = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    # Field-weighted token count, used for BM25 length normalisation
+    length = models.FloatField(default=0)
+    # Only populated when the PostgreSQL backend is active
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("doc_type", "object_id")
+
+    def __str__(self):
+        return f"{self.doc_type}:{self.object_id}"
+
+
+class SearchPosting(models.Model):
+    """Inverted-index entry: one row per (term, document) pair."""
+    document = models.ForeignKey(
+        SearchDocument, on_delete=models.CASCADE, related_name="postings"
+    )
+    doc_type = models.CharField(max_length=10)
+    term = models.CharField(max_length=64)
+    object_id = models.PositiveBigIntegerField()
+    # Field-weighted term frequency
+    weight = models.FloatField()
+    doc_length = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["doc_type", "term"]),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.doc_type}:{self.object_id}"
@@ -35,6 +35,8 @@ from .progress_service import (
     mark_lesson_incomplete,
     is_lesson_completed,
     get_course_progress,
+    refresh_course_progress,
+    with_course_progress,
 )
 
 from .certificate_service import (
@@ -46,6 +48,11 @@ from .certificate_service import (
 
 from .quiz_service import (
     grade_quiz_attempt,
+    build_answer_key,
+    get_answer_key,
+    save_attempt_answers,
+    load_attempt_answers,
+    regrade_quiz_attempts,
     create_quiz_attempt,
     save_user_answers,
     get_quiz_results,
@@ -55,6 +62,55 @@ from .search_service import (
     get_popular_search_terms,
 )
 
+from .stats_service import (
+    get_stats_for_course,
+    get_stats_for_category,
+    rebuild_course_stats,
+    rebuild_category_stats,
+)
+
+from .outline_service import (
+    get_course_outline,
+    build_course_outline,
+)
+
+from .content_cache import (
+    bump_content_version,
+    get_content_cache_stats,
+    get_lesson_content,
+    get_quiz_structure,
+)
+
+from .search_index import (
+    get_search_backend,
+    search_courses,
+    search_lessons,
+    search_categories,
+    rebuild_search_index,
+)
+
+from .deadline_service import (
+    DueSection,
+    refresh_section_offsets,
+    get_section_deadlines,
+    get_sections_due_soon,
+)
+
+from .reorder_service import (
+    reorder_course,
+    reorder_questions,
+)
+
+from .course_package import (
+    export_course_package,
+    import_course_package,
+)
+
+from .user_course_loader import (
+    UserCourseLoader,
+    get_user_course_loader,
+)
+
 
 __all__ = [
     # Course Service
@@ -87,6 +143,8 @@ __all__ = [
     'mark_lesson_incomplete',
     'is_lesson_completed',
     'get_course_progress',
+    'refresh_course_progress',
+    'with_course_progress',
 
     # Certificate Service
     'can_generate_certificate',
@@ -96,10 +154,56 @@ __all__ = [
 
     # Quiz Service
     'grade_quiz_attempt',
+    'build_answer_key',
+    'get_answer_key',
+    'save_attempt_answers',
+    'load_attempt_answers',
+    'regrade_quiz_attempts',
     'create_quiz_attempt',
     'save_user_answers',
     'get_quiz_results',
 
     # Search Service
     'get_popular_search_terms',
+
+    # Stats Service
+    'get_stats_for_course',
+    'get_stats_for_category',
+    'rebuild_course_stats',
+    'rebuild_category_stats',
+
+    # Outline Service
+    'get_course_outline',
+    'build_course_outline',
+
+    # Content Cache
+    'bump_content_version',
+    'get_content_cache_stats',
+    'get_lesson_content',
+    'get_quiz_structure',
+
+    # Search Index
+    'get_search_backend',
+    'search_courses',
+    'search_lessons',
+    'search_categories',
+    'rebuild_search_index',
+
+    # Deadline Service
+    'DueSection',
+    'refresh_section_offsets',
+    'get_section_deadlines',
+    'get_sections_due_soon',
+
+    # Reorder Service
+    'reorder_course',
+    'reorder_questions',
+
+    # Course Package
+    'export_course_package',
+    'import_course_package',
+
+    # User Course Loader
+    'UserCourseLoader',
+    'get_user_course_loader',
 ]
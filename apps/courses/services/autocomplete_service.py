@@ -0,0 +1,371 @@
+"""
+Autocomplete Service - In-memory prefix index for search suggestions
+
+Each worker holds a snapshot built from course titles, category names,
+instructor names and popular search queries. Lookups are a binary search over
+a sorted array of (key, entry) pairs and never touch the database.
+
+The snapshot is refreshed in two ways:
+- model signals apply upserts/removals to the local snapshot and bump a shared
+  version number in the cache
+- other workers notice the new version (checked at most every
+  AUTOCOMPLETE_REFRESH_INTERVAL seconds) or AUTOCOMPLETE_MAX_AGE expiry and rebuild
+"""
+import heapq
+import logging
+import math
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from ..models import Category, Course
+from .search_index import tokenize
+from .search_service import get_popular_search_terms
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "autocomplete:version"
+
+# Prefixes up to this length have their top suggestions precomputed
+SHORT_PREFIX_LENGTH = 2
+TOP_K = 10
+# Only the first few words of a suggestion start a key
+MAX_KEY_WORDS = 8
+MAX_KEY_LENGTH = 64
+
+# Base weight per suggestion type; popularity is added on a log scale
+TYPE_WEIGHTS = {
+    "course": 3.0,
+    "category": 2.0,
+    "instructor": 1.0,
+    "query": 1.0,
+}
+
+# Upper bound of the key range, sorts after any normalised text
+_KEY_END = "\uffff"
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    text: str
+    type: str
+    id: Optional[int]
+    url: str
+    weight: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.type}:{self.id if self.id is not None else self.text}"
+
+    def as_dict(self) -> Dict:
+        return {"text": self.text, "type": self.type, "id": self.id, "url": self.url}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+def suggestion_keys(text: str) -> List[str]:
+    """Index keys for a suggestion: the normalised text from each word start"""
+    tokens = tokenize(text)
+    return [
+        " ".join(tokens[i:])[:MAX_KEY_LENGTH]
+        for i in range(min(len(tokens), MAX_KEY_WORDS))
+    ]
+
+
+def popularity_weight(suggestion_type: str, count: int) -> float:
+    return TYPE_WEIGHTS[suggestion_type] + math.log1p(count)
+
+
+class AutocompleteIndex:
+    """Sorted-array prefix index with precomputed top-k for short prefixes."""
+
+    def __init__(self, suggestions: Iterable[Suggestion] = (), version=None):
+        started = time.perf_counter()
+        self.version = version
+        self.built_at = time.monotonic()
+        self._entries: Dict[str, Suggestion] = {}
+        for suggestion in suggestions:
+            self._entries[suggestion.key] = suggestion
+        self._keys: List[Tuple[str, str]] = sorted(
+            (key, entry_key)
+            for entry_key, suggestion in self._entries.items()
+            for key in suggestion_keys(suggestion.text)
+        )
+        self._short: Dict[str, List[str]] = {}
+        self._build_short_prefixes()
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rank(self, entry_keys: Iterable[str], limit: int) -> List[str]:
+        return heapq.nlargest(
+            limit,
+            set(entry_keys),
+            key=lambda entry_key: (self._entries[entry_key].weight, entry_key),
+        )
+
+    def _range(self, prefix: str) -> Iterable[str]:
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + _KEY_END,), lo)
+        return (entry_key for _, entry_key in self._keys[lo:hi])
+
+    def _build_short_prefixes(self, prefixes: Optional[Iterable[str]] = None):
+        if prefixes is None:
+            grouped: Dict[str, set] = {}
+            for key, entry_key in self._keys:
+                for length in range(1, SHORT_PREFIX_LENGTH + 1):
+                    if len(key) >= length:
+                        grouped.setdefault(key[:length], set()).add(entry_key)
+            self._short = {
+                prefix: self._rank(entry_keys, TOP_K) for prefix, entry_keys in grouped.items()
+            }
+            return
+
+        for prefix in prefixes:
+            ranked = self._rank(self._range(prefix), TOP_K)
+            if ranked:
+                self._short[prefix] = ranked
+            else:
+                self._short.pop(prefix, None)
+
+    @staticmethod
+    def _short_prefixes(keys: Iterable[str]) -> set:
+        return {
+            key[:length]
+            for key in keys
+            for length in range(1, SHORT_PREFIX_LENGTH + 1)
+            if len(key) >= length
+        }
+
+    def suggest(self, query: str, limit: int = 5) -> List[Suggestion]:
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        if len(prefix) <= SHORT_PREFIX_LENGTH and limit <= TOP_K:
+            entry_keys = self._short.get(prefix, [])[:limit]
+        else:
+            entry_keys = self._rank(self._range(prefix), limit)
+        return [self._entries[entry_key] for entry_key in entry_keys]
+
+    def upsert(self, suggestion: Suggestion):
+        affected = self._remove_keys(suggestion.key)
+        self._entries[suggestion.key] = suggestion
+        keys = suggestion_keys(suggestion.text)
+        for key in keys:
+            insort(self._keys, (key, suggestion.key))
+        self._build_short_prefixes(affected | self._short_prefixes(keys))
+
+    def remove(self, entry_key: str):
+        affected = self._remove_keys(entry_key)
+        self._entries.pop(entry_key, None)
+        self._build_short_prefixes(affected)
+
+    def _remove_keys(self, entry_key: str) -> set:
+        existing = self._entries.get(entry_key)
+        if existing is None:
+            return set()
+        keys = suggestion_keys(existing.text)
+        for key in keys:
+            position = bisect_left(self._keys, (key, entry_key))
+            if position < len(self._keys) and self._keys[position] == (key, entry_key):
+                del self._keys[position]
+        return self._short_prefixes(keys)
+
+    def get(self, entry_key: str) -> Optional[Suggestion]:
+        return self._entries.get(entry_key)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index structures"""
+        total = sys.getsizeof(self._entries) + sys.getsizeof(self._keys) + sys.getsizeof(self._short)
+        for entry_key, suggestion in self._entries.items():
+            total += sys.getsizeof(entry_key) + sys.getsizeof(suggestion)
+            total += sys.getsizeof(suggestion.text) + sys.getsizeof(suggestion.url)
+        for pair in self._keys:
+            total += sys.getsizeof(pair) + sys.getsizeof(pair[0])
+        for prefix, entry_keys in self._short.items():
+            total += sys.getsizeof(prefix) + sys.getsizeof(entry_keys)
+        return total
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "keys": len(self._keys),
+            "short_prefixes": len(self._short),
+            "build_ms": round(self.build_ms, 2),
+            "memory_bytes": self.memory_bytes(),
+            "version": self.version,
+        }
+
+
+# ============================================
+# Suggestion sources
+# ============================================
+
+
+def course_list_url(**params) -> str:
+    return f"{reverse('courses:course_list')}?{urlencode(params)}"
+
+
+def course_suggestion(course_id: int, title: str, slug: str, enrollment_count: int = 0) -> Suggestion:
+    return Suggestion(
+        text=title,
+        type="course",
+        id=course_id,
+        url=f"/courses/{slug}/",
+        weight=popularity_weight("course", enrollment_count),
+    )
+
+
+def category_suggestion(category_id: int, name: str, course_count: int = 0) -> Suggestion:
+    return Suggestion(
+        text=name,
+        type="category",
+        id=category_id,
+        url=course_list_url(category=category_id),
+        weight=popularity_weight("category", course_count),
+    )
+
+
+def instructor_suggestion(user_id: int, username: str, first_name: str, last_name: str,
+                          course_count: int = 0) -> Suggestion:
+    return Suggestion(
+        text=f"{first_name} {last_name}".strip() or username,
+        type="instructor",
+        id=user_id,
+        url=course_list_url(q=username),
+        weight=popularity_weight("instructor", course_count),
+    )
+
+
+def load_suggestions(query_days: int = 30, query_limit: int = 1000) -> List[Suggestion]:
+    """Load every suggestion source from the database"""
+    suggestions = []
+
+    courses = Course.objects.filter(is_active=True).annotate(
+        enrollment_count=Count("enrollments")
+    ).values_list("id", "title", "slug", "enrollment_count")
+    suggestions.extend(course_suggestion(*row) for row in courses)
+
+    categories = Category.objects.annotate(
+        course_count=Count("courses", filter=Q(courses__is_active=True))
+    ).values_list("id", "name", "course_count")
+    suggestions.extend(category_suggestion(*row) for row in categories)
+
+    instructors = Course.objects.filter(is_active=True).values_list(
+        "instructor_id", "instructor__username", "instructor__first_name", "instructor__last_name"
+    ).annotate(course_count=Count("id"))
+    suggestions.extend(instructor_suggestion(*row) for row in instructors)
+
+    queries = get_popular_search_terms(days=query_days, limit=query_limit)
+    suggestions.extend(
+        Suggestion(
+            text=row["query"],
+            type="query",
+            id=None,
+            url=course_list_url(q=row["query"]),
+            weight=popularity_weight("query", row["count"]),
+        )
+        for row in queries
+    )
+
+    return suggestions
+
+
+# ============================================
+# Per-worker snapshot
+# ============================================
+
+_index: Optional[AutocompleteIndex] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _refresh_interval() -> float:
+    return getattr(settings, "AUTOCOMPLETE_REFRESH_INTERVAL", 30)
+
+
+def _max_age() -> float:
+    return getattr(settings, "AUTOCOMPLETE_MAX_AGE", 600)
+
+
+def build_autocomplete_index() -> AutocompleteIndex:
+    """Build a fresh snapshot and install it for this worker"""
+    global _index, _checked_at
+    version = cache.get(VERSION_CACHE_KEY)
+    index = AutocompleteIndex(load_suggestions(), version=version)
+    with _lock:
+        _index = index
+        _checked_at = time.monotonic()
+    logger.info("Autocomplete index built: %s", index.stats())
+    return index
+
+
+def get_autocomplete_index() -> AutocompleteIndex:
+    """Return this worker's snapshot, rebuilding it when stale"""
+    global _checked_at
+    index = _index
+    now = time.monotonic()
+    if index is not None and now - _checked_at < _refresh_interval():
+        return index
+
+    if index is not None:
+        _checked_at = now
+        if now - index.built_at < _max_age() and cache.get(VERSION_CACHE_KEY) == index.version:
+            return index
+
+    return build_autocomplete_index()
+
+
+def reset_autocomplete_index():
+    """Drop this worker's snapshot; the next lookup rebuilds it"""
+    global _index, _checked_at
+    with _lock:
+        _index = None
+        _checked_at = 0.0
+
+
+def get_suggestions(query: str, limit: int = 5) -> List[Dict]:
+    return [suggestion.as_dict() for suggestion in get_autocomplete_index().suggest(query, limit)]
+
+
+def _bump_version():
+    """Tell other workers to rebuild; keep the local snapshot on the new version"""
+    cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+    try:
+        version = cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        version = None
+    if _index is not None:
+        _index.version = version
+
+
+def upsert_suggestion(suggestion: Suggestion):
+    if _index is not None:
+        with _lock:
+            existing = _index.get(suggestion.key)
+            if existing is not None:
+                # Keep the popularity weight until the next full rebuild
+                suggestion = Suggestion(
+                    suggestion.text, suggestion.type, suggestion.id, suggestion.url, existing.weight
+                )
+            _index.upsert(suggestion)
+    _bump_version()
+
+
+def remove_suggestion(suggestion_type: str, object_id: int):
+    if _index is not None:
+        with _lock:
+            _index.remove(f"{suggestion_type}:{object_id}")
+    _bump_version()
@@ -7,7 +7,7 @@ separated from views for better testability and reusability.
 from typing import Optional
 from django.contrib.auth.models import User
 
-from ..models import Course, Certificate, Enrollment
+from ..models import Course, Certificate, CourseProgress, Enrollment
 
 
 def can_generate_certificate(user: User, course: Course) -> bool:
@@ -18,16 +18,8 @@ def can_generate_certificate(user: User, course: Course) -> bool:
         return False
 
     # Course must be 100% completed
-    total_lessons = course.sections.prefetch_related('subsections__lessons').count()
-    if total_lessons == 0:
-        return False
-
-    completed_lessons = course.sections.filter(
-        subsections__lessons__progress_records__user=user,
-        subsections__lessons__progress_records__completed=True
-    ).count()
-
-    return completed_lessons >= total_lessons
+    course_progress = CourseProgress.objects.filter(user=user, course=course).first()
+    return course_progress is not None and course_progress.is_completed
 
 
 def generate_certificate(user: User, course: Course) -> Certificate:
@@ -0,0 +1,142 @@
+"""
+Content Cache Service - Read-through cache for course content
+
+Everything a learner reads but rarely changes (outline, lesson bodies, quiz
+structure) is cached under a key that contains the course's content_version,
+which lives on its CourseStats row.
+Editing any Course, Section, Subsection, Lesson, Quiz, Question or Answer (or
+reordering them) bumps that version through the signals in courses/signals.py,
+so old entries simply stop being read and expire on their own.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from DjangoProject.cache import single_flight
+from ..models import Course, CourseStats, Lesson, Quiz
+
+CACHE_KEY_PREFIX = "course-content"
+
+
+class ContentCacheStats:
+    """Per-process hit/miss/invalidation counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def record(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+content_cache_stats = ContentCacheStats()
+
+
+def get_content_cache_stats() -> Dict[str, Any]:
+    return content_cache_stats.as_dict()
+
+
+def content_cache_key(course_id: int, version: int, *parts) -> str:
+    return ":".join(str(part) for part in (CACHE_KEY_PREFIX, course_id, version, *parts))
+
+
+def read_through(course: Course, name: str, builder: Callable[[], Any], *parts, timeout: Optional[int] = None):
+    """
+    Return the cached value for (course version, name, *parts), calling
+    builder() on a miss. A builder result of None is not cached, and courses
+    without a content version (no stats row yet) are not cached at all.
+    """
+    version = course.content_version
+    if version is None:
+        return builder()
+    key = content_cache_key(course.pk, version, name, *parts)
+    value = cache.get(key)
+    if value is not None:
+        content_cache_stats.record("hits")
+        return value
+
+    content_cache_stats.record("misses")
+    if timeout is None:
+        timeout = getattr(settings, "COURSE_CONTENT_CACHE_TIMEOUT", 3600)
+    # Concurrent misses for the same entry wait for one build instead of all hitting the database
+    return single_flight(key, builder, timeout)
+
+
+def bump_content_version(course_id: Optional[int]) -> None:
+    """Invalidate every cached entry of a course"""
+    if course_id is None:
+        return
+    now = timezone.now()
+    CourseStats.objects.filter(pk=course_id).update(content_version=F("content_version") + 1, updated_at=now)
+    # updated_at moves with the version, so Last-Modified validators see outline edits too
+    Course.objects.filter(pk=course_id).update(updated_at=now)
+    content_cache_stats.record("invalidations")
+
+
+# ============================================
+# Read-through helpers
+# ============================================
+
+
+def get_lesson_content(course: Course, lesson_id: int) -> Optional[Lesson]:
+    """A lesson of the course, with its subsection and section loaded"""
+    return read_through(
+        course,
+        "lesson",
+        lambda: Lesson.objects.select_related("subsection__section").filter(
+            pk=lesson_id, subsection__section__course=course
+        ).first(),
+        lesson_id,
+    )
+
+
+def get_quiz_structure(course: Course, lesson_id: int) -> Optional[Quiz]:
+    """A lesson's quiz with its questions and answers prefetched"""
+    return read_through(
+        course,
+        "quiz",
+        lambda: Quiz.objects.prefetch_related("questions__answers").filter(
+            lesson_id=lesson_id, lesson__subsection__section__course=course
+        ).first(),
+        lesson_id,
+    )
+
+
+def get_course_for_lesson(lesson_id: int) -> Optional[Course]:
+    """The course a lesson belongs to, loaded with just enough fields for cache keys"""
+    return Course.objects.select_related("stats").only("id", "stats__content_version").filter(
+        sections__subsections__lessons=lesson_id
+    ).first()
+
+
+def get_cached_lesson(lesson_id: int, lesson_type: Optional[str] = None):
+    """
+    Resolve a lesson by id through the content cache.
+    Returns (course, lesson), or (None, None) if there is no such lesson.
+    """
+    course = get_course_for_lesson(lesson_id)
+    lesson = get_lesson_content(course, lesson_id) if course is not None else None
+    if lesson is None or (lesson_type is not None and lesson.lesson_type != lesson_type):
+        return None, None
+    return course, lesson
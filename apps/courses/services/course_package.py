@@ -0,0 +1,287 @@
+"""
+Course Package Service - Export and import a course between environments
+
+A course package is a directory with:
+
+- course.jsonl.gz: one JSON record per line for the course and then every
+  section, subsection, lesson, quiz, question and answer, level by level.
+  Each record carries its source id and its parent's source id.
+- media/: the course thumbnail and lesson video files, under their storage
+  names.
+- manifest.json: format version, record counts per level and each media
+  file's size and SHA-256.
+
+Both directions stream: the exporter reads each level with iterator() and
+writes line by line, and the importer creates each level with bulk_create
+in batches, remapping source ids to new ones as it goes. Memory use is
+bounded by the batch size plus one integer mapping per imported row.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+from ..models import Answer, Category, Course, Lesson, Question, Quiz, Section, Subsection
+from .deadline_service import refresh_section_offsets
+from .search_index import index_lesson
+from .stats_service import rebuild_course_stats
+
+PACKAGE_FORMAT = 1
+RECORDS_FILE = "course.jsonl.gz"
+MANIFEST_FILE = "manifest.json"
+MEDIA_DIR = "media"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (record type, model, parent foreign key, lookup from the model to the course)
+LEVELS = (
+    ("section", Section, "course", "course"),
+    ("subsection", Subsection, "section", "section__course"),
+    ("lesson", Lesson, "subsection", "subsection__section__course"),
+    ("quiz", Quiz, "lesson", "lesson__subsection__section__course"),
+    ("question", Question, "quiz", "quiz__lesson__subsection__section__course"),
+    ("answer", Answer, "question", "question__quiz__lesson__subsection__section__course"),
+)
+PARENT_TYPES = {level[0]: level[2] for level in LEVELS}
+
+# Values that belong to the target environment rather than the course content
+SKIPPED_FIELDS = {
+    "created_at", "updated_at", "start_offset_days", "end_offset_days",
+    "category", "instructor",
+}
+
+
+@dataclass
+class CoursePackageResult:
+    course_id: int
+    counts: Dict[str, int] = field(default_factory=dict)
+    media_files: int = 0
+    missing_media: int = 0
+    seconds: float = 0.0
+
+
+def _content_fields(model):
+    return [
+        f for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in SKIPPED_FIELDS
+    ]
+
+
+def _file_hash(fileobj) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============================================
+# Export
+# ============================================
+
+
+def _iter_records(course: Course, chunk_size: int) -> Iterator[dict]:
+    names = [f.attname for f in _content_fields(Course)]
+    yield {
+        "type": "course",
+        "id": course.pk,
+        "fields": dict(zip(names, Course.objects.filter(pk=course.pk).values_list(*names).get())),
+        "category": {"name": course.category.name, "description": course.category.description},
+    }
+    for record_type, model, parent, course_lookup in LEVELS:
+        fields = _content_fields(model)
+        names = [f.attname for f in fields]
+        rows = model.objects.filter(**{course_lookup: course}).order_by("pk").values_list("pk", *names)
+        for pk, *values in rows.iterator(chunk_size=chunk_size):
+            yield {"type": record_type, "id": pk, "fields": dict(zip(names, values))}
+
+
+def export_course_package(course: Course, destination: str, chunk_size: int = 1000) -> CoursePackageResult:
+    """Write the course tree and its media files into the destination directory"""
+    started = time.monotonic()
+    os.makedirs(destination, exist_ok=True)
+    result = CoursePackageResult(course_id=course.pk)
+    media_names = set()
+    file_fields = {
+        record_type: [f.attname for f in _content_fields(model) if isinstance(f, models.FileField)]
+        for record_type, model in [("course", Course)] + [(level[0], level[1]) for level in LEVELS]
+    }
+
+    with gzip.open(os.path.join(destination, RECORDS_FILE), "wt", encoding="utf-8") as out:
+        for record in _iter_records(course, chunk_size):
+            for name in file_fields[record["type"]]:
+                if record["fields"][name]:
+                    media_names.add(str(record["fields"][name]))
+            out.write(json.dumps(record, cls=DjangoJSONEncoder))
+            out.write("\n")
+            result.counts[record["type"]] = result.counts.get(record["type"], 0) + 1
+
+    media = []
+    for name in sorted(media_names):
+        if not default_storage.exists(name):
+            result.missing_media += 1
+            continue
+        target = os.path.join(destination, MEDIA_DIR, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest = hashlib.sha256()
+        with default_storage.open(name, "rb") as source, open(target, "wb") as copy:
+            for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                copy.write(chunk)
+        media.append({"path": name, "size": os.path.getsize(target), "sha256": digest.hexdigest()})
+    result.media_files = len(media)
+
+    with open(os.path.join(destination, MANIFEST_FILE), "w", encoding="utf-8") as manifest:
+        json.dump({
+            "format": PACKAGE_FORMAT,
+            "course": {"id": course.pk, "slug": course.slug, "title": course.title},
+            "records": RECORDS_FILE,
+            "counts": result.counts,
+            "media": media,
+        }, manifest, indent=2)
+
+    result.seconds = time.monotonic() - started
+    return result
+
+
+# ============================================
+# Import
+# ============================================
+
+
+def read_manifest(source: str) -> dict:
+    with open(os.path.join(source, MANIFEST_FILE), encoding="utf-8") as manifest:
+        data = json.load(manifest)
+    if data.get("format") != PACKAGE_FORMAT:
+        raise ValueError(f"Unsupported course package format: {data.get('format')}")
+    return data
+
+
+def _import_media(source: str, entries) -> Dict[str, str]:
+    """Store the package's media files and return {package name: storage name}"""
+    names = {}
+    for entry in entries:
+        if os.path.isabs(entry["path"]) or ".." in entry["path"].replace("\\", "/").split("/"):
+            raise ValueError(f"Invalid media path {entry['path']}")
+        path = os.path.join(source, MEDIA_DIR, entry["path"])
+        with open(path, "rb") as packaged:
+            if _file_hash(packaged) != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch for media file {entry['path']}")
+            packaged.seek(0)
+            # The same file from an earlier import (or the source environment) is reused
+            if default_storage.exists(entry["path"]):
+                with default_storage.open(entry["path"], "rb") as existing:
+                    if _file_hash(existing) == entry["sha256"]:
+                        names[entry["path"]] = entry["path"]
+                        continue
+            names[entry["path"]] = default_storage.save(entry["path"], File(packaged))
+    return names
+
+
+def _to_python(model, values: dict, media_names: Dict[str, str]) -> dict:
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    converted = {}
+    for name, value in values.items():
+        model_field = fields[name]
+        if isinstance(model_field, models.FileField):
+            converted[name] = media_names.get(value, value) if value else value
+        elif model_field.is_relation or value is None:
+            converted[name] = value
+        else:
+            converted[name] = model_field.to_python(value)
+    return converted
+
+
+def _read_records(source: str, manifest: dict) -> Iterator[dict]:
+    with gzip.open(os.path.join(source, manifest["records"]), "rt", encoding="utf-8") as records:
+        for line in records:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_course_package(
+    source: str,
+    instructor: User,
+    slug: Optional[str] = None,
+    batch_size: int = 1000,
+) -> CoursePackageResult:
+    """
+    Create a new course from a package directory.
+
+    The course gets the given instructor, the category with the exported name
+    (created if missing) and the exported slug unless another is given.
+    Raises ValueError if the slug is taken or the package is damaged.
+    """
+    started = time.monotonic()
+    manifest = read_manifest(source)
+    slug = slug or manifest["course"]["slug"]
+    if Course.objects.filter(slug=slug).exists():
+        raise ValueError(f"A course with slug {slug!r} already exists")
+
+    media_names = _import_media(source, manifest["media"])
+    models_by_type = {level[0]: level[1] for level in LEVELS}
+    id_maps: Dict[str, Dict[int, int]] = {"course": {}}
+    result = CoursePackageResult(course_id=0)
+    pending = []
+    pending_type = None
+
+    def flush():
+        if not pending:
+            return
+        model = models_by_type[pending_type]
+        parent_key = f"{PARENT_TYPES[pending_type]}_id"
+        parent_ids = id_maps[PARENT_TYPES[pending_type]]
+        objects = []
+        for record in pending:
+            values = _to_python(model, record["fields"], media_names)
+            if values.get(parent_key) is not None:
+                values[parent_key] = parent_ids[values[parent_key]]
+            objects.append(model(**values))
+        created = model.objects.bulk_create(objects)
+        id_map = id_maps.setdefault(pending_type, {})
+        for record, obj in zip(pending, created):
+            id_map[record["id"]] = obj.pk
+        result.counts[pending_type] = result.counts.get(pending_type, 0) + len(created)
+        pending.clear()
+
+    with transaction.atomic():
+        for record in _read_records(source, manifest):
+            if record["type"] == "course":
+                values = _to_python(Course, record["fields"], media_names)
+                thumbnail = values.pop("thumbnail", None)
+                category, _ = Category.objects.get_or_create(
+                    name=record["category"]["name"],
+                    defaults={"description": record["category"]["description"]},
+                )
+                values["slug"] = slug
+                course = Course.objects.create(instructor=instructor, category=category, **values)
+                if thumbnail:
+                    Course.objects.filter(pk=course.pk).update(thumbnail=thumbnail)
+                id_maps["course"][record["id"]] = course.pk
+                result.course_id = course.pk
+                result.counts["course"] = 1
+                continue
+            if record["type"] != pending_type or len(pending) >= batch_size:
+                flush()
+                pending_type = record["type"]
+            pending.append(record)
+        flush()
+
+        # bulk_create skips the per-row signals; bring the derived data up to date at once
+        refresh_section_offsets(result.course_id)
+        rebuild_course_stats([result.course_id])
+
+    lessons = Lesson.objects.filter(subsection__section__course_id=result.course_id).only("id", "title", "content")
+    for lesson in lessons.iterator(chunk_size=batch_size):
+        index_lesson(lesson)
+
+    result.media_files = len(media_names)
+    result.seconds = time.monotonic() - started
+    return result
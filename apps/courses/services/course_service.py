@@ -10,6 +10,7 @@ from django.db.models import QuerySet
 from django.core.exceptions import ValidationError
 
 from ..models import Course, Category, Enrollment
+from .stats_service import get_stats_for_course
 
 
 def get_course_by_slug(slug: str) -> Optional[Course]:
@@ -72,8 +73,9 @@ def toggle_course_active(course: Course) -> Course:
 
 def get_course_stats(course: Course) -> Dict[str, Any]:
     """Get statistics for a course"""
+    stats = get_stats_for_course(course)
     return {
-        'total_enrollments': Enrollment.objects.filter(course=course).count(),
-        'completed_enrollments': Enrollment.objects.filter(course=course, is_completed=True).count(),
-        'total_lessons': course.sections.prefetch_related('subsections__lessons').count(),
+        'total_enrollments': stats.enrollment_count,
+        'completed_enrollments': stats.completed_enrollment_count,
+        'total_lessons': stats.lesson_count,
     }
@@ -0,0 +1,109 @@
+"""
+Deadline Service - Business logic for section deadlines
+
+A section is due a fixed number of days after the learner's start date
+(enrollment date, or the course opening date): the summed duration of the
+sections up to and including it. That offset is stored on each Section
+(start_offset_days / end_offset_days) and recomputed by
+refresh_section_offsets() whenever a course's sections are saved, deleted
+or reordered, so a deadline is a single addition.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Course, Enrollment, Section
+from .outline_service import SectionOutline, get_course_outline
+from .user_course_loader import get_user_course_loader
+
+
+@dataclass(frozen=True)
+class DueSection:
+    user_id: int
+    course_id: int
+    section_id: int
+    deadline: datetime
+
+
+def refresh_section_offsets(course_id: int) -> Dict[int, Tuple[int, int]]:
+    """
+    Recompute the cumulative offsets of a course's sections in one read and
+    at most one bulk update. Returns {section_id: (start, end)}.
+    """
+    sections = list(
+        Section.objects.filter(course_id=course_id).order_by("order", "pk").only(
+            "id", "duration_days", "start_offset_days", "end_offset_days"
+        )
+    )
+    offsets = {}
+    changed = []
+    offset = 0
+    for section in sections:
+        start, offset = offset, offset + section.duration_days
+        offsets[section.pk] = (start, offset)
+        if (section.start_offset_days, section.end_offset_days) != (start, offset):
+            section.start_offset_days, section.end_offset_days = start, offset
+            changed.append(section)
+    if changed:
+        Section.objects.bulk_update(changed, ["start_offset_days", "end_offset_days"])
+    return offsets
+
+
+def get_section_deadlines(
+    user: User, course: Course
+) -> Tuple[Tuple[SectionOutline, Optional[datetime]], ...]:
+    """
+    Every section of the course with the user's deadline for it, in outline
+    order. Uses the cached outline and the request's UserCourseLoader, so
+    repeated calls while rendering a page cost no further queries.
+    """
+    enrollment = get_user_course_loader(user).enrollment(course) if user.is_authenticated else None
+    start_date = enrollment.enrolled_at if enrollment else course.opening_date
+    outline = get_course_outline(course)
+    return tuple(zip(outline.sections, outline.section_deadlines(start_date)))
+
+
+def get_sections_due_soon(days: int = 3, now: Optional[datetime] = None) -> List[DueSection]:
+    """
+    Sections whose deadline falls within the next `days` days, for every
+    unfinished enrollment in an active course.
+
+    Each deadline is enrolled_at + end_offset_days, so it falls in the window
+    exactly when enrolled_at falls in the window shifted back by the offset.
+    Courses are grouped by offset and matched with one range condition per
+    distinct offset, which the (course, enrolled_at) index answers without
+    scanning every enrollment. Two queries in total.
+    """
+    now = now or timezone.now()
+    until = now + timedelta(days=days)
+
+    sections_by_course: Dict[int, List[Tuple[int, int]]] = {}
+    courses_by_offset: Dict[int, Set[int]] = {}
+    for section_id, course_id, offset in Section.objects.filter(course__is_active=True).values_list(
+        "id", "course_id", "end_offset_days"
+    ):
+        sections_by_course.setdefault(course_id, []).append((section_id, offset))
+        courses_by_offset.setdefault(offset, set()).add(course_id)
+    if not courses_by_offset:
+        return []
+
+    window = Q()
+    for offset, course_ids in courses_by_offset.items():
+        shift = timedelta(days=offset)
+        window |= Q(course_id__in=course_ids, enrolled_at__gt=now - shift, enrolled_at__lte=until - shift)
+
+    due = []
+    enrollments = Enrollment.objects.filter(window, is_completed=False).order_by().values_list(
+        "user_id", "course_id", "enrolled_at"
+    )
+    for user_id, course_id, enrolled_at in enrollments.iterator():
+        for section_id, offset in sections_by_course[course_id]:
+            deadline = enrolled_at + timedelta(days=offset)
+            if now < deadline <= until:
+                due.append(DueSection(user_id, course_id, section_id, deadline))
+    due.sort(key=lambda item: item.deadline)
+    return due
@@ -9,6 +9,7 @@ from django.contrib.auth.models import User
 from django.db.models import QuerySet
 
 from ..models import Lesson, Subsection, Course
+from .reorder_service import reorder_course
 
 
 def get_lesson_by_id(lesson_id: int) -> Optional[Lesson]:
@@ -59,9 +60,8 @@ def delete_lesson(lesson: Lesson) -> None:
 
 
 def reorder_lessons(subsection: Subsection, lesson_order: List[int]) -> None:
-    """Reorder lessons in a subsection"""
-    for index, lesson_id in enumerate(lesson_order):
-        Lesson.objects.filter(id=lesson_id, subsection=subsection).update(order=index)
+    """Reorder lessons in a subsection (every lesson of it, in the new order)"""
+    reorder_course(subsection.section.course, lessons={subsection.pk: lesson_order})
 
 
 def get_next_lesson(lesson: Lesson) -> Optional[Lesson]:
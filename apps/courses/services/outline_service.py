@@ -0,0 +1,191 @@
+"""
+Outline Service - Business logic for the Course → Section → Subsection → Lesson tree
+
+The whole tree is loaded in three queries and returned as immutable
+CourseOutline objects with lesson counts, cumulative section offsets and
+effective lock state precomputed. Outlines are cached through the content
+cache, keyed by the course's content_version.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from ..models import Course, Lesson, Section, Subsection
+from .content_cache import read_through
+
+
+@dataclass(frozen=True)
+class LessonOutline:
+    id: int
+    title: str
+    slug: str
+    lesson_type: str
+    order: int
+    is_published: bool
+    is_locked: bool
+    # Locked by itself or by its subsection/section
+    locked: bool
+    video_url: Optional[str]
+    video_duration: Optional[timedelta]
+
+
+@dataclass(frozen=True)
+class SubsectionOutline:
+    id: int
+    title: str
+    description: str
+    order: int
+    is_locked: bool
+    # Locked by itself or by its section
+    locked: bool
+    lessons: Tuple[LessonOutline, ...]
+
+    @property
+    def lesson_count(self) -> int:
+        return len(self.lessons)
+
+    @property
+    def first_lesson(self) -> Optional[LessonOutline]:
+        return self.lessons[0] if self.lessons else None
+
+
+@dataclass(frozen=True)
+class SectionOutline:
+    id: int
+    title: str
+    description: str
+    order: int
+    duration_days: int
+    is_locked: bool
+    # Days from the start date to the beginning / end of this section
+    start_offset_days: int
+    end_offset_days: int
+    subsections: Tuple[SubsectionOutline, ...]
+
+    @property
+    def lessons(self) -> Tuple[LessonOutline, ...]:
+        return tuple(lesson for subsection in self.subsections for lesson in subsection.lessons)
+
+    @property
+    def lesson_count(self) -> int:
+        return sum(subsection.lesson_count for subsection in self.subsections)
+
+    def deadline(self, start_date: Optional[datetime]) -> Optional[datetime]:
+        """Same result as Section.get_deadline for the given start date"""
+        if start_date is None:
+            return None
+        return start_date + timedelta(days=self.end_offset_days)
+
+
+@dataclass(frozen=True)
+class CourseOutline:
+    course_id: int
+    version: int
+    sections: Tuple[SectionOutline, ...]
+
+    @property
+    def section_count(self) -> int:
+        return len(self.sections)
+
+    @property
+    def lesson_count(self) -> int:
+        return sum(section.lesson_count for section in self.sections)
+
+    @property
+    def lessons(self) -> Tuple[LessonOutline, ...]:
+        """Every lesson in course order"""
+        return tuple(lesson for section in self.sections for lesson in section.lessons)
+
+    @property
+    def published_lessons(self) -> Tuple[LessonOutline, ...]:
+        return tuple(lesson for lesson in self.lessons if lesson.is_published)
+
+    def find_lessons(self, slug: str) -> Tuple[Tuple[SectionOutline, SubsectionOutline, LessonOutline], ...]:
+        """Published lessons with the given slug, with their section and subsection"""
+        return tuple(
+            (section, subsection, lesson)
+            for section in self.sections
+            for subsection in section.subsections
+            for lesson in subsection.lessons
+            if lesson.slug == slug and lesson.is_published
+        )
+
+    def section_deadlines(self, start_date: Optional[datetime]) -> Tuple[Optional[datetime], ...]:
+        """Deadline of each section, in outline order"""
+        return tuple(section.deadline(start_date) for section in self.sections)
+
+
+def build_course_outline(course: Course) -> CourseOutline:
+    """Load the course tree from the database in three queries"""
+    lessons_by_subsection: Dict[int, list] = {}
+    lessons = Lesson.objects.filter(subsection__section__course=course).order_by(
+        "order", "pk"
+    ).values_list(
+        "subsection_id", "id", "title", "slug", "lesson_type", "order",
+        "is_published", "is_locked", "video_url", "video_duration",
+    )
+    for subsection_id, *fields in lessons:
+        lessons_by_subsection.setdefault(subsection_id, []).append(fields)
+
+    subsections_by_section: Dict[int, list] = {}
+    subsections = Subsection.objects.filter(section__course=course).order_by(
+        "order", "pk"
+    ).values_list("section_id", "id", "title", "description", "order", "is_locked")
+    for section_id, *fields in subsections:
+        subsections_by_section.setdefault(section_id, []).append(fields)
+
+    sections = []
+    offset = 0
+    for section_id, title, description, order, duration_days, section_locked in Section.objects.filter(
+        course=course
+    ).order_by("order", "pk").values_list(
+        "id", "title", "description", "order", "duration_days", "is_locked"
+    ):
+        subsection_outlines = []
+        for subsection_id, sub_title, sub_description, sub_order, sub_locked in subsections_by_section.get(section_id, []):
+            parent_locked = section_locked or sub_locked
+            subsection_outlines.append(SubsectionOutline(
+                id=subsection_id,
+                title=sub_title,
+                description=sub_description,
+                order=sub_order,
+                is_locked=sub_locked,
+                locked=parent_locked,
+                lessons=tuple(
+                    LessonOutline(
+                        id=lesson_id,
+                        title=lesson_title,
+                        slug=slug,
+                        lesson_type=lesson_type,
+                        order=lesson_order,
+                        is_published=is_published,
+                        is_locked=lesson_locked,
+                        locked=parent_locked or lesson_locked,
+                        video_url=video_url,
+                        video_duration=video_duration,
+                    )
+                    for (lesson_id, lesson_title, slug, lesson_type, lesson_order,
+                         is_published, lesson_locked, video_url, video_duration)
+                    in lessons_by_subsection.get(subsection_id, [])
+                ),
+            ))
+
+        sections.append(SectionOutline(
+            id=section_id,
+            title=title,
+            description=description,
+            order=order,
+            duration_days=duration_days,
+            is_locked=section_locked,
+            start_offset_days=offset,
+            end_offset_days=offset + duration_days,
+            subsections=tuple(subsection_outlines),
+        ))
+        offset += duration_days
+
+    return CourseOutline(course_id=course.pk, version=course.content_version, sections=tuple(sections))
+
+
+def get_course_outline(course: Course) -> CourseOutline:
+    """Return the cached outline for the course's current content version"""
+    return read_through(course, "outline", lambda: build_course_outline(course))
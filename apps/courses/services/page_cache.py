@@ -0,0 +1,190 @@
+"""
+Page Cache Service - Full-page cache for anonymous catalog pages
+
+Anonymous GETs of the home page, course list and course detail are served
+from a rendered copy. The cache key is built from the view, its URL
+arguments, the whitelisted query parameters in sorted order (so tracking
+parameters and parameter order do not split the cache) and a clamped page
+number.
+
+Each cached page belongs to tags ("courses", "categories"). A tag's
+version is part of the key, so invalidate_page_tags() makes every page of
+that tag unreachable at once; the signals in courses/signals.py call it
+when courses or categories change.
+
+Pages are fresh for PAGE_CACHE_TIMEOUT seconds and then served stale for
+up to PAGE_CACHE_STALE_TIMEOUT more while a single request re-renders
+them. Concurrent misses wait for one render (single_flight), so a burst of
+guests on a cold page costs one render.
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import Dict, Iterable, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from DjangoProject.cache import SINGLE_FLIGHT_KEY_PREFIX, single_flight
+
+PAGE_KEY_PREFIX = "page:"
+TAG_KEY_PREFIX = "page-tag:"
+
+
+def _fresh_timeout() -> int:
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 30)
+
+
+def _stale_timeout() -> int:
+    return getattr(settings, "PAGE_CACHE_STALE_TIMEOUT", 300)
+
+
+# ============================================
+# Tags
+# ============================================
+
+
+def get_tag_versions(tags: Sequence[str]) -> Dict[str, int]:
+    keys = {TAG_KEY_PREFIX + tag: tag for tag in tags}
+    versions = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+    for tag in tags:
+        if tag not in versions:
+            cache.add(TAG_KEY_PREFIX + tag, time.time_ns(), None)
+            versions[tag] = cache.get(TAG_KEY_PREFIX + tag)
+    return versions
+
+
+def invalidate_page_tags(*tags: str) -> None:
+    """Drop every cached page of the tags once the current transaction commits"""
+    def bump():
+        cache.set_many({TAG_KEY_PREFIX + tag: time.time_ns() for tag in tags}, None)
+    transaction.on_commit(bump)
+
+
+# ============================================
+# Keys
+# ============================================
+
+
+def normalized_params(request, params: Iterable[str]) -> Optional[str]:
+    """
+    The whitelisted query parameters as a canonical string, or None if the
+    page should not be cached (a page number beyond PAGE_CACHE_MAX_PAGE).
+    Invalid page numbers render page 1, so they share its key.
+    """
+    values = []
+    for name in sorted(params):
+        value = request.GET.get(name, "").strip()
+        if name == "page":
+            page = int(value) if value.isdigit() else 1
+            if page > getattr(settings, "PAGE_CACHE_MAX_PAGE", 20):
+                return None
+            value = "" if page <= 1 else str(page)
+        if value:
+            values.append(f"{name}={value}")
+    return "&".join(values)
+
+
+def page_cache_key(name: str, request, params: Iterable[str], tags: Sequence[str], view_kwargs) -> Optional[str]:
+    query = normalized_params(request, params)
+    if query is None:
+        return None
+    versions = get_tag_versions(tags)
+    raw = repr((sorted(view_kwargs.items()), query, [versions[tag] for tag in tags]))
+    return f"{PAGE_KEY_PREFIX}{name}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+# ============================================
+# Decorator
+# ============================================
+
+
+def _is_cacheable_request(request, bypass_params) -> bool:
+    if request.method not in ("GET", "HEAD"):
+        return False
+    # Visitors with a session may be signed in or have flash messages waiting
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or "messages" in request.COOKIES:
+        return False
+    if any(request.GET.get(name) for name in bypass_params):
+        return False
+    return not request.user.is_authenticated
+
+
+def _entry_for(request, response):
+    """What to store for a response, or None if it must not be shared"""
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        # The page rendered a CSRF token, which is tied to this visitor
+        or request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    ):
+        return None
+    return {"content": response.content, "content_type": response["Content-Type"], "created": time.time()}
+
+
+def _from_entry(entry, status):
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    response["X-Page-Cache"] = status
+    return response
+
+
+def cache_anonymous_page(tags: Sequence[str], params: Iterable[str] = (), bypass_params: Iterable[str] = ()):
+    """
+    Serve the view to anonymous visitors from the page cache.
+
+    tags: what the page shows, for invalidation ("courses", "categories").
+    params: the query parameters the view reads; others are ignored.
+    bypass_params: parameters that disable caching when present (e.g. a
+    free-text search, which would only fill the cache with one-off pages).
+    """
+    params = tuple(params)
+    bypass_params = tuple(bypass_params)
+
+    def decorator(view):
+        name = view.__name__
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _is_cacheable_request(request, bypass_params):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(name, request, params, tags, kwargs)
+            if key is None:
+                return view(request, *args, **kwargs)
+
+            fresh = _fresh_timeout()
+            timeout = fresh + _stale_timeout()
+
+            def render():
+                response = view(request, *args, **kwargs)
+                response["X-Page-Cache"] = "miss"
+                rendered.append(response)
+                return _entry_for(request, response)
+
+            rendered = []
+            entry = cache.get(key)
+            if entry is not None:
+                if time.time() - entry["created"] < fresh:
+                    return _from_entry(entry, "hit")
+                # Stale: one request re-renders, the others keep the stale copy meanwhile
+                lock_key = SINGLE_FLIGHT_KEY_PREFIX + key
+                if not cache.add(lock_key, 1, 30):
+                    return _from_entry(entry, "stale")
+                try:
+                    entry = render()
+                    if entry is not None:
+                        cache.set(key, entry, timeout)
+                finally:
+                    cache.delete(lock_key)
+                return rendered[0]
+
+            entry = single_flight(key, render, timeout)
+            if rendered:
+                return rendered[0]
+            return _from_entry(entry, "hit")
+
+        return wrapped
+
+    return decorator
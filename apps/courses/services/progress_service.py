@@ -3,12 +3,115 @@ Progress Service - Business logic for Progress tracking
 
 This layer contains all business logic for student progress tracking,
 separated from views for better testability and reusability.
+
+Per-course totals live in CourseProgress and are adjusted incrementally with
+single UPDATE statements; refresh_course_progress recomputes a row from the
+Progress table when it is missing.
 """
 from typing import Optional, Dict, Any
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Round
+from django.db.models.lookups import GreaterThan
 from django.utils import timezone
 
-from ..models import Lesson, Progress, Enrollment, Course
+from ..models import Lesson, Progress, Enrollment, Course, CourseProgress, Subsection
+
+
+def lesson_course_id(lesson: Lesson) -> Optional[int]:
+    """Resolve a lesson's course id without loading the intermediate rows"""
+    return Subsection.objects.filter(pk=lesson.subsection_id).values_list(
+        'section__course_id', flat=True
+    ).first()
+
+
+def _percent(completed, total):
+    """SQL expression for the completion percentage, rounded to 2 decimals"""
+    return Case(
+        When(
+            GreaterThan(total, 0),
+            then=Round(Cast(completed, FloatField()) * 100.0 / total, 2),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def refresh_course_progress(user_id: int, course_id: int) -> CourseProgress:
+    """Recompute a user's CourseProgress row from the Progress table"""
+    total = Lesson.objects.filter(subsection__section__course_id=course_id).count()
+    completed = Progress.objects.filter(
+        user_id=user_id,
+        lesson__subsection__section__course_id=course_id,
+        completed=True
+    ).count()
+    last_activity = Progress.objects.filter(
+        user_id=user_id,
+        lesson__subsection__section__course_id=course_id,
+        completed=True
+    ).order_by('-completed_at').values_list('completed_at', flat=True).first()
+
+    course_progress, _ = CourseProgress.objects.update_or_create(
+        user_id=user_id,
+        course_id=course_id,
+        defaults={
+            'completed_lessons': completed,
+            'total_lessons': total,
+            'progress_percent': round(completed / total * 100, 2) if total else 0,
+            'last_activity_at': last_activity,
+        }
+    )
+    return course_progress
+
+
+def bump_course_progress(user_id: int, course_id: int, delta: int) -> None:
+    """Add `delta` completed lessons to a user's course progress in one UPDATE"""
+    if not delta or course_id is None:
+        return
+    completed = Greatest(F('completed_lessons') + delta, Value(0))
+    updated = CourseProgress.objects.filter(user_id=user_id, course_id=course_id).update(
+        completed_lessons=completed,
+        progress_percent=_percent(completed, F('total_lessons')),
+        last_activity_at=timezone.now(),
+    )
+    if not updated:
+        refresh_course_progress(user_id, course_id)
+
+
+def adjust_course_lesson_total(course_id: int, delta: int) -> None:
+    """Apply a change in a course's lesson count to every learner's progress row"""
+    if not delta or course_id is None:
+        return
+    total = Greatest(F('total_lessons') + delta, Value(0))
+    CourseProgress.objects.filter(course_id=course_id).update(
+        total_lessons=total,
+        progress_percent=_percent(F('completed_lessons'), total),
+    )
+
+
+def remove_lesson_from_progress(lesson: Lesson, course_id: int) -> None:
+    """Take a lesson that is about to be deleted out of every learner's progress"""
+    if course_id is None:
+        return
+    completed_by = Progress.objects.filter(lesson=lesson, completed=True).values('user_id')
+    completed = Greatest(F('completed_lessons') - 1, Value(0))
+    CourseProgress.objects.filter(course_id=course_id, user_id__in=completed_by).update(
+        completed_lessons=completed,
+        progress_percent=_percent(completed, F('total_lessons')),
+    )
+    adjust_course_lesson_total(course_id, -1)
+
+
+def with_course_progress(enrollments):
+    """Annotate an Enrollment queryset with the learner's CourseProgress counters"""
+    progress = CourseProgress.objects.filter(user_id=OuterRef('user_id'), course_id=OuterRef('course_id'))
+    return enrollments.annotate(
+        completed_lessons=Coalesce(Subquery(progress.values('completed_lessons')[:1]), 0),
+        total_lessons=Coalesce(Subquery(progress.values('total_lessons')[:1]), 0),
+        progress_percent=Coalesce(Subquery(progress.values('progress_percent')[:1]), 0.0),
+        last_activity_at=Subquery(progress.values('last_activity_at')[:1]),
+    )
 
 
 def get_user_lesson_progress(user: User, lesson: Lesson) -> Optional[Progress]:
@@ -18,26 +121,34 @@ def get_user_lesson_progress(user: User, lesson: Lesson) -> Optional[Progress]:
 
 def mark_lesson_completed(user: User, lesson: Lesson) -> Progress:
     """Mark a lesson as completed for user"""
-    progress, created = Progress.objects.get_or_create(
-        user=user,
-        lesson=lesson,
-        defaults={'completed': True, 'completed_at': timezone.now()}
-    )
-
-    if not created and not progress.completed:
-        progress.completed = True
-        progress.completed_at = timezone.now()
-        progress.save()
+    with transaction.atomic():
+        progress, created = Progress.objects.get_or_create(
+            user=user,
+            lesson=lesson,
+            defaults={'completed': True, 'completed_at': timezone.now()}
+        )
+
+        if not created and not progress.completed:
+            # Conditional UPDATE so concurrent requests only count the lesson once
+            now = timezone.now()
+            if Progress.objects.filter(pk=progress.pk, completed=False).update(
+                completed=True, completed_at=now
+            ):
+                bump_course_progress(user.pk, lesson_course_id(lesson), 1)
+            progress.completed = True
+            progress.completed_at = now
 
     return progress
 
 
 def mark_lesson_incomplete(user: User, lesson: Lesson) -> None:
     """Mark a lesson as incomplete for user"""
-    Progress.objects.filter(user=user, lesson=lesson).update(
-        completed=False,
-        completed_at=None
-    )
+    with transaction.atomic():
+        if Progress.objects.filter(user=user, lesson=lesson, completed=True).update(
+            completed=False,
+            completed_at=None
+        ):
+            bump_course_progress(user.pk, lesson_course_id(lesson), -1)
 
 
 def is_lesson_completed(user: User, lesson: Lesson) -> bool:
@@ -50,10 +161,12 @@ def is_lesson_completed(user: User, lesson: Lesson) -> bool:
 
 
 def get_course_progress(user: User, course: Course) -> Dict[str, Any]:
-    """Calculate overall course progress for user"""
-    total_lessons = Lesson.objects.filter(subsection__section__course=course).count()
+    """Get overall course progress for user"""
+    course_progress = CourseProgress.objects.filter(user=user, course=course).first()
+    if course_progress is None:
+        course_progress = refresh_course_progress(user.pk, course.pk)
 
-    if total_lessons == 0:
+    if course_progress.total_lessons == 0:
         return {
             'total_lessons': 0,
             'completed_lessons': 0,
@@ -61,14 +174,7 @@ def get_course_progress(user: User, course: Course) -> Dict[str, Any]:
             'is_completed': False
         }
 
-    completed_lessons = Progress.objects.filter(
-        user=user,
-        lesson__subsection__section__course=course,
-        completed=True
-    ).count()
-
-    progress_percent = round((completed_lessons / total_lessons) * 100, 2)
-    is_completed = progress_percent == 100
+    is_completed = course_progress.is_completed
 
     if is_completed:
         enrollment = Enrollment.objects.filter(user=user, course=course).first()
@@ -77,8 +183,8 @@ def get_course_progress(user: User, course: Course) -> Dict[str, Any]:
             enrollment.save()
 
     return {
-        'total_lessons': total_lessons,
-        'completed_lessons': completed_lessons,
-        'progress_percent': progress_percent,
+        'total_lessons': course_progress.total_lessons,
+        'completed_lessons': course_progress.completed_lessons,
+        'progress_percent': course_progress.progress_percent,
         'is_completed': is_completed
     }
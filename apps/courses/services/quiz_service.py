@@ -3,56 +3,355 @@ Quiz Service - Business logic for Quiz grading and attempts
 
 This layer contains all business logic for Quiz management,
 separated from views for better testability and reusability.
+
+Grading works from an AnswerKey: the quiz's questions with the ids of their
+answers and correct answers as frozensets, loaded in two queries and cached
+per course content version. Submissions are graded in memory against the key
+and the selected answers are stored with bulk operations.
 """
-from typing import Dict, Any, List
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Any, Callable, FrozenSet, Iterable, List, Mapping, Optional, Tuple
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.utils import timezone
 
-from ..models import Lesson, Quiz, Question, Answer, QuizAttempt, UserAnswer
+from ..models import Course, Lesson, Quiz, Question, Answer, QuizAttempt, UserAnswer
+from .content_cache import read_through
 
+# Question types graded automatically; essay answers are not scored
+AUTO_GRADED_TYPES = ('single', 'multiple')
+
+Selections = Dict[int, FrozenSet[int]]
+
+
+# ============================================
+# Answer keys
+# ============================================
+
+
+@dataclass(frozen=True)
+class QuestionKey:
+    id: int
+    question_type: str
+    points: int
+    answer_ids: FrozenSet[int]
+    correct_ids: FrozenSet[int]
+
+    @property
+    def is_auto_graded(self) -> bool:
+        return self.question_type in AUTO_GRADED_TYPES
+
+    def is_correct(self, selected: FrozenSet[int]) -> bool:
+        """Single choice needs one correct answer, multiple choice exactly the correct set"""
+        if not selected:
+            return False
+        if self.question_type == 'single':
+            return len(selected) == 1 and selected <= self.correct_ids
+        return selected == self.correct_ids
+
+
+@dataclass(frozen=True)
+class QuestionResult:
+    question_id: int
+    selected: FrozenSet[int]
+    correct: bool
+    points: int
+
+    @property
+    def earned(self) -> int:
+        return self.points if self.correct else 0
 
-def grade_quiz_attempt(
-    quiz_attempt: QuizAttempt,
-    answers: Dict[int, List[int]]
-) -> Dict[str, Any]:
-    """Grade a quiz attempt with user answers"""
-    quiz = quiz_attempt.lesson.quiz
-    total_points = 0
-    earned_points = 0
-    results = []
 
-    for question in quiz.questions.all():
-        total_points += question.points
+@dataclass(frozen=True)
+class QuizGrade:
+    earned_points: int
+    total_points: int
+    results: Tuple[QuestionResult, ...]
 
-        user_answer_ids = answers.get(question.id, [])
-        correct_answer_ids = list(question.answers.filter(is_correct=True).values_list('id', flat=True))
+    @property
+    def score(self) -> float:
+        """Percentage of the auto-graded points earned"""
+        return (self.earned_points / self.total_points) * 100 if self.total_points > 0 else 0
 
-        is_correct = sorted(user_answer_ids) == sorted(correct_answer_ids)
+    def check_results(self) -> Dict[int, Dict[str, Any]]:
+        """Per-question feedback for the answered questions, as shown by lesson_detail"""
+        return {
+            result.question_id: {'selected': sorted(result.selected), 'correct': result.correct}
+            for result in self.results if result.selected
+        }
 
+
+@dataclass(frozen=True)
+class AnswerKey:
+    quiz_id: int
+    questions: Tuple[QuestionKey, ...]
+
+    @property
+    def total_points(self) -> int:
+        return sum(question.points for question in self.questions if question.is_auto_graded)
+
+    def clean(self, answers: Mapping[Any, Iterable[Any]]) -> Selections:
+        """
+        Normalize raw submitted answers ({question_id: [answer_ids]}, keys and
+        ids may be strings) to the answers that belong to each question.
+        Unknown questions, foreign answer ids and empty selections are dropped.
+        """
+        raw = {}
+        for question_id, answer_ids in answers.items():
+            try:
+                raw[int(question_id)] = {int(answer_id) for answer_id in answer_ids}
+            except (TypeError, ValueError):
+                continue
+
+        selections = {}
+        for question in self.questions:
+            selected = frozenset(raw.get(question.id, ())) & question.answer_ids
+            if selected and question.is_auto_graded:
+                if question.question_type == 'single' and len(selected) > 1:
+                    continue
+                selections[question.id] = selected
+        return selections
+
+    def is_valid(self, selections: Selections) -> bool:
+        """True if every selected answer belongs to its question"""
+        by_id = {question.id: question for question in self.questions}
+        return all(
+            question_id in by_id and selected <= by_id[question_id].answer_ids
+            for question_id, selected in selections.items()
+        )
+
+    def grade(self, selections: Selections) -> QuizGrade:
+        results = []
+        for question in self.questions:
+            if not question.is_auto_graded:
+                continue
+            selected = selections.get(question.id, frozenset())
+            results.append(QuestionResult(
+                question_id=question.id,
+                selected=selected,
+                correct=question.is_correct(selected),
+                points=question.points,
+            ))
+        return QuizGrade(
+            earned_points=sum(result.earned for result in results),
+            total_points=self.total_points,
+            results=tuple(results),
+        )
+
+
+def build_answer_key(lesson_id: int) -> Optional[AnswerKey]:
+    """Load the answer key of a lesson's quiz in two queries; None if it has no quiz"""
+    questions = list(
+        Question.objects.filter(quiz__lesson_id=lesson_id)
+        .order_by('order', 'id')
+        .values_list('id', 'quiz_id', 'question_type', 'points')
+    )
+    if not questions:
+        quiz_id = Quiz.objects.filter(lesson_id=lesson_id).values_list('id', flat=True).first()
+        return AnswerKey(quiz_id=quiz_id, questions=()) if quiz_id is not None else None
+
+    answer_ids = {question_id: set() for question_id, *_ in questions}
+    correct_ids = {question_id: set() for question_id, *_ in questions}
+    for question_id, answer_id, is_correct in Answer.objects.filter(
+        question__quiz__lesson_id=lesson_id
+    ).values_list('question_id', 'id', 'is_correct'):
+        answer_ids[question_id].add(answer_id)
         if is_correct:
-            earned_points += question.points
+            correct_ids[question_id].add(answer_id)
+
+    return AnswerKey(
+        quiz_id=questions[0][1],
+        questions=tuple(
+            QuestionKey(
+                id=question_id,
+                question_type=question_type,
+                points=points,
+                answer_ids=frozenset(answer_ids[question_id]),
+                correct_ids=frozenset(correct_ids[question_id]),
+            )
+            for question_id, _, question_type, points in questions
+        ),
+    )
+
+
+def get_answer_key(course: Course, lesson_id: int) -> Optional[AnswerKey]:
+    """The cached answer key of a lesson's quiz; edits to the quiz bump the content version"""
+    return read_through(course, "answer-key", lambda: build_answer_key(lesson_id), lesson_id)
 
-        results.append({
-            'question_id': question.id,
-            'correct': is_correct,
-            'points': question.points,
-            'earned': question.points if is_correct else 0
-        })
 
-    score = (earned_points / total_points) * 100 if total_points > 0 else 0
+# ============================================
+# Stored answers
+# ============================================
 
-    quiz_attempt.score = score
-    quiz_attempt.completed_at = timezone.now()
-    quiz_attempt.save()
 
+def save_attempt_answers(quiz_attempt: QuizAttempt, selections: Selections) -> None:
+    """
+    Store the selected answers of the given questions, replacing what the
+    attempt had saved for them before. Uses a fixed number of bulk queries
+    regardless of how many questions are answered.
+    """
+    if not selections:
+        return
+    through = UserAnswer.selected_answers.through
+    question_ids = list(selections)
+
+    with transaction.atomic():
+        existing = dict(
+            UserAnswer.objects.filter(quiz_attempt=quiz_attempt, question_id__in=question_ids)
+            .values_list('question_id', 'id')
+        )
+        missing = [question_id for question_id in question_ids if question_id not in existing]
+        if missing:
+            UserAnswer.objects.bulk_create(
+                [UserAnswer(quiz_attempt=quiz_attempt, question_id=question_id) for question_id in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(
+                UserAnswer.objects.filter(quiz_attempt=quiz_attempt, question_id__in=missing)
+                .values_list('question_id', 'id')
+            )
+
+        through.objects.filter(useranswer_id__in=existing.values()).delete()
+        through.objects.bulk_create([
+            through(useranswer_id=existing[question_id], answer_id=answer_id)
+            for question_id, selected in selections.items()
+            for answer_id in selected
+        ])
+
+
+def load_attempt_answers(quiz_attempt: QuizAttempt) -> Selections:
+    """The answers stored for an attempt, in one query"""
+    selections = {}
+    through = UserAnswer.selected_answers.through
+    for question_id, answer_id in through.objects.filter(
+        useranswer__quiz_attempt=quiz_attempt
+    ).values_list('useranswer__question_id', 'answer_id'):
+        selections.setdefault(question_id, set()).add(answer_id)
+    return {question_id: frozenset(selected) for question_id, selected in selections.items()}
+
+
+def _load_answers_for_attempts(attempt_ids: List[int]) -> Dict[int, Selections]:
+    """Stored answers of many attempts in one query: {attempt_id: selections}"""
+    grouped = {attempt_id: {} for attempt_id in attempt_ids}
+    through = UserAnswer.selected_answers.through
+    for attempt_id, question_id, answer_id in through.objects.filter(
+        useranswer__quiz_attempt_id__in=attempt_ids
+    ).values_list('useranswer__quiz_attempt_id', 'useranswer__question_id', 'answer_id'):
+        grouped[attempt_id].setdefault(question_id, set()).add(answer_id)
     return {
-        'score': round(score, 2),
-        'total_points': total_points,
-        'earned_points': earned_points,
-        'results': results
+        attempt_id: {question_id: frozenset(selected) for question_id, selected in selections.items()}
+        for attempt_id, selections in grouped.items()
     }
 
 
+# ============================================
+# Attempts
+# ============================================
+
+
+def grade_quiz_attempt(
+    quiz_attempt: QuizAttempt,
+    answers: Mapping[Any, Iterable[Any]],
+    answer_key: Optional[AnswerKey] = None
+) -> Dict[str, Any]:
+    """Store a submission's answers, grade it and complete the attempt"""
+    if answer_key is None:
+        answer_key = build_answer_key(quiz_attempt.lesson_id)
+    selections = answer_key.clean(answers)
+    grade = answer_key.grade(selections)
+
+    with transaction.atomic():
+        save_attempt_answers(quiz_attempt, selections)
+        quiz_attempt.score = grade.score
+        quiz_attempt.completed_at = timezone.now()
+        quiz_attempt.save()
+
+    return {
+        'score': round(grade.score, 2),
+        'total_points': grade.total_points,
+        'earned_points': grade.earned_points,
+        'results': [
+            {
+                'question_id': result.question_id,
+                'correct': result.correct,
+                'points': result.points,
+                'earned': result.earned,
+            }
+            for result in grade.results
+        ]
+    }
+
+
+@dataclass(frozen=True)
+class RegradeResult:
+    attempts: int
+    updated: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Attempts regraded per second"""
+        return self.attempts / self.seconds if self.seconds > 0 else float(self.attempts)
+
+
+def regrade_quiz_attempts(
+    quiz_id: Optional[int] = None,
+    lesson_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    batch_size: int = 1000,
+    on_batch: Optional[Callable[[RegradeResult], None]] = None
+) -> RegradeResult:
+    """
+    Recompute the score of every completed attempt of a quiz, a lesson or all
+    quizzes of a course from the stored UserAnswer selections.
+
+    Attempts are streamed in primary key order, batch_size at a time; each
+    batch costs two reads plus one bulk_update of the scores that changed.
+    on_batch, if given, receives the running totals after every batch.
+    """
+    lessons = Lesson.objects.filter(lesson_type='quiz')
+    if quiz_id is not None:
+        lessons = lessons.filter(quiz__id=quiz_id)
+    if lesson_id is not None:
+        lessons = lessons.filter(pk=lesson_id)
+    if course_id is not None:
+        lessons = lessons.filter(subsection__section__course_id=course_id)
+    answer_keys = {pk: build_answer_key(pk) for pk in lessons.values_list('pk', flat=True)}
+    answer_keys = {pk: key for pk, key in answer_keys.items() if key is not None}
+
+    started = time.monotonic()
+    attempts = updated = 0
+    last_id = 0
+    while answer_keys:
+        batch = list(
+            QuizAttempt.objects.filter(
+                lesson_id__in=answer_keys, completed_at__isnull=False, pk__gt=last_id
+            ).order_by('pk').values_list('pk', 'lesson_id', 'score')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        answers = _load_answers_for_attempts([attempt_id for attempt_id, _, _ in batch])
+        changed = []
+        for attempt_id, attempt_lesson_id, old_score in batch:
+            grade = answer_keys[attempt_lesson_id].grade(answers[attempt_id])
+            score = Decimal(str(round(grade.score, 2)))
+            if old_score is None or old_score != score:
+                changed.append(QuizAttempt(pk=attempt_id, score=score))
+        if changed:
+            QuizAttempt.objects.bulk_update(changed, ['score'])
+
+        attempts += len(batch)
+        updated += len(changed)
+        if on_batch is not None:
+            on_batch(RegradeResult(attempts, updated, time.monotonic() - started))
+
+    return RegradeResult(attempts, updated, time.monotonic() - started)
+
+
 def create_quiz_attempt(user: User, lesson: Lesson) -> QuizAttempt:
     """Create a new quiz attempt for user"""
     last_attempt = QuizAttempt.objects.filter(user=user, lesson=lesson).order_by('-attempt_number').first()
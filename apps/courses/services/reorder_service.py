@@ -0,0 +1,145 @@
+"""
+Reorder Service - Business logic for drag-and-drop ordering of course content
+
+reorder_course() applies a new order for any mix of sections, subsections
+and lessons of one course, including moves into another section or
+subsection. The whole change is validated first and then written inside a
+single transaction with one bulk UPDATE (CASE WHEN) per level, after which
+section deadlines are recomputed and the content version bumped once.
+"""
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from ..models import Course, Lesson, Question, Quiz, Section, Subsection
+from .content_cache import bump_content_version
+from .deadline_service import refresh_section_offsets
+
+
+def _ids(values: Iterable, label: str) -> List[int]:
+    try:
+        ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid {label} id")
+    if len(set(ids)) != len(ids):
+        raise ValidationError(f"Duplicate {label} ids")
+    return ids
+
+
+def _grouped_ids(groups: Mapping, label: str) -> Dict[int, List[int]]:
+    """{parent_id: [child ids]} with integer ids and no child listed twice"""
+    parents = _ids(groups.keys(), "parent")
+    grouped = {parent: _ids(children, label) for parent, children in zip(parents, groups.values())}
+    _ids([child for children in grouped.values() for child in children], label)
+    return grouped
+
+
+def _plan_moves(
+    grouped: Dict[int, List[int]],
+    parents: Sequence[int],
+    current_parent: Dict[int, int],
+    label: str,
+    parent_label: str,
+) -> Dict[int, tuple]:
+    """
+    Validate one level and return {child_id: (parent_id, order)}.
+
+    Each listed parent must belong to the course and its list is its complete
+    new contents: every child it currently holds must appear in some list.
+    """
+    unknown_parents = set(grouped) - set(parents)
+    if unknown_parents:
+        raise ValidationError(f"Unknown {parent_label} ids: {sorted(unknown_parents)}")
+    listed = {child for children in grouped.values() for child in children}
+    unknown = listed - set(current_parent)
+    if unknown:
+        raise ValidationError(f"Unknown {label} ids: {sorted(unknown)}")
+    missing = {child for child, parent in current_parent.items() if parent in grouped} - listed
+    if missing:
+        raise ValidationError(f"Missing {label} ids: {sorted(missing)}")
+    return {
+        child: (parent, order)
+        for parent, children in grouped.items()
+        for order, child in enumerate(children)
+    }
+
+
+def reorder_course(
+    course: Course,
+    sections: Optional[Sequence] = None,
+    subsections: Optional[Mapping] = None,
+    lessons: Optional[Mapping] = None,
+) -> None:
+    """
+    Reorder a course's outline in one transaction.
+
+    sections: every section id of the course in the new order.
+    subsections: {section_id: [subsection ids]} - the complete new contents
+        of each listed section; ids may come from other sections (a move).
+    lessons: {subsection_id: [lesson ids]} - likewise for subsections.
+
+    Raises ValidationError, before anything is written, if the ids do not
+    belong to the course or a listed parent would lose a child.
+    """
+    section_ids = _ids(sections, "section") if sections is not None else None
+    subsection_groups = _grouped_ids(subsections or {}, "subsection")
+    lesson_groups = _grouped_ids(lessons or {}, "lesson")
+
+    with transaction.atomic():
+        # Serialise concurrent reorders of the same course
+        Course.objects.select_for_update().only("pk").get(pk=course.pk)
+        course_sections = list(Section.objects.filter(course=course).values_list("id", flat=True))
+
+        if section_ids is not None and sorted(section_ids) != sorted(course_sections):
+            raise ValidationError("Section ids must be every section of the course exactly once")
+
+        subsection_parent = dict(
+            Subsection.objects.filter(section__course=course).values_list("id", "section_id")
+        )
+        subsection_moves = _plan_moves(
+            subsection_groups, course_sections, subsection_parent, "subsection", "section"
+        )
+        lesson_moves = {}
+        if lesson_groups:
+            lesson_parent = dict(
+                Lesson.objects.filter(subsection__section__course=course).values_list("id", "subsection_id")
+            )
+            lesson_moves = _plan_moves(
+                lesson_groups, list(subsection_parent), lesson_parent, "lesson", "subsection"
+            )
+
+        if section_ids is not None:
+            Section.objects.bulk_update(
+                [Section(pk=pk, order=order) for order, pk in enumerate(section_ids)], ["order"]
+            )
+        if subsection_moves:
+            Subsection.objects.bulk_update(
+                [Subsection(pk=pk, section_id=parent, order=order) for pk, (parent, order) in subsection_moves.items()],
+                ["section", "order"],
+            )
+        if lesson_moves:
+            Lesson.objects.bulk_update(
+                [Lesson(pk=pk, subsection_id=parent, order=order) for pk, (parent, order) in lesson_moves.items()],
+                ["subsection", "order"],
+            )
+
+        if section_ids is not None:
+            refresh_section_offsets(course.pk)
+        if section_ids is not None or subsection_moves or lesson_moves:
+            bump_content_version(course.pk)
+
+
+def reorder_questions(quiz: Quiz, question_order: Sequence) -> None:
+    """Reorder all questions of a quiz in one statement"""
+    question_ids = _ids(question_order, "question")
+    with transaction.atomic():
+        current = set(Question.objects.filter(quiz=quiz).values_list("id", flat=True))
+        if set(question_ids) != current:
+            raise ValidationError("Question ids must be every question of the quiz exactly once")
+        Question.objects.bulk_update(
+            [Question(pk=pk, order=order) for order, pk in enumerate(question_ids)], ["order"]
+        )
+        bump_content_version(
+            Lesson.objects.filter(quiz=quiz).values_list("subsection__section__course_id", flat=True).first()
+        )
@@ -0,0 +1,349 @@
+"""
+Search Index Service - Pluggable full-text search for courses, lessons and categories
+
+Documents are normalised into SearchDocument rows and kept up to date by the
+signals in courses/signals.py. Two backends are available:
+
+- DatabaseSearchBackend: a tokenized inverted index (SearchPosting) ranked with BM25
+- PostgresSearchBackend: tsvector/GIN matching ranked with ts_rank
+
+The active backend is chosen by settings.SEARCH_BACKEND ('auto', 'database' or
+'postgres'); 'auto' picks PostgreSQL when the default database runs on it.
+"""
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Value, When
+from django.utils.html import strip_tags
+
+from ..models import Category, Course, Lesson, SearchDocument, SearchPosting
+
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERM_LENGTH = 64
+# Query terms at least this long also match index terms that start with them
+PREFIX_MIN_LENGTH = 3
+# Matched ids checked against a candidates queryset per query
+RESTRICT_CHUNK_SIZE = 500
+
+# Relative weight of each document field in the term frequency
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "summary": 1.5,
+    "body": 1.0,
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    object_id: int
+    score: float
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip HTML and fold accents so 'Học' and 'hoc' match"""
+    if not text:
+        return ""
+    text = strip_tags(str(text)).lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into normalised index terms"""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(normalize_text(text))]
+
+
+def get_search_max_results() -> int:
+    return getattr(settings, "SEARCH_MAX_RESULTS", 500)
+
+
+class SearchBackend:
+    """Abstract search backend interface."""
+
+    def index_document(self, doc_type: str, object_id: int, fields: Dict[str, str]) -> SearchDocument:
+        """Store the normalised document; backends extend this with their own structures"""
+        normalized = {name: " ".join(tokenize(fields.get(name))) for name in FIELD_WEIGHTS}
+        length = sum(
+            len(value.split()) * FIELD_WEIGHTS[name] for name, value in normalized.items()
+        )
+        document, _ = SearchDocument.objects.update_or_create(
+            doc_type=doc_type,
+            object_id=object_id,
+            defaults={**normalized, "length": length},
+        )
+        return document
+
+    def remove_document(self, doc_type: str, object_id: int) -> None:
+        SearchDocument.objects.filter(doc_type=doc_type, object_id=object_id).delete()
+
+    def search(self, doc_type: str, query: str, limit: Optional[int] = None, candidates=None) -> List[SearchHit]:
+        """
+        Ranked hits for the query, at most `limit` (SEARCH_MAX_RESULTS by default).
+
+        `candidates` is an optional queryset of the searched model (e.g. with the
+        caller's filters applied); only its rows are returned, so the cap
+        applies after filtering rather than before.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _restrict(object_ids, candidates) -> set:
+        """The object ids that are also rows of the candidates queryset"""
+        object_ids = list(object_ids)
+        allowed = set()
+        for start in range(0, len(object_ids), RESTRICT_CHUNK_SIZE):
+            chunk = object_ids[start:start + RESTRICT_CHUNK_SIZE]
+            allowed.update(candidates.order_by().filter(pk__in=chunk).values_list("pk", flat=True))
+        return allowed
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """Inverted index stored in SearchPosting, ranked with BM25."""
+
+    def index_document(self, doc_type, object_id, fields):
+        with transaction.atomic():
+            document = super().index_document(doc_type, object_id, fields)
+
+            term_weights = defaultdict(float)
+            for name, weight in FIELD_WEIGHTS.items():
+                for term in getattr(document, name).split():
+                    term_weights[term] += weight
+
+            SearchPosting.objects.filter(document=document).delete()
+            SearchPosting.objects.bulk_create([
+                SearchPosting(
+                    document=document,
+                    doc_type=doc_type,
+                    term=term,
+                    object_id=object_id,
+                    weight=weight,
+                    doc_length=document.length,
+                )
+                for term, weight in term_weights.items()
+            ])
+        return document
+
+    def search(self, doc_type, query, limit=None, candidates=None):
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+
+        term_filter = Q()
+        for term in query_terms:
+            if len(term) >= PREFIX_MIN_LENGTH:
+                term_filter |= Q(term__startswith=term)
+            else:
+                term_filter |= Q(term=term)
+
+        postings = SearchPosting.objects.filter(term_filter, doc_type=doc_type).values_list(
+            "object_id", "term", "weight", "doc_length"
+        )
+
+        # Group postings per query term; a prefix term may expand to several index terms
+        tf = {term: defaultdict(float) for term in query_terms}
+        doc_lengths = {}
+        for object_id, index_term, weight, doc_length in postings:
+            doc_lengths[object_id] = doc_length
+            for term in query_terms:
+                if index_term == term or (
+                    len(term) >= PREFIX_MIN_LENGTH and index_term.startswith(term)
+                ):
+                    tf[term][object_id] += weight
+
+        # Every query term must match (AND semantics)
+        matches = None
+        for term in query_terms:
+            matched = set(tf[term])
+            matches = matched if matches is None else matches & matched
+        if matches and candidates is not None:
+            matches = self._restrict(matches, candidates)
+        if not matches:
+            return []
+
+        stats = SearchDocument.objects.filter(doc_type=doc_type).aggregate(
+            total=Count("id"), avg_length=Avg("length")
+        )
+        total_docs = stats["total"] or 1
+        avg_length = stats["avg_length"] or 1.0
+
+        scores = defaultdict(float)
+        for term in query_terms:
+            doc_freq = len(tf[term])
+            idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for object_id in matches:
+                freq = tf[term][object_id]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[object_id] / avg_length)
+                scores[object_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        limit = limit or get_search_max_results()
+        return [SearchHit(object_id, round(score, 4)) for object_id, score in ranked[:limit]]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector column with a GIN index, ranked with ts_rank."""
+
+    config = "simple"
+
+    def index_document(self, doc_type, object_id, fields):
+        from django.contrib.postgres.search import SearchVector
+
+        document = super().index_document(doc_type, object_id, fields)
+        SearchDocument.objects.filter(pk=document.pk).update(
+            search_vector=(
+                SearchVector("title", weight="A", config=self.config)
+                + SearchVector("summary", weight="B", config=self.config)
+                + SearchVector("body", weight="C", config=self.config)
+            )
+        )
+        return document
+
+    def search(self, doc_type, query, limit=None, candidates=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+
+        # Terms are plain \w+ tokens, so they are safe to splice into a raw tsquery
+        raw_query = " & ".join(
+            f"{term}:*" if len(term) >= PREFIX_MIN_LENGTH else term for term in query_terms
+        )
+        ts_query = SearchQuery(raw_query, search_type="raw", config=self.config)
+        limit = limit or get_search_max_results()
+
+        documents = SearchDocument.objects.filter(doc_type=doc_type, search_vector=ts_query)
+        if candidates is not None:
+            documents = documents.filter(object_id__in=candidates.order_by().values("pk"))
+        rows = (
+            documents
+            .annotate(rank=SearchRank(F("search_vector"), ts_query))
+            .order_by("-rank", "object_id")
+            .values_list("object_id", "rank")[:limit]
+        )
+        return [SearchHit(object_id, round(rank, 4)) for object_id, rank in rows]
+
+
+def get_search_backend(name: Optional[str] = None) -> SearchBackend:
+    """Factory returning the configured search backend."""
+    backend = (name or getattr(settings, "SEARCH_BACKEND", "auto")).lower()
+    if backend == "auto":
+        backend = "postgres" if connection.vendor == "postgresql" else "database"
+    if backend == "postgres":
+        return PostgresSearchBackend()
+    return DatabaseSearchBackend()
+
+
+# ============================================
+# Document builders
+# ============================================
+
+
+def _course_fields(course: Course) -> Dict[str, str]:
+    instructor = course.instructor
+    return {
+        "title": course.title,
+        "summary": " ".join(filter(None, [
+            course.short_description,
+            instructor.username,
+            instructor.first_name,
+            instructor.last_name,
+            course.category.name,
+        ])),
+        "body": course.description,
+    }
+
+
+def _lesson_fields(lesson: Lesson) -> Dict[str, str]:
+    return {"title": lesson.title, "summary": "", "body": lesson.content}
+
+
+def _category_fields(category: Category) -> Dict[str, str]:
+    return {"title": category.name, "summary": "", "body": category.description}
+
+
+def index_course(course: Course) -> None:
+    get_search_backend().index_document(SearchDocument.COURSE, course.pk, _course_fields(course))
+
+
+def index_lesson(lesson: Lesson) -> None:
+    get_search_backend().index_document(SearchDocument.LESSON, lesson.pk, _lesson_fields(lesson))
+
+
+def index_category(category: Category) -> None:
+    get_search_backend().index_document(SearchDocument.CATEGORY, category.pk, _category_fields(category))
+
+
+def remove_from_index(doc_type: str, object_id: int) -> None:
+    get_search_backend().remove_document(doc_type, object_id)
+
+
+def reindex_courses(courses: Iterable[Course]) -> int:
+    count = 0
+    for course in courses:
+        index_course(course)
+        count += 1
+    return count
+
+
+def rebuild_search_index(batch_size: int = 500) -> Dict[str, int]:
+    """Rebuild every search document from scratch"""
+    SearchDocument.objects.all().delete()
+
+    counts = {
+        SearchDocument.CATEGORY: 0,
+        SearchDocument.COURSE: 0,
+        SearchDocument.LESSON: 0,
+    }
+    for category in Category.objects.iterator(chunk_size=batch_size):
+        index_category(category)
+        counts[SearchDocument.CATEGORY] += 1
+
+    courses = Course.objects.select_related("instructor", "category")
+    counts[SearchDocument.COURSE] = reindex_courses(courses.iterator(chunk_size=batch_size))
+
+    for lesson in Lesson.objects.iterator(chunk_size=batch_size):
+        index_lesson(lesson)
+        counts[SearchDocument.LESSON] += 1
+
+    return counts
+
+
+# ============================================
+# Query helpers
+# ============================================
+
+
+def search_courses(query: str, limit: Optional[int] = None, candidates=None) -> List[SearchHit]:
+    return get_search_backend().search(SearchDocument.COURSE, query, limit, candidates)
+
+
+def search_lessons(query: str, limit: Optional[int] = None, candidates=None) -> List[SearchHit]:
+    return get_search_backend().search(SearchDocument.LESSON, query, limit, candidates)
+
+
+def search_categories(query: str, limit: Optional[int] = None, candidates=None) -> List[SearchHit]:
+    return get_search_backend().search(SearchDocument.CATEGORY, query, limit, candidates)
+
+
+def annotate_relevance(queryset, hits: List[SearchHit]):
+    """Restrict a queryset to the search hits and annotate their score as relevance_score"""
+    scores = {hit.object_id: hit.score for hit in hits}
+    return queryset.filter(pk__in=scores).annotate(
+        relevance_score=Case(
+            *[When(pk=object_id, then=Value(score)) for object_id, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
@@ -1,35 +1,216 @@
-from django.db.models import Count
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max, Min, Sum
 from django.utils import timezone
-from datetime import timedelta
-from ..models import SearchQuery
+from ..models import SearchQuery, SearchQueryDaily
+
+logger = logging.getLogger(__name__)
+
+
+class SearchQueryBuffer:
+    """
+    Write-behind buffer for search query events.
+    Events are kept in memory and written with a single bulk_create once the
+    buffer reaches SEARCH_LOG_BUFFER_SIZE entries or its oldest entry is older
+    than SEARCH_LOG_FLUSH_INTERVAL seconds; a timer flushes an idle worker's
+    entries after that interval. Anything left is flushed at exit.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, entry):
+        interval = getattr(settings, 'SEARCH_LOG_FLUSH_INTERVAL', 10)
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+                self._timer = threading.Timer(interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            self._pending.append(entry)
+            due = (
+                len(self._pending) >= getattr(settings, 'SEARCH_LOG_BUFFER_SIZE', 100)
+                or time.monotonic() - self._oldest >= interval
+            )
+        if due:
+            self.flush()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._oldest = None
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        return pending
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread's database connection is not reused
+            connection.close()
+
+    def clear(self):
+        """Drop pending entries without writing them"""
+        self._take()
+
+    def flush(self):
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            with transaction.atomic():
+                SearchQuery.objects.bulk_create(pending, batch_size=500)
+            return len(pending)
+        except IntegrityError:
+            # Usually a user deleted since their search was queued; keep the rest of the batch
+            return self._save_one_by_one(pending)
+        except Exception:
+            # Losing a batch of analytics events must never break a search request
+            logger.exception("Failed to flush %d search queries", len(pending))
+            return 0
+
+    def _save_one_by_one(self, pending):
+        user_ids = {entry.user_id for entry in pending if entry.user_id is not None}
+        existing = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        saved = 0
+        for entry in pending:
+            if entry.user_id is not None and entry.user_id not in existing:
+                entry.user = None
+            try:
+                with transaction.atomic():
+                    SearchQuery.objects.bulk_create([entry])
+                saved += 1
+            except Exception:
+                logger.exception("Failed to save search query %r", entry.query)
+        return saved
+
+search_log_buffer = SearchQueryBuffer()
+atexit.register(search_log_buffer.flush)
+
 
 def log_search_query(query, user=None):
     """
-    Log a search query to the database.
-    Query is automatically lowercased and stripped in the model save method.
+    Queue a search query for logging, stamped with the time of the search.
+    Returns the normalised, not yet saved SearchQuery, or None if the query is ignored.
+    bulk_create skips SearchQuery.save(), so normalisation happens here.
     """
     if not query:
         return None
-        
-    query = query.strip()
+
+    query = query.lower().strip()
     if len(query) < 2:  # Don't log very short queries
         return None
 
-    # Optional: Don't log if same user searched same thing recently (e.g. last 1 minute)
-    # to avoid spamming DB with same query refreshes
-    # But for now, simple implementation
-    
-    return SearchQuery.objects.create(query=query, user=user)
+    entry = SearchQuery(query=query[:255], user=user, created_at=timezone.now())
+    search_log_buffer.add(entry)
+    return entry
+
+
+def flush_search_log():
+    """Write any buffered search queries to the database"""
+    return search_log_buffer.flush()
+
+
+def rollup_search_queries(until=None, retention_days=None):
+    """
+    Aggregate raw SearchQuery rows into SearchQueryDaily, one complete day at a time.
+    Re-running is safe: counts for a day are overwritten, not added to.
+    Raw rows older than `retention_days` that have been rolled up are deleted.
+    Returns the number of days rolled up.
+    """
+    until = until or timezone.localdate()
+    last_day = SearchQueryDaily.objects.aggregate(last=Max('day'))['last']
+    if last_day is not None:
+        start_day = last_day + timedelta(days=1)
+    else:
+        first = SearchQuery.objects.aggregate(first=Min('created_at'))['first']
+        if first is None:
+            return 0
+        start_day = timezone.localtime(first).date()
+
+    days = 0
+    day = start_day
+    while day < until:
+        counts = SearchQuery.objects.filter(
+            created_at__gte=_day_start(day),
+            created_at__lt=_day_start(day + timedelta(days=1)),
+        ).values('query').annotate(count=Count('id')).order_by()
+
+        SearchQueryDaily.objects.bulk_create(
+            [SearchQueryDaily(query=row['query'], day=day, count=row['count']) for row in counts],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['query', 'day'],
+            update_fields=['count'],
+        )
+        days += 1
+        day += timedelta(days=1)
+
+    if retention_days is None:
+        retention_days = getattr(settings, 'SEARCH_LOG_RETENTION_DAYS', 90)
+    if retention_days:
+        rolled_until = _day_start(min(until, timezone.localdate() - timedelta(days=retention_days)))
+        SearchQuery.objects.filter(created_at__lt=rolled_until).delete()
+
+    return days
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
 
 def get_popular_search_terms(days=30, limit=10):
     """
     Get popular search terms from the last `days` days.
     Returns a list of dictionaries with 'query' and 'count'.
+
+    Complete days come from the SearchQueryDaily rollup; raw rows are only
+    read for the days after the last rollup.
     """
     start_date = timezone.now() - timedelta(days=days)
-    
-    return SearchQuery.objects.filter(
-        created_at__gte=start_date
-    ).values('query').annotate(
-        count=Count('query')
-    ).order_by('-count')[:limit]
+    start_day = timezone.localtime(start_date).date()
+
+    last_day = SearchQueryDaily.objects.aggregate(last=Max('day'))['last']
+    if last_day is None or last_day < start_day:
+        raw_since = start_date
+    else:
+        raw_since = _day_start(last_day + timedelta(days=1))
+
+    tail = Counter(dict(
+        SearchQuery.objects.filter(created_at__gte=raw_since)
+        .values('query').annotate(count=Count('id')).order_by()
+        .values_list('query', 'count')
+    ))
+
+    totals = Counter()
+    if last_day is not None and last_day >= start_day:
+        daily = SearchQueryDaily.objects.filter(day__gte=start_day, day__lte=last_day)
+        # The top `limit` rolled-up queries plus the rolled-up counts of anything
+        # seen since give an exact top `limit` for the whole window
+        top = daily.values('query').annotate(count=Sum('count')).order_by('-count', 'query')[:limit]
+        totals.update({row['query']: row['count'] for row in top})
+        if tail:
+            totals.update(dict(
+                daily.filter(query__in=list(tail)).exclude(query__in=list(totals))
+                .values('query').annotate(count=Sum('count')).values_list('query', 'count')
+            ))
+    totals.update(tail)
+
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'query': query, 'count': count} for query, count in ranked]
@@ -0,0 +1,138 @@
+"""
+Stats Service - Business logic for denormalised course and category counters
+
+CourseStats/CategoryStats rows are adjusted with F() expressions by the
+signals in courses/signals.py, so concurrent writers never lose updates.
+rebuild_course_stats/rebuild_category_stats recompute them in bulk from the
+source tables and are used by the rebuild_course_stats command.
+"""
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from ..models import (
+    Category,
+    CategoryStats,
+    Course,
+    CourseStats,
+    Enrollment,
+    Lesson,
+    Section,
+)
+
+
+def adjust_course_stats(course_id: int, **deltas: int) -> None:
+    """Add deltas to a course's counters, e.g. adjust_course_stats(1, enrollment_count=1)"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    CourseStats.objects.filter(pk=course_id).update(updated_at=timezone.now(), **changes)
+
+
+def adjust_category_stats(category_id: int, **deltas: int) -> None:
+    """Add deltas to a category's counters"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    CategoryStats.objects.filter(pk=category_id).update(updated_at=timezone.now(), **changes)
+
+
+def _grouped_counts(queryset, key: str) -> Dict[int, int]:
+    return dict(queryset.values_list(key).annotate(count=Count("pk")).order_by())
+
+
+def rebuild_course_stats(course_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Recompute CourseStats from the source tables. Returns the number of rows written."""
+    courses = Course.objects.all()
+    enrollments = Enrollment.objects.all()
+    sections = Section.objects.all()
+    lessons = Lesson.objects.all()
+    if course_ids is not None:
+        course_ids = list(course_ids)
+        courses = courses.filter(pk__in=course_ids)
+        enrollments = enrollments.filter(course_id__in=course_ids)
+        sections = sections.filter(course_id__in=course_ids)
+        lessons = lessons.filter(subsection__section__course_id__in=course_ids)
+
+    enrollment_counts = _grouped_counts(enrollments, "course_id")
+    completed_counts = _grouped_counts(enrollments.filter(is_completed=True), "course_id")
+    section_counts = _grouped_counts(sections, "course_id")
+    lesson_counts = _grouped_counts(lessons, "subsection__section__course_id")
+
+    now = timezone.now()
+    stats = [
+        CourseStats(
+            course_id=course_id,
+            enrollment_count=enrollment_counts.get(course_id, 0),
+            completed_enrollment_count=completed_counts.get(course_id, 0),
+            section_count=section_counts.get(course_id, 0),
+            lesson_count=lesson_counts.get(course_id, 0),
+            updated_at=now,
+        )
+        for course_id in courses.values_list("pk", flat=True).iterator()
+    ]
+    CourseStats.objects.bulk_create(
+        stats,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["course"],
+        update_fields=[
+            "enrollment_count",
+            "completed_enrollment_count",
+            "section_count",
+            "lesson_count",
+            "updated_at",
+        ],
+    )
+    return len(stats)
+
+
+def rebuild_category_stats(category_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Recompute CategoryStats from the source tables. Returns the number of rows written."""
+    categories = Category.objects.all()
+    courses = Course.objects.all()
+    if category_ids is not None:
+        category_ids = list(category_ids)
+        categories = categories.filter(pk__in=category_ids)
+        courses = courses.filter(category_id__in=category_ids)
+
+    course_counts = _grouped_counts(courses, "category_id")
+    active_counts = _grouped_counts(courses.filter(is_active=True), "category_id")
+
+    now = timezone.now()
+    stats = [
+        CategoryStats(
+            category_id=category_id,
+            course_count=course_counts.get(category_id, 0),
+            active_course_count=active_counts.get(category_id, 0),
+            updated_at=now,
+        )
+        for category_id in categories.values_list("pk", flat=True).iterator()
+    ]
+    CategoryStats.objects.bulk_create(
+        stats,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=["course_count", "active_course_count", "updated_at"],
+    )
+    return len(stats)
+
+
+def get_stats_for_course(course: Course) -> CourseStats:
+    """Return the course's stats row, building it if it is missing"""
+    try:
+        return course.stats
+    except CourseStats.DoesNotExist:
+        rebuild_course_stats([course.pk])
+        return CourseStats.objects.get(pk=course.pk)
+
+
+def get_stats_for_category(category: Category) -> CategoryStats:
+    """Return the category's stats row, building it if it is missing"""
+    try:
+        return category.stats
+    except CategoryStats.DoesNotExist:
+        rebuild_category_stats([category.pk])
+        return CategoryStats.objects.get(pk=category.pk)
@@ -0,0 +1,66 @@
+"""
+User Course Loader - Request-scoped batch loading for template tags
+
+Template filters such as has_certificate or section_deadline are called
+once per course card, so querying inside them costs one query per card.
+UserCourseLoader loads the user's certificates, enrollments and course
+progress the first time any of them is asked for, one query per kind for
+the whole page, and answers every later lookup from memory.
+
+The loader is kept on the user object, which Django creates per request,
+so it lives exactly as long as the request.
+"""
+from typing import Dict, Optional
+
+from django.contrib.auth.models import User
+
+from ..models import Certificate, Course, CourseProgress, Enrollment
+
+LOADER_ATTRIBUTE = "_course_loader"
+
+
+class UserCourseLoader:
+    """Per-course certificates, enrollments and progress of one user"""
+
+    def __init__(self, user: User):
+        self.user = user
+        self._certificates: Optional[Dict[int, Certificate]] = None
+        self._enrollments: Optional[Dict[int, Enrollment]] = None
+        self._progress: Optional[Dict[int, CourseProgress]] = None
+
+    @staticmethod
+    def _course_id(course) -> int:
+        return course if isinstance(course, int) else course.pk
+
+    def _by_course(self, queryset) -> Dict[int, object]:
+        if not self.user.is_authenticated:
+            return {}
+        return {row.course_id: row for row in queryset.filter(user=self.user)}
+
+    def certificate(self, course: Course) -> Optional[Certificate]:
+        if self._certificates is None:
+            self._certificates = self._by_course(Certificate.objects.all())
+        return self._certificates.get(self._course_id(course))
+
+    def enrollment(self, course: Course) -> Optional[Enrollment]:
+        if self._enrollments is None:
+            self._enrollments = self._by_course(Enrollment.objects.all())
+        return self._enrollments.get(self._course_id(course))
+
+    def progress(self, course: Course) -> Optional[CourseProgress]:
+        if self._progress is None:
+            self._progress = self._by_course(CourseProgress.objects.all())
+        return self._progress.get(self._course_id(course))
+
+    def clear(self) -> None:
+        """Forget loaded rows, e.g. after the view changed them"""
+        self._certificates = self._enrollments = self._progress = None
+
+
+def get_user_course_loader(user: User) -> UserCourseLoader:
+    """Return the loader for this request's user, creating it on first use"""
+    loader = getattr(user, LOADER_ATTRIBUTE, None)
+    if loader is None:
+        loader = UserCourseLoader(user)
+        setattr(user, LOADER_ATTRIBUTE, loader)
+    return loader
@@ -0,0 +1,445 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    Category,
+    CategoryStats,
+    Course,
+    CourseStats,
+    Enrollment,
+    Lesson,
+    Progress,
+    Question,
+    Answer,
+    Quiz,
+    SearchDocument,
+    Section,
+    Subsection,
+)
+from .services.search_index import (
+    index_category,
+    index_course,
+    index_lesson,
+    reindex_courses,
+    remove_from_index,
+)
+from .services.stats_service import adjust_category_stats, adjust_course_stats
+from .services.progress_service import (
+    adjust_course_lesson_total,
+    bump_course_progress,
+    lesson_course_id,
+    refresh_course_progress,
+    remove_lesson_from_progress,
+)
+from .services.content_cache import bump_content_version
+from .services.deadline_service import refresh_section_offsets
+from .services.page_cache import invalidate_page_tags
+from .services.autocomplete_service import (
+    category_suggestion,
+    course_suggestion,
+    instructor_suggestion,
+    remove_suggestion,
+    upsert_suggestion,
+)
+
+
+# Instructor fields that are part of a course's search document
+INSTRUCTOR_SEARCH_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_index(sender, instance, **kwargs):
+    remove_from_index(SearchDocument.COURSE, instance.pk)
+
+
+@receiver(post_save, sender=Lesson)
+def index_lesson_on_save(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    index_lesson(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def remove_lesson_from_index(sender, instance, **kwargs):
+    remove_from_index(SearchDocument.LESSON, instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def index_category_on_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    index_category(instance)
+    if not created:
+        # The category name is part of every course document in it
+        reindex_courses(instance.courses.select_related('instructor', 'category'))
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_from_index(sender, instance, **kwargs):
+    remove_from_index(SearchDocument.CATEGORY, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_instructor_courses(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw', False) or created:
+        return
+    if update_fields is not None and not INSTRUCTOR_SEARCH_FIELDS & set(update_fields):
+        # e.g. last_login updates on every sign-in
+        return
+    reindex_courses(instance.courses_created.select_related('instructor', 'category'))
+
+
+# ============================================
+# Autocomplete snapshot
+# ============================================
+
+
+def _instructor_suggestion(user):
+    return instructor_suggestion(user.pk, user.username, user.first_name, user.last_name)
+
+
+@receiver(post_save, sender=Course)
+def update_course_suggestion(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    if instance.is_active:
+        suggestion = course_suggestion(instance.pk, instance.title, instance.slug)
+        instructor = _instructor_suggestion(instance.instructor)
+        transaction.on_commit(lambda: (upsert_suggestion(suggestion), upsert_suggestion(instructor)))
+    else:
+        course_id = instance.pk
+        transaction.on_commit(lambda: remove_suggestion('course', course_id))
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_suggestion(sender, instance, **kwargs):
+    course_id = instance.pk
+    transaction.on_commit(lambda: remove_suggestion('course', course_id))
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestion(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    suggestion = category_suggestion(instance.pk, instance.name)
+    transaction.on_commit(lambda: upsert_suggestion(suggestion))
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestion(sender, instance, **kwargs):
+    category_id = instance.pk
+    transaction.on_commit(lambda: remove_suggestion('category', category_id))
+
+
+@receiver(post_save, sender=User)
+def update_instructor_suggestion(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw', False) or created:
+        return
+    if update_fields is not None and not INSTRUCTOR_SEARCH_FIELDS & set(update_fields):
+        return
+    if instance.courses_created.filter(is_active=True).exists():
+        suggestion = _instructor_suggestion(instance)
+        transaction.on_commit(lambda: upsert_suggestion(suggestion))
+
+
+# ============================================
+# Course / category stats
+# ============================================
+
+
+def _remember_previous(instance, fields):
+    """Stash the stored values of `fields` so post_save can compute deltas"""
+    instance._stats_previous = None
+    if instance.pk:
+        instance._stats_previous = (
+            type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+        )
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_state(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    _remember_previous(instance, ['category_id', 'is_active'])
+
+
+@receiver(post_save, sender=Course)
+def update_stats_on_course_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        CourseStats.objects.get_or_create(course=instance)
+        adjust_category_stats(
+            instance.category_id, course_count=1, active_course_count=int(instance.is_active)
+        )
+        return
+
+    if previous['category_id'] != instance.category_id:
+        adjust_category_stats(
+            previous['category_id'], course_count=-1, active_course_count=-int(previous['is_active'])
+        )
+        adjust_category_stats(
+            instance.category_id, course_count=1, active_course_count=int(instance.is_active)
+        )
+    elif previous['is_active'] != instance.is_active:
+        adjust_category_stats(
+            instance.category_id, active_course_count=1 if instance.is_active else -1
+        )
+
+
+@receiver(post_delete, sender=Course)
+def update_stats_on_course_delete(sender, instance, **kwargs):
+    adjust_category_stats(
+        instance.category_id, course_count=-1, active_course_count=-int(instance.is_active)
+    )
+
+
+@receiver(post_save, sender=Category)
+def create_category_stats(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False) or not created:
+        return
+    CategoryStats.objects.get_or_create(category=instance)
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_state(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    _remember_previous(instance, ['is_completed'])
+
+
+@receiver(post_save, sender=Enrollment)
+def update_stats_on_enrollment_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        adjust_course_stats(
+            instance.course_id,
+            enrollment_count=1,
+            completed_enrollment_count=int(instance.is_completed),
+        )
+        refresh_course_progress(instance.user_id, instance.course_id)
+    elif previous['is_completed'] != instance.is_completed:
+        adjust_course_stats(
+            instance.course_id, completed_enrollment_count=1 if instance.is_completed else -1
+        )
+
+
+@receiver(post_delete, sender=Enrollment)
+def update_stats_on_enrollment_delete(sender, instance, **kwargs):
+    adjust_course_stats(
+        instance.course_id,
+        enrollment_count=-1,
+        completed_enrollment_count=-int(instance.is_completed),
+    )
+
+
+@receiver(post_save, sender=Section)
+def update_stats_on_section_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False) or not created:
+        return
+    adjust_course_stats(instance.course_id, section_count=1)
+
+
+@receiver(post_delete, sender=Section)
+def update_stats_on_section_delete(sender, instance, **kwargs):
+    adjust_course_stats(instance.course_id, section_count=-1)
+
+
+@receiver(post_save, sender=Lesson)
+def update_stats_on_lesson_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False) or not created:
+        return
+    course_id = lesson_course_id(instance)
+    adjust_course_stats(course_id, lesson_count=1)
+    adjust_course_lesson_total(course_id, 1)
+
+
+@receiver(pre_delete, sender=Lesson)
+def remember_lesson_course(sender, instance, **kwargs):
+    # Resolve the course before a cascading delete removes the subsection/section rows
+    instance._stats_course_id = lesson_course_id(instance)
+    # Progress rows are still present here, so completions can be subtracted in bulk
+    remove_lesson_from_progress(instance, instance._stats_course_id)
+
+
+@receiver(post_delete, sender=Lesson)
+def update_stats_on_lesson_delete(sender, instance, **kwargs):
+    course_id = getattr(instance, '_stats_course_id', None)
+    if course_id is not None:
+        adjust_course_stats(course_id, lesson_count=-1)
+
+
+# ============================================
+# Course progress
+# ============================================
+
+
+@receiver(pre_save, sender=Progress)
+def remember_progress_state(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    _remember_previous(instance, ['completed'])
+
+
+@receiver(post_save, sender=Progress)
+def update_course_progress(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    was_completed = bool(previous and previous['completed'])
+    delta = int(instance.completed) - int(was_completed)
+    if delta:
+        bump_course_progress(instance.user_id, lesson_course_id(instance.lesson), delta)
+
+
+# ============================================
+# Course content version
+# ============================================
+
+
+@receiver(post_save, sender=Course)
+def bump_version_on_course_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False) or created:
+        return
+    bump_content_version(instance.pk)
+    # Keep the saved instance usable as a cache key for the rest of the request
+    if Course.stats.is_cached(instance):
+        instance.stats.content_version += 1
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def bump_version_on_section_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    bump_content_version(instance.course_id)
+
+
+# ============================================
+# Section deadlines
+# ============================================
+
+
+@receiver(post_save, sender=Section)
+def refresh_offsets_on_section_save(sender, instance, update_fields=None, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    if update_fields is not None and not {'order', 'duration_days'} & set(update_fields):
+        return
+    offsets = refresh_section_offsets(instance.course_id)
+    instance.start_offset_days, instance.end_offset_days = offsets.get(instance.pk, (0, 0))
+
+
+@receiver(post_delete, sender=Section)
+def refresh_offsets_on_section_delete(sender, instance, **kwargs):
+    refresh_section_offsets(instance.course_id)
+
+
+def _subsection_course_id(subsection):
+    return Section.objects.filter(pk=subsection.section_id).values_list('course_id', flat=True).first()
+
+
+@receiver(pre_delete, sender=Subsection)
+def remember_subsection_course(sender, instance, **kwargs):
+    instance._outline_course_id = _subsection_course_id(instance)
+
+
+@receiver(post_save, sender=Subsection)
+@receiver(post_delete, sender=Subsection)
+def bump_version_on_subsection_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    course_id = getattr(instance, '_outline_course_id', None)
+    if course_id is None:
+        course_id = _subsection_course_id(instance)
+    bump_content_version(course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def bump_version_on_lesson_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    # Deleted lessons had their course resolved in remember_lesson_course
+    course_id = getattr(instance, '_stats_course_id', None)
+    if course_id is None:
+        course_id = lesson_course_id(instance)
+    bump_content_version(course_id)
+
+
+def _lesson_course_id(**lesson_filters):
+    return Lesson.objects.filter(**lesson_filters).values_list(
+        'subsection__section__course_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def bump_version_on_quiz_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False) or instance.lesson_id is None:
+        return
+    bump_content_version(_lesson_course_id(pk=instance.lesson_id))
+
+
+# Cascading deletes remove answers before their question, questions before
+# their quiz and quizzes before their lesson, so the joins below still resolve
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_version_on_question_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    bump_content_version(_lesson_course_id(quiz=instance.quiz_id))
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def bump_version_on_answer_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    bump_content_version(_lesson_course_id(quiz__questions=instance.question_id))
+
+
+# ============================================
+# Anonymous page cache
+# ============================================
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_pages(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    invalidate_page_tags('courses')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    invalidate_page_tags('categories')
+
+
+@receiver(post_save, sender=User)
+def invalidate_instructor_pages(sender, instance, created, update_fields=None, **kwargs):
+    """Course pages show the instructor's name"""
+    if kwargs.get('raw', False) or created:
+        return
+    if update_fields is not None and not INSTRUCTOR_SEARCH_FIELDS & set(update_fields):
+        return
+    if instance.courses_created.exists():
+        invalidate_page_tags('courses')
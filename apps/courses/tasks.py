@@ -24,3 +24,33 @@ def generate_certificate_task(enrollment_id):
     
     logger.info(f"Certificate generation completed for enrollment {enrollment_id}")
     return f"Certificate generated for enrollment {enrollment_id}"
+
+
+@shared_task
+def rollup_search_queries_task():
+    """
+    Roll raw search query rows up into the daily aggregate table.
+    Scheduled nightly via CELERY_BEAT_SCHEDULE.
+    """
+    from .services.search_service import rollup_search_queries
+
+    days = rollup_search_queries()
+    logger.info(f"Rolled up search queries for {days} day(s)")
+    return days
+
+
+@shared_task
+def regrade_quiz_attempts_task(quiz_id=None, lesson_id=None, course_id=None, batch_size=1000):
+    """
+    Recompute stored quiz attempt scores after an instructor fixes an answer key.
+    """
+    from .services.quiz_service import regrade_quiz_attempts
+
+    result = regrade_quiz_attempts(
+        quiz_id=quiz_id, lesson_id=lesson_id, course_id=course_id, batch_size=batch_size
+    )
+    logger.info(
+        f"Regraded {result.attempts} quiz attempts ({result.updated} changed) "
+        f"in {result.seconds:.2f}s ({result.rate:.0f}/s)"
+    )
+    return {"attempts": result.attempts, "updated": result.updated, "seconds": round(result.seconds, 2)}
@@ -1,11 +1,19 @@
 import os
 import re
 from django import template
+from django.conf import settings
+from django.templatetags.cache import CacheNode
 from django.utils import timezone
-from ..models import Certificate, Enrollment
+from ..services.deadline_service import get_section_deadlines
+from ..services.outline_service import get_course_outline
+from ..services.user_course_loader import get_user_course_loader
 
 register = template.Library()
 
+# Certificates, enrollments and progress are read through the request-scoped
+# UserCourseLoader (one query per kind for the whole page) and course structure
+# through the cached outline, so none of these filters query per course card.
+
 @register.filter(name='basename')
 def basename_filter(path):
     return os.path.basename(str(path))
@@ -17,7 +25,7 @@ def has_certificate(user, course):
     """
     if not user.is_authenticated:
         return False
-    return Certificate.objects.filter(user=user, course=course).exists()
+    return get_user_course_loader(user).certificate(course) is not None
 
 @register.filter
 def get_certificate(user, course):
@@ -26,10 +34,7 @@ def get_certificate(user, course):
     """
     if not user.is_authenticated:
         return None
-    try:
-        return Certificate.objects.get(user=user, course=course)
-    except Certificate.DoesNotExist:
-        return None
+    return get_user_course_loader(user).certificate(course)
 
 @register.filter
 def is_course_completed(user, course):
@@ -39,19 +44,8 @@ def is_course_completed(user, course):
     if not user.is_authenticated:
         return False
     
-    # Get all lessons in the course
-    all_lessons = course.sections.values_list('lessons', flat=True)
-    
-    if not all_lessons.exists():
-        return False
-    
-    # Count completed lessons
-    completed_lessons = user.progress_records.filter(
-        lesson__in=all_lessons,
-        completed=True
-    ).count()
-    
-    return completed_lessons == all_lessons.count()
+    course_progress = get_user_course_loader(user).progress(course)
+    return course_progress is not None and course_progress.is_completed
 
 @register.filter
 def is_course_expired(course):
@@ -67,7 +61,7 @@ def course_duration_weeks(course):
     """
     Calculate the total duration of a course in weeks based on section durations
     """
-    total_days = sum(section.duration_days for section in course.sections.all())
+    total_days = sum(section.duration_days for section in get_course_outline(course).sections)
     weeks = total_days / 7.0
     return round(weeks, 1) if weeks % 1 != 0 else int(weeks)
 
@@ -78,12 +72,57 @@ def section_deadline(section, user):
     """
     if not user.is_authenticated:
         return None
-    
-    try:
-        enrollment = Enrollment.objects.get(user=user, course=section.course)
-        return section.get_deadline(enrollment.enrolled_at)
-    except Enrollment.DoesNotExist:
-        return section.get_deadline()
+
+    for section_outline, deadline in get_section_deadlines(user, section.course):
+        if section_outline.id == section.pk:
+            return deadline
+    return None
+
+@register.filter
+def fragment_version(course):
+    """
+    Cache key part that changes whenever the course or its outline is edited,
+    for use as a vary-on argument of {% fragment_cache %}. bump_content_version
+    moves updated_at too, so this needs no extra query for the content version.
+    """
+    return f"{course.pk}.{course.updated_at.timestamp()}"
+
+
+class _FragmentTimeout:
+    """Resolves to TEMPLATE_FRAGMENT_CACHE_TIMEOUT at render time"""
+    var = "TEMPLATE_FRAGMENT_CACHE_TIMEOUT"
+
+    def resolve(self, context):
+        return getattr(settings, self.var, 600)
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """
+    Cache an expensive partial (course card, outline) like {% cache %}, with
+    the timeout taken from settings.
+
+    Usage::
+
+        {% fragment_cache course_card course|fragment_version enrollment.is_completed %}
+            ...
+        {% endfragment_cache %}
+
+    Vary on course|fragment_version plus anything user-specific the partial
+    shows, so edits and per-user state get their own entries.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError("%r tag requires a fragment name." % tokens[0])
+    return CacheNode(
+        nodelist,
+        _FragmentTimeout(),
+        tokens[1],
+        [parser.compile_filter(t) for t in tokens[2:]],
+        None,
+    )
 
 @register.filter
 def youtube_embed_url(url):
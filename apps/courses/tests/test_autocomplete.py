@@ -0,0 +1,103 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.courses.models import Category, Course
+from apps.courses.services.autocomplete_service import (
+    AutocompleteIndex,
+    Suggestion,
+    get_autocomplete_index,
+    get_suggestions,
+    reset_autocomplete_index,
+)
+from apps.courses.services.search_service import flush_search_log, log_search_query, search_log_buffer
+
+User = get_user_model()
+
+
+def make_suggestion(text, suggestion_type='course', object_id=1, weight=1.0):
+    return Suggestion(text=text, type=suggestion_type, id=object_id, url='/', weight=weight)
+
+
+class AutocompleteIndexTests(TestCase):
+    def test_prefix_matches_any_word_start(self):
+        index = AutocompleteIndex([make_suggestion('Django Web Development')])
+        self.assertEqual(len(index.suggest('dja')), 1)
+        self.assertEqual(len(index.suggest('web dev')), 1)
+        self.assertEqual(index.suggest('eb'), [])
+
+    def test_results_are_ranked_by_weight(self):
+        index = AutocompleteIndex([
+            make_suggestion('Python Basics', object_id=1, weight=1.0),
+            make_suggestion('Python Advanced', object_id=2, weight=5.0),
+            make_suggestion('Pyramid', object_id=3, weight=3.0),
+        ])
+        self.assertEqual([s.id for s in index.suggest('py')], [2, 3, 1])
+        self.assertEqual([s.id for s in index.suggest('pyt', limit=1)], [2])
+
+    def test_upsert_and_remove(self):
+        index = AutocompleteIndex([make_suggestion('Python Basics', object_id=1)])
+        index.upsert(make_suggestion('Rust Basics', object_id=1))
+        self.assertEqual(index.suggest('py'), [])
+        self.assertEqual(index.suggest('ru')[0].text, 'Rust Basics')
+
+        index.remove('course:1')
+        self.assertEqual(index.suggest('ru'), [])
+        self.assertEqual(index.suggest('bas'), [])
+
+    def test_stats(self):
+        index = AutocompleteIndex([make_suggestion('Python Basics')])
+        stats = index.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['keys'], 2)
+        self.assertGreater(stats['memory_bytes'], 0)
+
+
+class AutocompleteServiceTests(TestCase):
+    def setUp(self):
+        reset_autocomplete_index()
+        self.instructor = User.objects.create_user(
+            username='teacher', password='password', first_name='Minh', last_name='Nguyen'
+        )
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python Masterclass',
+            slug='python-masterclass',
+            instructor=self.instructor,
+            category=self.category,
+            is_active=True,
+        )
+        search_log_buffer.clear()
+        log_search_query('python django', None)
+        flush_search_log()
+
+    def tearDown(self):
+        reset_autocomplete_index()
+
+    def test_sources_are_loaded(self):
+        types = {s['type'] for s in get_suggestions('p', 10)}
+        self.assertEqual(types, {'course', 'category', 'query'})
+        self.assertEqual(get_suggestions('nguy')[0]['type'], 'instructor')
+
+    def test_lookup_does_not_query_database(self):
+        get_autocomplete_index()
+        with self.assertNumQueries(0):
+            get_suggestions('pyth')
+
+    def test_signals_update_local_snapshot(self):
+        get_autocomplete_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Rust Masterclass'
+            self.course.save()
+        self.assertEqual(get_suggestions('rust')[0]['id'], self.course.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertEqual(get_suggestions('rust'), [])
+
+    def test_suggestion_urls_are_encoded(self):
+        log_search_query('c++ & rust #1', None)
+        flush_search_log()
+        reset_autocomplete_index()
+
+        urls = {s['type']: s['url'] for s in get_suggestions('c++', 10)}
+        self.assertEqual(urls['query'], '/courses/?q=c%2B%2B+%26+rust+%231')
+        self.assertEqual(get_suggestions('prog')[0]['url'], f'/courses/?category={self.category.id}')
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.courses.models import (
+    Answer, Category, Course, Enrollment, Lesson, Question, Quiz, Section, Subsection
+)
+from apps.courses.services.content_cache import (
+    content_cache_stats,
+    get_content_cache_stats,
+    get_lesson_content,
+    get_quiz_structure,
+)
+
+User = get_user_model()
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category
+        )
+        section = Section.objects.create(course=self.course, title='Basics', order=1)
+        self.subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        self.lesson = Lesson.objects.create(subsection=self.subsection, title='Hello', content='Body')
+        self.quiz_lesson = Lesson.objects.create(
+            subsection=self.subsection, title='Check', lesson_type='quiz', order=2
+        )
+        self.quiz = Quiz.objects.create(lesson=self.quiz_lesson, title='Check')
+        self.question = Question.objects.create(quiz=self.quiz, text='2 + 2?', points=2)
+        self.right = Answer.objects.create(question=self.question, text='4', is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, text='5')
+        Enrollment.objects.create(user=self.student, course=self.course)
+        content_cache_stats.reset()
+
+    def version(self):
+        self.course.refresh_from_db()
+        return self.course.content_version
+
+    def test_read_through_counts_hits_and_misses(self):
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual(get_lesson_content(course, self.lesson.pk).content, 'Body')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_lesson_content(course, self.lesson.pk).content, 'Body')
+
+        stats = get_content_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_quiz_structure_is_cached_with_answers(self):
+        course = Course.objects.get(pk=self.course.pk)
+        get_quiz_structure(course, self.quiz_lesson.pk)
+        with self.assertNumQueries(0):
+            quiz = get_quiz_structure(course, self.quiz_lesson.pk)
+            answers = [answer.text for question in quiz.questions.all() for answer in question.answers.all()]
+        self.assertEqual(answers, ['4', '5'])
+
+    def test_content_edits_bump_version(self):
+        edits = [
+            lambda: Course.objects.get(pk=self.course.pk).save(),
+            lambda: self.quiz.save(),
+            lambda: Question.objects.create(quiz=self.quiz, text='3 + 3?'),
+            lambda: self.right.save(),
+            lambda: self.wrong.delete(),
+            lambda: Lesson.objects.filter(pk=self.lesson.pk).first().save(),
+        ]
+        for edit in edits:
+            before = self.version()
+            edit()
+            self.assertGreater(self.version(), before)
+        self.assertEqual(get_content_cache_stats()['invalidations'], len(edits))
+
+    def test_edited_lesson_is_not_served_stale(self):
+        course = Course.objects.get(pk=self.course.pk)
+        get_lesson_content(course, self.lesson.pk)
+
+        self.lesson.content = 'Updated'
+        self.lesson.save()
+
+        course.refresh_from_db()
+        self.assertEqual(get_lesson_content(course, self.lesson.pk).content, 'Updated')
+
+    def test_lesson_detail_page_uses_cached_content(self):
+        self.client.login(username='student', password='password')
+        url = reverse('courses:lesson_detail', args=[self.course.slug, self.lesson.slug])
+        self.assertContains(self.client.get(url), 'Body')
+        self.assertContains(self.client.get(url), 'Body')
+        self.assertGreaterEqual(get_content_cache_stats()['hits'], 2)
+
+    def test_api_lesson_and_quiz_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        response = client.get(f'/api/lessons/{self.lesson.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['content'], 'Body')
+
+        response = client.get(f'/api/quizzes/{self.quiz_lesson.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['questions'][0]['answers']), 2)
+
+        response = client.post(
+            f'/api/quizzes/{self.quiz_lesson.pk}/submit/',
+            {'answers': {str(self.question.pk): [self.right.pk]}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['score'], 100)
+
+        self.assertEqual(client.get('/api/lessons/999999/').status_code, 404)
+
+    def test_api_lesson_requires_enrollment(self):
+        outsider = User.objects.create_user(username='outsider', password='password')
+        client = APIClient()
+        client.force_authenticate(outsider)
+        self.assertEqual(client.get(f'/api/lessons/{self.lesson.pk}/').status_code, 403)
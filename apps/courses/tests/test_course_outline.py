@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.courses.models import Category, Course, Enrollment, Section, Subsection, Lesson
+from apps.courses.services.lesson_service import reorder_lessons
+from apps.courses.services.outline_service import build_course_outline, get_course_outline
+
+User = get_user_model()
+
+
+class CourseOutlineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category
+        )
+        self.first = Section.objects.create(course=self.course, title='Basics', order=1, duration_days=7)
+        self.second = Section.objects.create(
+            course=self.course, title='Advanced', order=2, duration_days=14, is_locked=True
+        )
+        self.intro = Subsection.objects.create(section=self.first, title='Intro', order=1)
+        self.empty = Subsection.objects.create(section=self.first, title='Empty', order=2)
+        self.deep = Subsection.objects.create(section=self.second, title='Deep dive', order=1)
+        self.lessons = [
+            Lesson.objects.create(subsection=self.intro, title='Hello', order=1),
+            Lesson.objects.create(subsection=self.intro, title='Variables', order=2, is_locked=True),
+            Lesson.objects.create(subsection=self.deep, title='Generators', order=1),
+        ]
+
+    def outline(self):
+        self.course.refresh_from_db()
+        return get_course_outline(self.course)
+
+    def test_outline_is_loaded_in_fixed_number_of_queries(self):
+        with self.assertNumQueries(3):
+            outline = build_course_outline(self.course)
+
+        self.assertEqual(outline.section_count, 2)
+        self.assertEqual(outline.lesson_count, 3)
+        self.assertEqual([s.lesson_count for s in outline.sections], [2, 1])
+        self.assertEqual([l.title for l in outline.lessons], ['Hello', 'Variables', 'Generators'])
+        basics = outline.sections[0]
+        self.assertEqual(basics.subsections[0].first_lesson.slug, 'hello')
+        self.assertIsNone(basics.subsections[1].first_lesson)
+
+    def test_lock_state_and_offsets(self):
+        outline = self.outline()
+        basics, advanced = outline.sections
+        self.assertFalse(basics.subsections[0].lessons[0].locked)
+        self.assertTrue(basics.subsections[0].lessons[1].locked)
+        self.assertTrue(advanced.subsections[0].locked)
+        self.assertFalse(advanced.subsections[0].is_locked)
+        self.assertTrue(advanced.subsections[0].lessons[0].locked)
+
+        self.assertEqual((basics.start_offset_days, basics.end_offset_days), (0, 7))
+        self.assertEqual((advanced.start_offset_days, advanced.end_offset_days), (7, 21))
+
+        start = timezone.now()
+        self.assertEqual(
+            outline.section_deadlines(start),
+            (self.first.get_deadline(start), self.second.get_deadline(start)),
+        )
+        self.assertEqual(outline.section_deadlines(None), (None, None))
+
+    def test_cached_outline_is_reused_until_content_changes(self):
+        outline = self.outline()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_course_outline(self.course), outline)
+
+        Lesson.objects.create(subsection=self.empty, title='Loops', order=1)
+        self.assertEqual(self.outline().lesson_count, 4)
+
+        self.second.delete()
+        self.assertEqual(self.outline().section_count, 1)
+
+    def test_reorder_bumps_content_version(self):
+        version = self.outline().version
+        reorder_lessons(self.intro, [self.lessons[1].pk, self.lessons[0].pk])
+
+        outline = self.outline()
+        self.assertGreater(outline.version, version)
+        self.assertEqual(
+            [l.title for l in outline.sections[0].subsections[0].lessons], ['Variables', 'Hello']
+        )
+
+    def test_course_save_does_not_roll_back_version(self):
+        stale = Course.objects.select_related('stats').get(pk=self.course.pk)
+        version = stale.content_version
+        Lesson.objects.create(subsection=self.empty, title='Loops', order=1)
+        stale.title = 'Python 3'
+        stale.save()
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.title, 'Python 3')
+        self.assertEqual(self.course.content_version, version + 2)
+
+    def test_saving_a_deleted_course_inserts_it_again(self):
+        course = Course.objects.get(pk=self.course.pk)
+        Course.objects.filter(pk=course.pk).delete()
+        course.save()
+        self.assertTrue(Course.objects.filter(pk=course.pk).exists())
+
+    def test_api_course_detail_uses_outline(self):
+        response = APIClient().get(f'/api/courses/{self.course.slug}/')
+        self.assertEqual(response.status_code, 200)
+        sections = response.data['sections']
+        self.assertEqual([s['lesson_count'] for s in sections], [2, 1])
+        self.assertEqual(sections[0]['lessons'][0]['slug'], 'hello')
+        self.assertEqual(sections[1]['duration_days'], 14)
+
+    def test_learning_process_page_renders_outline(self):
+        student = User.objects.create_user(username='student', password='password')
+        Enrollment.objects.create(user=student, course=self.course)
+        self.client.login(username='student', password='password')
+
+        response = self.client.get(reverse('courses:course_learning_process', args=[self.course.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Deep dive')
+        self.assertContains(response, reverse('courses:lesson_detail', args=[self.course.slug, 'hello']))
+        self.assertContains(response, 'Your Deadline')
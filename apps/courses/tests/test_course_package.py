@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.courses.models import (
+    Answer, Category, Course, CourseStats, Lesson, Question, Quiz, SearchDocument, Section, Subsection,
+)
+from apps.courses.services import export_course_package, import_course_package
+
+User = get_user_model()
+
+
+class CoursePackageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.package_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.package_dir, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.importer = User.objects.create_user(username='importer', password='password')
+        category = Category.objects.create(name='Programming', description='Code')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=category, price=Decimal('9.50')
+        )
+        for s in range(2):
+            section = Section.objects.create(course=self.course, title=f'Section {s}', order=s, duration_days=4)
+            subsection = Subsection.objects.create(section=section, title=f'Part {s}', order=1)
+            for n in range(3):
+                Lesson.objects.create(
+                    subsection=subsection, title=f'Lesson {s}.{n}', order=n, content=f'Body {s}.{n}',
+                    video_duration=timedelta(minutes=5),
+                )
+        lesson = Lesson.objects.create(subsection=subsection, title='Check', lesson_type='quiz', order=9)
+        lesson.video_file.save('clip.mp4', ContentFile(b'video-bytes'), save=False)
+        Lesson.objects.filter(pk=lesson.pk).update(video_file=lesson.video_file.name)
+        quiz = Quiz.objects.create(lesson=lesson, title='Check')
+        question = Question.objects.create(quiz=quiz, text='2 + 2?', order=1)
+        Answer.objects.create(question=question, text='4', is_correct=True, order=1)
+        Answer.objects.create(question=question, text='5', order=2)
+
+    def test_round_trip_creates_an_identical_tree(self):
+        exported = export_course_package(self.course, self.package_dir)
+        self.assertEqual(exported.counts, {
+            'course': 1, 'section': 2, 'subsection': 2, 'lesson': 7, 'quiz': 1, 'question': 1, 'answer': 2,
+        })
+        with open(os.path.join(self.package_dir, 'manifest.json')) as manifest:
+            media = json.load(manifest)['media']
+        self.assertEqual([entry['path'] for entry in media], [Lesson.objects.get(title='Check').video_file.name])
+
+        imported = import_course_package(self.package_dir, self.importer, slug='python-copy', batch_size=4)
+        copy = Course.objects.get(pk=imported.course_id)
+        self.assertEqual((copy.slug, copy.instructor, copy.category), ('python-copy', self.importer, self.course.category))
+        self.assertEqual(copy.price, Decimal('9.50'))
+
+        def tree(course):
+            return [
+                (lesson.subsection.section.title, lesson.subsection.title, lesson.title, lesson.content,
+                 lesson.video_duration)
+                for lesson in Lesson.objects.filter(subsection__section__course=course)
+                .select_related('subsection__section').order_by('subsection__section__order', 'order')
+            ]
+        self.assertEqual(tree(copy), tree(self.course))
+
+        quiz = Quiz.objects.get(lesson__subsection__section__course=copy)
+        self.assertEqual(
+            list(Answer.objects.filter(question__quiz=quiz).values_list('text', 'is_correct')),
+            [('4', True), ('5', False)],
+        )
+        # The identical file already in storage is reused
+        self.assertEqual(quiz.lesson.video_file.name, Lesson.objects.get(title='Check', pk__lt=quiz.lesson.pk).video_file.name)
+
+        # Derived data that bulk_create skipped
+        self.assertEqual(list(copy.sections.values_list('end_offset_days', flat=True)), [4, 8])
+        stats = CourseStats.objects.get(course=copy)
+        self.assertEqual((stats.section_count, stats.lesson_count), (2, 7))
+        self.assertTrue(SearchDocument.objects.filter(doc_type=SearchDocument.LESSON, object_id=quiz.lesson_id).exists())
+
+    def test_damaged_or_conflicting_packages_are_rejected(self):
+        export_course_package(self.course, self.package_dir)
+        with self.assertRaises(ValueError):
+            import_course_package(self.package_dir, self.importer)
+
+        media_file = os.path.join(self.package_dir, 'media', Lesson.objects.get(title='Check').video_file.name)
+        with open(media_file, 'ab') as damaged:
+            damaged.write(b'!')
+        with self.assertRaises(ValueError):
+            import_course_package(self.package_dir, self.importer, slug='python-copy')
+        self.assertFalse(Course.objects.filter(slug='python-copy').exists())
+
+    def test_commands(self):
+        call_command('export_course', 'python', self.package_dir, stdout=StringIO())
+        call_command('import_course', self.package_dir, instructor='importer', slug='python-2',
+                     stdout=StringIO())
+        self.assertEqual(Lesson.objects.filter(subsection__section__course__slug='python-2').count(), 7)
+        copied = Lesson.objects.get(title='Check', subsection__section__course__slug='python-2')
+        self.assertTrue(default_storage.exists(copied.video_file.name))
@@ -0,0 +1,125 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.analytics.services import get_student_progress
+from apps.courses.models import (
+    Category, Course, CourseProgress, Enrollment, Section, Subsection, Lesson, Progress
+)
+from apps.courses.services.progress_service import (
+    get_course_progress,
+    mark_lesson_completed,
+    mark_lesson_incomplete,
+    refresh_course_progress,
+    with_course_progress,
+)
+
+User = get_user_model()
+
+
+class CourseProgressTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category
+        )
+        section = Section.objects.create(course=self.course, title='Basics', order=1)
+        self.subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        self.lessons = [
+            Lesson.objects.create(subsection=self.subsection, title=f'Lesson {i}', order=i)
+            for i in range(1, 5)
+        ]
+        Enrollment.objects.create(user=self.student, course=self.course)
+
+    def progress(self):
+        return CourseProgress.objects.get(user=self.student, course=self.course)
+
+    def assertMatchesRecompute(self):
+        current = self.progress()
+        fresh = refresh_course_progress(self.student.pk, self.course.pk)
+        self.assertEqual(
+            (current.completed_lessons, current.total_lessons, current.progress_percent),
+            (fresh.completed_lessons, fresh.total_lessons, fresh.progress_percent),
+        )
+
+    def test_enrollment_creates_progress_row(self):
+        progress = self.progress()
+        self.assertEqual(progress.total_lessons, 4)
+        self.assertEqual(progress.completed_lessons, 0)
+        self.assertEqual(progress.progress_percent, 0)
+
+    def test_completion_is_counted_once(self):
+        mark_lesson_completed(self.student, self.lessons[0])
+        mark_lesson_completed(self.student, self.lessons[0])
+        progress = self.progress()
+        self.assertEqual(progress.completed_lessons, 1)
+        self.assertEqual(progress.progress_percent, 25)
+        self.assertIsNotNone(progress.last_activity_at)
+
+        mark_lesson_incomplete(self.student, self.lessons[0])
+        mark_lesson_incomplete(self.student, self.lessons[0])
+        self.assertEqual(self.progress().completed_lessons, 0)
+        self.assertMatchesRecompute()
+
+    def test_progress_saved_directly_updates_aggregate(self):
+        progress = Progress.objects.create(user=self.student, lesson=self.lessons[1], completed=True)
+        self.assertEqual(self.progress().completed_lessons, 1)
+
+        progress.completed = False
+        progress.save()
+        self.assertEqual(self.progress().completed_lessons, 0)
+        self.assertMatchesRecompute()
+
+    def test_lesson_changes_update_totals(self):
+        for lesson in self.lessons[:2]:
+            mark_lesson_completed(self.student, lesson)
+
+        Lesson.objects.create(subsection=self.subsection, title='Lesson 5', order=5)
+        self.assertEqual(self.progress().total_lessons, 5)
+        self.assertEqual(self.progress().progress_percent, 40)
+
+        self.lessons[0].delete()
+        progress = self.progress()
+        self.assertEqual(progress.total_lessons, 4)
+        self.assertEqual(progress.completed_lessons, 1)
+        self.assertEqual(progress.progress_percent, 25)
+        self.assertMatchesRecompute()
+
+    def test_get_course_progress_reports_completion(self):
+        for lesson in self.lessons:
+            mark_lesson_completed(self.student, lesson)
+
+        result = get_course_progress(self.student, self.course)
+        self.assertTrue(result['is_completed'])
+        self.assertEqual(result['progress_percent'], 100)
+        self.assertTrue(Enrollment.objects.get(user=self.student, course=self.course).is_completed)
+
+    def test_get_course_progress_builds_missing_row(self):
+        mark_lesson_completed(self.student, self.lessons[0])
+        CourseProgress.objects.all().delete()
+
+        result = get_course_progress(self.student, self.course)
+        self.assertEqual(result['completed_lessons'], 1)
+        self.assertEqual(result['total_lessons'], 4)
+
+    def test_student_progress_is_a_single_query(self):
+        other = Course.objects.create(
+            title='Django', slug='django', instructor=self.instructor, category=self.category
+        )
+        Enrollment.objects.create(user=self.student, course=other)
+        mark_lesson_completed(self.student, self.lessons[0])
+
+        with self.assertNumQueries(1):
+            rows = get_student_progress(self.student)
+
+        by_title = {row['course_title']: row for row in rows}
+        self.assertEqual(by_title['Python']['progress_percent'], 25)
+        self.assertEqual(by_title['Python']['completed_lessons'], 1)
+        self.assertEqual(by_title['Django']['total_lessons'], 0)
+
+    def test_with_course_progress_defaults_for_missing_rows(self):
+        CourseProgress.objects.all().delete()
+        enrollment = with_course_progress(Enrollment.objects.filter(user=self.student)).get()
+        self.assertEqual(enrollment.completed_lessons, 0)
+        self.assertEqual(enrollment.progress_percent, 0)
+        self.assertIsNone(enrollment.last_activity_at)
@@ -0,0 +1,98 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.courses.models import (
+    Category, CategoryStats, Course, CourseStats, Enrollment, Section, Subsection, Lesson
+)
+from apps.courses.services.stats_service import rebuild_category_stats, rebuild_course_stats
+
+User = get_user_model()
+
+
+class CourseStatsSignalTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category
+        )
+
+    def stats(self):
+        return CourseStats.objects.get(course=self.course)
+
+    def test_course_creation_updates_category_stats(self):
+        stats = CategoryStats.objects.get(category=self.category)
+        self.assertEqual(stats.course_count, 1)
+        self.assertEqual(stats.active_course_count, 1)
+
+        self.course.is_active = False
+        self.course.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.active_course_count, 0)
+
+        other = Category.objects.create(name='Design')
+        self.course.category = other
+        self.course.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.course_count, 0)
+        self.assertEqual(CategoryStats.objects.get(category=other).course_count, 1)
+
+    def test_enrollments_are_counted(self):
+        enrollment = Enrollment.objects.create(user=self.student, course=self.course)
+        self.assertEqual(self.stats().enrollment_count, 1)
+
+        enrollment.is_completed = True
+        enrollment.save()
+        self.assertEqual(self.stats().completed_enrollment_count, 1)
+
+        enrollment.delete()
+        self.assertEqual(self.stats().enrollment_count, 0)
+        self.assertEqual(self.stats().completed_enrollment_count, 0)
+
+    def test_sections_and_lessons_are_counted(self):
+        section = Section.objects.create(course=self.course, title='Basics', order=1)
+        subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        Lesson.objects.create(subsection=subsection, title='One', order=1)
+        Lesson.objects.create(subsection=subsection, title='Two', order=2)
+        self.assertEqual(self.stats().section_count, 1)
+        self.assertEqual(self.stats().lesson_count, 2)
+
+        # Cascading delete still resolves the course of each lesson
+        section.delete()
+        self.assertEqual(self.stats().section_count, 0)
+        self.assertEqual(self.stats().lesson_count, 0)
+
+    def test_rebuild_reconciles_drift(self):
+        Enrollment.objects.create(user=self.student, course=self.course)
+        CourseStats.objects.filter(course=self.course).update(enrollment_count=42)
+        CategoryStats.objects.all().delete()
+
+        rebuild_course_stats()
+        rebuild_category_stats()
+        self.assertEqual(self.stats().enrollment_count, 1)
+        self.assertEqual(CategoryStats.objects.get(category=self.category).course_count, 1)
+
+
+class CourseStatsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        instructor = User.objects.create_user(username='teacher', password='password')
+        category = Category.objects.create(name='Programming')
+        for i in range(5):
+            course = Course.objects.create(
+                title=f'Course {i}', slug=f'course-{i}', instructor=instructor, category=category
+            )
+            for j in range(i):
+                student = User.objects.create_user(username=f'student-{i}-{j}', password='password')
+                Enrollment.objects.create(user=student, course=course)
+
+    def test_course_list_query_count_is_constant(self):
+        # Conditional GET validators, page count, page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.status_code, 200)
+        counts = {c['slug']: c['enrollment_count'] for c in response.data['results']}
+        self.assertEqual(counts['course-3'], 3)
+        self.assertEqual(response.data['results'][0]['category']['course_count'], 5)
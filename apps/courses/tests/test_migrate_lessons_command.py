@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.courses.models import Category, Course, Lesson, Section, Subsection
+
+User = get_user_model()
+
+
+class MigrateLessonsToSubsectionsTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user(username='teacher', password='password')
+        category = Category.objects.create(name='Programming')
+        course = Course.objects.create(title='Python', slug='python', instructor=instructor, category=category)
+        self.plain = Section.objects.create(course=course, title='Plain', order=0)
+        self.intro = Subsection.objects.create(section=self.plain, title='Intro', order=0)
+        self.with_general = Section.objects.create(course=course, title='Has General', order=1)
+        self.general = Subsection.objects.create(section=self.with_general, title='General', order=3)
+        for n in range(2):
+            Lesson.objects.create(subsection=self.general, title=f'Kept {n}', order=n)
+
+    def add_legacy_lessons(self):
+        """Recreate the pre-0006 layout: lessons linked to a section but not a subsection"""
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE courses_lesson ADD COLUMN section_id integer NULL')
+        legacy = {}
+        for section, count in ((self.plain, 5), (self.with_general, 3)):
+            # Created out of order so the legacy order has to be respected
+            lessons = [
+                Lesson.objects.create(subsection=self.intro, title=f'{section.title} {n}', order=n)
+                for n in reversed(range(count))
+            ]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE courses_lesson SET subsection_id = NULL, section_id = %s WHERE id IN (%s)'
+                    % (section.pk, ', '.join(str(lesson.pk) for lesson in lessons))
+                )
+            legacy[section.pk] = [lesson.pk for lesson in reversed(lessons)]
+        return legacy
+
+    def migrate(self, **options):
+        out = StringIO()
+        call_command('migrate_lessons_to_subsections', stdout=out, **options)
+        return out.getvalue()
+
+    def test_nothing_to_do_without_legacy_column(self):
+        self.assertIn('nothing to migrate', self.migrate())
+
+    def test_dry_run_writes_nothing(self):
+        self.add_legacy_lessons()
+        output = self.migrate(dry_run=True)
+        self.assertIn('Would create 1 "General" subsections and move 8 lessons', output)
+        self.assertFalse(self.plain.subsections.filter(title='General').exists())
+        self.assertEqual(Lesson.objects.filter(subsection__isnull=True).count(), 8)
+
+    def test_moves_lessons_with_one_update_per_section(self):
+        legacy = self.add_legacy_lessons()
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self.migrate(batch_size=100)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('Successfully migrated 8 lessons', output)
+
+        created = self.plain.subsections.get(title='General')
+        self.assertEqual(created.order, self.intro.order + 1)
+        self.assertEqual(
+            list(created.lessons.order_by('order').values_list('pk', 'order')),
+            [(pk, n) for n, pk in enumerate(legacy[self.plain.pk])],
+        )
+        # Appended after the lessons the existing subsection already had
+        self.assertEqual(
+            list(self.general.lessons.order_by('order').values_list('title', 'order')),
+            [('Kept 0', 0), ('Kept 1', 1), ('Has General 0', 2), ('Has General 1', 3), ('Has General 2', 4)],
+        )
+        self.assertEqual(self.with_general.subsections.count(), 1)
+
+        self.assertIn('Successfully migrated 0 lessons', self.migrate())
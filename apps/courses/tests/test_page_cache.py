@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from DjangoProject.cache import SINGLE_FLIGHT_KEY_PREFIX
+from apps.courses.models import Category, Course
+from apps.courses.services.page_cache import page_cache_key
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=self.category
+        )
+        self.detail_url = reverse('courses:course_detail', args=['python'])
+
+    def test_second_anonymous_visit_is_served_without_queries(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+
+    def test_course_list_key_ignores_order_and_unknown_params(self):
+        url = reverse('courses:course_list')
+        self.client.get(url, {'ordering': 'oldest', 'category': self.category.pk, 'page': 'x'})
+        response = self.client.get(f'{url}?utm_source=mail&category={self.category.pk}&ordering=oldest&page=1')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+        self.assertEqual(self.client.get(url, {'ordering': 'newest'})['X-Page-Cache'], 'miss')
+        # Searches and deep pages are not cached
+        self.assertNotIn('X-Page-Cache', self.client.get(url, {'q': 'python'}))
+        self.assertNotIn('X-Page-Cache', self.client.get(url, {'page': 500}))
+
+    def test_course_and_category_changes_invalidate_pages(self):
+        self.client.get(self.detail_url)
+        self.client.get(reverse('courses:home'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Python 2'
+            self.course.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Python 2')
+
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Design')
+        self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(reverse('courses:home'))['X-Page-Cache'], 'miss')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_stale_page_is_served_while_one_request_refreshes(self):
+        request = self.client.get(self.detail_url).wsgi_request
+        key = page_cache_key('course_detail', request, (), ('courses', 'categories'), {'slug': 'python'})
+
+        # Another worker is already re-rendering the page
+        cache.add(SINGLE_FLIGHT_KEY_PREFIX + key, 1, 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'stale')
+        cache.delete(SINGLE_FLIGHT_KEY_PREFIX + key)
+        self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'miss')
+
+    def test_signed_in_visitors_bypass_the_cache(self):
+        self.client.get(self.detail_url)
+        self.client.login(username='teacher', password='password')
+        response = self.client.get(self.detail_url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(response.context['course'], self.course)
@@ -1,15 +1,28 @@
-from django.test import TestCase
+import time
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
-from apps.courses.models import SearchQuery
-from apps.courses.services.search_service import log_search_query, get_popular_search_terms
+from apps.courses.models import SearchQuery, SearchQueryDaily
+from apps.courses.services.search_service import (
+    flush_search_log,
+    log_search_query,
+    get_popular_search_terms,
+    rollup_search_queries,
+    search_log_buffer,
+)
 
 User = get_user_model()
 
 class PopularSearchTrackingTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='password')
+        search_log_buffer.clear()
+
+    def tearDown(self):
+        search_log_buffer.clear()
 
     def test_log_search_query(self):
         # Test logging a valid query
@@ -17,6 +30,9 @@ class PopularSearchTrackingTests(TestCase):
         self.assertIsNotNone(query)
         self.assertEqual(query.query, "python course")
         self.assertEqual(query.user, self.user)
+        # Buffered until flushed
+        self.assertEqual(SearchQuery.objects.count(), 0)
+        flush_search_log()
         self.assertEqual(SearchQuery.objects.count(), 1)
 
     def test_log_search_query_anonymous(self):
@@ -25,6 +41,7 @@ class PopularSearchTrackingTests(TestCase):
         self.assertIsNotNone(query)
         self.assertEqual(query.query, "django")
         self.assertIsNone(query.user)
+        flush_search_log()
         self.assertEqual(SearchQuery.objects.count(), 1)
 
     def test_log_search_query_too_short(self):
@@ -47,6 +64,7 @@ class PopularSearchTrackingTests(TestCase):
         log_search_query("django", self.user)
         log_search_query("django", None)
         log_search_query("react", self.user)
+        flush_search_log()
 
         # Create an old query
         old_query = SearchQuery.objects.create(query="old query", created_at=timezone.now() - timedelta(days=31))
@@ -68,3 +86,87 @@ class PopularSearchTrackingTests(TestCase):
         # Check that 'old query' is not included
         queries = [p['query'] for p in popular]
         self.assertNotIn('old query', queries)
+
+    def test_rows_keep_the_time_of_the_search(self):
+        searched_at = timezone.now() - timedelta(hours=3)
+        with mock.patch('django.utils.timezone.now', return_value=searched_at):
+            log_search_query("python", self.user)
+        flush_search_log()
+        self.assertEqual(SearchQuery.objects.get().created_at, searched_at)
+
+    def test_buffer_flushes_at_size_threshold(self):
+        with self.settings(SEARCH_LOG_BUFFER_SIZE=3):
+            log_search_query("one", None)
+            log_search_query("two", None)
+            self.assertEqual(SearchQuery.objects.count(), 0)
+            log_search_query("three", None)
+            self.assertEqual(SearchQuery.objects.count(), 3)
+
+
+class SearchQueryFlushFallbackTests(TransactionTestCase):
+    def test_idle_buffer_is_flushed_by_a_timer(self):
+        with self.settings(SEARCH_LOG_FLUSH_INTERVAL=0.1):
+            log_search_query("python", None)
+            self.assertEqual(SearchQuery.objects.count(), 0)
+            deadline = time.monotonic() + 5
+            while not SearchQuery.objects.exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertEqual(SearchQuery.objects.count(), 1)
+
+    def test_deleted_user_does_not_drop_the_batch(self):
+        kept = User.objects.create_user(username='kept', password='password')
+        gone = User.objects.create_user(username='gone', password='password')
+        log_search_query("python", kept)
+        log_search_query("django", gone)
+        log_search_query("react", None)
+        User.objects.filter(pk=gone.pk).delete()
+
+        self.assertEqual(flush_search_log(), 3)
+        self.assertEqual(
+            set(SearchQuery.objects.values_list('query', 'user_id')),
+            {('python', kept.pk), ('django', None), ('react', None)},
+        )
+
+
+class SearchQueryRollupTests(TestCase):
+    def _log(self, query, days_ago):
+        entry = SearchQuery.objects.create(query=query)
+        SearchQuery.objects.filter(id=entry.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def setUp(self):
+        self._log("python", 3)
+        self._log("python", 3)
+        self._log("django", 2)
+        self._log("django", 2)
+        self._log("django", 2)
+        self._log("react", 0)
+
+    def test_rollup_aggregates_complete_days(self):
+        rollup_search_queries(retention_days=0)
+        self.assertEqual(
+            SearchQueryDaily.objects.get(query="python", day=timezone.localdate() - timedelta(days=3)).count, 2
+        )
+        self.assertEqual(SearchQueryDaily.objects.get(query="django").count, 3)
+        # Today is not complete yet
+        self.assertFalse(SearchQueryDaily.objects.filter(query="react").exists())
+
+    def test_rollup_is_idempotent(self):
+        rollup_search_queries(retention_days=0)
+        rollup_search_queries(retention_days=0)
+        self.assertEqual(SearchQueryDaily.objects.get(query="django").count, 3)
+
+    def test_popular_terms_combine_rollup_and_recent_rows(self):
+        self.assertEqual(get_popular_search_terms(), [
+            {'query': 'django', 'count': 3},
+            {'query': 'python', 'count': 2},
+            {'query': 'react', 'count': 1},
+        ])
+
+        rollup_search_queries(retention_days=0)
+        self._log("react", 0)
+        self._log("react", 0)
+        self.assertEqual(get_popular_search_terms(), [
+            {'query': 'django', 'count': 3},
+            {'query': 'react', 'count': 3},
+            {'query': 'python', 'count': 2},
+        ])
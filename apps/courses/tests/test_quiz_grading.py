@@ -0,0 +1,202 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.courses.models import (
+    Answer, Category, Course, Enrollment, Lesson, Question, Quiz, QuizAttempt, Section, Subsection, UserAnswer
+)
+from apps.courses.services.quiz_service import (
+    build_answer_key,
+    get_answer_key,
+    grade_quiz_attempt,
+    load_attempt_answers,
+    regrade_quiz_attempts,
+)
+
+User = get_user_model()
+
+
+class QuizGradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=category
+        )
+        section = Section.objects.create(course=self.course, title='Basics', order=1)
+        self.subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        self.lesson, self.quiz = self.make_quiz('Check', 0)
+        Enrollment.objects.create(user=self.student, course=self.course)
+
+        self.single = Question.objects.create(quiz=self.quiz, text='2 + 2?', points=2, order=1)
+        self.four = Answer.objects.create(question=self.single, text='4', is_correct=True)
+        self.five = Answer.objects.create(question=self.single, text='5')
+        self.multiple = Question.objects.create(
+            quiz=self.quiz, text='Even numbers?', question_type='multiple', points=3, order=2
+        )
+        self.two = Answer.objects.create(question=self.multiple, text='2', is_correct=True)
+        self.six = Answer.objects.create(question=self.multiple, text='6', is_correct=True)
+        self.seven = Answer.objects.create(question=self.multiple, text='7')
+        Question.objects.create(quiz=self.quiz, text='Explain', question_type='essay', points=5, order=3)
+
+    def make_quiz(self, title, questions):
+        lesson = Lesson.objects.create(subsection=self.subsection, title=title, lesson_type='quiz')
+        quiz = Quiz.objects.create(lesson=lesson, title=title)
+        for number in range(questions):
+            question = Question.objects.create(quiz=quiz, text=f'Q{number}', order=number)
+            Answer.objects.create(question=question, text='yes', is_correct=True)
+            Answer.objects.create(question=question, text='no')
+        return lesson, quiz
+
+    def test_answer_key_is_loaded_in_two_queries_and_cached(self):
+        with self.assertNumQueries(2):
+            key = build_answer_key(self.lesson.pk)
+        self.assertEqual(key.quiz_id, self.quiz.pk)
+        self.assertEqual(key.total_points, 5)
+        self.assertEqual(key.questions[1].correct_ids, frozenset({self.two.pk, self.six.pk}))
+
+        course = Course.objects.get(pk=self.course.pk)
+        get_answer_key(course, self.lesson.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_answer_key(course, self.lesson.pk), key)
+
+        self.assertIsNone(build_answer_key(self.quiz.pk + 1000))
+
+    def test_editing_answers_refreshes_cached_key(self):
+        get_answer_key(Course.objects.get(pk=self.course.pk), self.lesson.pk)
+        self.five.is_correct = True
+        self.five.save()
+
+        key = get_answer_key(Course.objects.get(pk=self.course.pk), self.lesson.pk)
+        self.assertIn(self.five.pk, key.questions[0].correct_ids)
+
+    def test_clean_and_grade(self):
+        key = build_answer_key(self.lesson.pk)
+        selections = key.clean({
+            str(self.single.pk): [str(self.four.pk)],
+            self.multiple.pk: [self.two.pk, self.six.pk, self.four.pk],
+            'junk': ['x'],
+        })
+        self.assertEqual(selections, {
+            self.single.pk: frozenset({self.four.pk}),
+            self.multiple.pk: frozenset({self.two.pk, self.six.pk}),
+        })
+        grade = key.grade(selections)
+        self.assertEqual((grade.earned_points, grade.total_points, grade.score), (5, 5, 100))
+
+        grade = key.grade(key.clean({self.single.pk: [self.four.pk, self.five.pk], self.multiple.pk: [self.two.pk]}))
+        self.assertEqual(grade.earned_points, 0)
+        self.assertEqual(grade.check_results(), {self.multiple.pk: {'selected': [self.two.pk], 'correct': False}})
+        self.assertFalse(key.is_valid({self.single.pk: frozenset({self.two.pk})}))
+
+    def test_submission_queries_do_not_grow_with_question_count(self):
+        counts = []
+        for questions in (2, 25):
+            lesson, quiz = self.make_quiz(f'Quiz {questions}', questions)
+            key = build_answer_key(lesson.pk)
+            attempt = QuizAttempt.objects.create(user=self.student, lesson=lesson, attempt_number=1)
+            answers = {question.id: list(question.correct_ids) for question in key.questions}
+            with CaptureQueriesContext(connection) as queries:
+                result = grade_quiz_attempt(attempt, answers, key)
+            counts.append(len(queries))
+            self.assertEqual(result['score'], 100)
+            self.assertEqual(UserAnswer.objects.filter(quiz_attempt=attempt).count(), questions)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_regrading_replaces_stored_answers(self):
+        attempt = QuizAttempt.objects.create(user=self.student, lesson=self.lesson, attempt_number=1)
+        grade_quiz_attempt(attempt, {self.single.pk: [self.five.pk]})
+        result = grade_quiz_attempt(attempt, {self.single.pk: [self.four.pk]})
+
+        self.assertEqual(result['earned_points'], 2)
+        self.assertEqual(load_attempt_answers(attempt), {self.single.pk: frozenset({self.four.pk})})
+        self.assertEqual(float(QuizAttempt.objects.get(pk=attempt.pk).score), 40.0)
+
+    def test_lesson_page_check_then_submit(self):
+        self.client.login(username='student', password='password')
+        url = reverse('courses:lesson_detail', args=[self.course.slug, self.lesson.slug])
+
+        response = self.client.post(url, {
+            f'question_{self.single.pk}': self.four.pk,
+            f'question_{self.multiple.pk}': [self.two.pk],
+            'check_answers': '1',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['temp_score'], 40)
+        self.assertEqual(response.context['check_results'][self.single.pk]['correct'], True)
+
+        # Answers posted with the final submission are graded too
+        response = self.client.post(url, {
+            f'question_{self.multiple.pk}': [self.two.pk, self.six.pk],
+            'submit_quiz': '1',
+        })
+        attempt = QuizAttempt.objects.get(user=self.student, lesson=self.lesson)
+        self.assertTrue(response.context['already_submitted'])
+        self.assertIsNotNone(attempt.completed_at)
+        self.assertEqual(float(attempt.score), 100.0)
+
+    def test_api_submission_stores_answers(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.post(
+            f'/api/quizzes/{self.lesson.pk}/submit/',
+            {'answers': {str(self.single.pk): [self.four.pk], str(self.multiple.pk): [self.seven.pk]}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['earned_points'], response.data['total_points']), (2, 5))
+        self.assertEqual(response.data['score'], 40)
+
+        attempt = QuizAttempt.objects.get(user=self.student, lesson=self.lesson)
+        self.assertIsNotNone(attempt.completed_at)
+        self.assertEqual(load_attempt_answers(attempt)[self.multiple.pk], frozenset({self.seven.pk}))
+
+    def test_regrade_after_answer_key_fix(self):
+        attempts = []
+        for number, student in enumerate(['a', 'b', 'c']):
+            user = User.objects.create_user(username=student, password='password')
+            attempt = QuizAttempt.objects.create(user=user, lesson=self.lesson, attempt_number=1)
+            chosen = self.five if number else self.four
+            grade_quiz_attempt(attempt, {self.single.pk: [chosen.pk]})
+            attempts.append(attempt)
+        QuizAttempt.objects.create(user=self.student, lesson=self.lesson, attempt_number=1)
+
+        # The instructor marked the wrong answer as correct
+        self.five.is_correct = True
+        self.five.save()
+        self.four.is_correct = False
+        self.four.save()
+
+        batches = []
+        result = regrade_quiz_attempts(quiz_id=self.quiz.pk, batch_size=2, on_batch=batches.append)
+        self.assertEqual((result.attempts, result.updated), (3, 3))
+        self.assertEqual([batch.attempts for batch in batches], [2, 3])
+
+        scores = [float(QuizAttempt.objects.get(pk=attempt.pk).score) for attempt in attempts]
+        self.assertEqual(scores, [0.0, 40.0, 40.0])
+        self.assertEqual(regrade_quiz_attempts(course_id=self.course.pk).updated, 0)
+
+    def test_regrade_command(self):
+        with self.assertRaises(CommandError):
+            call_command('regrade_quiz_attempts')
+
+        attempt = QuizAttempt.objects.create(user=self.student, lesson=self.lesson, attempt_number=1)
+        grade_quiz_attempt(attempt, {self.multiple.pk: [self.two.pk]})
+        self.seven.is_correct = True
+        self.seven.save()
+        self.six.is_correct = False
+        self.six.save()
+        QuizAttempt.objects.filter(pk=attempt.pk).update(score=None)
+
+        call_command('regrade_quiz_attempts', lesson=self.lesson.pk, stdout=StringIO())
+        self.assertEqual(float(QuizAttempt.objects.get(pk=attempt.pk).score), 0.0)
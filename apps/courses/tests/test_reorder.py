@@ -0,0 +1,110 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.courses.models import Category, Course, Lesson, Section, Subsection
+from apps.courses.services import reorder_course
+
+User = get_user_model()
+
+
+class ReorderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=category
+        )
+        self.first = Section.objects.create(course=self.course, title='One', order=0, duration_days=7)
+        self.second = Section.objects.create(course=self.course, title='Two', order=1, duration_days=3)
+        self.intro = Subsection.objects.create(section=self.first, title='Intro', order=0)
+        self.deep = Subsection.objects.create(section=self.second, title='Deep', order=0)
+        self.lessons = [
+            Lesson.objects.create(subsection=self.intro, title=f'Lesson {n}', order=n) for n in range(30)
+        ]
+
+    def version(self):
+        self.course.refresh_from_db()
+        return self.course.content_version
+
+    def test_moves_across_levels_in_one_transaction(self):
+        version = self.version()
+        moved = self.lessons[5]
+        remaining = [lesson.pk for lesson in reversed(self.lessons) if lesson != moved]
+
+        with CaptureQueriesContext(connection) as queries:
+            reorder_course(
+                self.course,
+                sections=[self.second.pk, self.first.pk],
+                subsections={self.second.pk: [self.deep.pk, self.intro.pk]},
+                lessons={self.intro.pk: remaining, self.deep.pk: [moved.pk]},
+            )
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        # One CASE statement per level, the section offsets and the version bump
+        # (stats row and course timestamp)
+        self.assertEqual(len(updates), 6)
+        self.assertTrue(all('CASE' in sql for sql in updates[:3]))
+
+        self.assertEqual(self.version(), version + 1)
+        self.assertEqual(
+            list(Section.objects.order_by('order').values_list('title', 'start_offset_days')),
+            [('Two', 0), ('One', 3)],
+        )
+        self.assertEqual(list(self.second.subsections.order_by('order')), [self.deep, self.intro])
+        moved.refresh_from_db()
+        self.assertEqual((moved.subsection, moved.order), (self.deep, 0))
+        self.assertEqual(list(self.intro.lessons.order_by('order').values_list('pk', flat=True)), remaining)
+
+    def test_invalid_permutations_change_nothing(self):
+        version = self.version()
+        other = Course.objects.create(title='Go', slug='go', instructor=self.instructor, category=self.course.category)
+        foreign = Section.objects.create(course=other, title='Foreign')
+
+        invalid = [
+            {'sections': [self.first.pk]},
+            {'sections': [self.first.pk, self.second.pk, self.second.pk]},
+            {'sections': [self.first.pk, foreign.pk]},
+            {'subsections': {foreign.pk: [self.intro.pk]}},
+            # A listed parent must list everything it holds
+            {'subsections': {self.first.pk: []}},
+            {'sections': [self.second.pk, self.first.pk], 'lessons': {self.intro.pk: [self.lessons[0].pk]}},
+            {'lessons': {self.deep.pk: ['x']}},
+        ]
+        for payload in invalid:
+            with self.subTest(payload=payload), self.assertRaises(ValidationError):
+                reorder_course(self.course, **payload)
+
+        self.assertEqual(self.version(), version)
+        self.assertEqual(list(Section.objects.filter(course=self.course).order_by('order')), [self.first, self.second])
+
+    def test_outline_endpoint(self):
+        self.client.login(username='teacher', password='password')
+        url = reverse('courses:reorder_course_outline', args=['python'])
+        response = self.client.post(
+            url, json.dumps({'sections': [self.second.pk, self.first.pk]}), content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertEqual(Section.objects.filter(course=self.course).order_by('order').first(), self.second)
+
+        response = self.client.post(url, json.dumps({'sections': [self.first.pk]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(self.client.post(url, 'nope', content_type='application/json').status_code, 400)
+
+    def test_legacy_subsection_lesson_endpoint(self):
+        self.client.login(username='teacher', password='password')
+        order = [lesson.pk for lesson in reversed(self.lessons)]
+        response = self.client.post(
+            reverse('courses:reorder_subsection_lessons', args=['python', self.first.pk, self.intro.pk]),
+            {'lesson_order[]': order},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertEqual(list(self.intro.lessons.order_by('order').values_list('pk', flat=True)), order)
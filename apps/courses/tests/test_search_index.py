@@ -0,0 +1,94 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.courses.models import Category, Course, Section, Subsection, Lesson, SearchDocument, SearchPosting
+from apps.courses.services.search_index import (
+    DatabaseSearchBackend,
+    get_search_backend,
+    rebuild_search_index,
+    search_courses,
+    search_lessons,
+    tokenize,
+)
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='teacher', password='password', first_name='Minh', last_name='Nguyen'
+        )
+        self.category = Category.objects.create(name='Programming', description='Code')
+        self.python = Course.objects.create(
+            title='Python for Beginners',
+            slug='python-beginners',
+            short_description='Learn Python basics',
+            description='A comprehensive course about python programming',
+            instructor=self.instructor,
+            category=self.category,
+        )
+        self.django = Course.objects.create(
+            title='Django Web Development',
+            slug='django-web',
+            short_description='Build websites with Python',
+            description='Models, views and templates',
+            instructor=self.instructor,
+            category=self.category,
+        )
+
+    def test_backend_defaults_to_database_on_sqlite(self):
+        self.assertIsInstance(get_search_backend(), DatabaseSearchBackend)
+
+    def test_tokenize_folds_accents_and_html(self):
+        self.assertEqual(tokenize('<p>Học Lập Trình Đà Nẵng</p>'), ['hoc', 'lap', 'trinh', 'da', 'nang'])
+
+    def test_save_signal_indexes_course(self):
+        self.assertTrue(SearchDocument.objects.filter(doc_type=SearchDocument.COURSE, object_id=self.python.pk).exists())
+        self.assertTrue(SearchPosting.objects.filter(term='python', object_id=self.python.pk).exists())
+
+    def test_title_match_ranks_higher(self):
+        hits = search_courses('python')
+        self.assertEqual([hit.object_id for hit in hits], [self.python.pk, self.django.pk])
+        self.assertGreater(hits[0].score, hits[1].score)
+
+    def test_candidates_restrict_hits_before_the_limit(self):
+        hits = search_courses('python', limit=1, candidates=Course.objects.filter(slug='django-web'))
+        self.assertEqual([hit.object_id for hit in hits], [self.django.pk])
+        self.assertEqual(hits[0].score, search_courses('python')[1].score)
+
+    def test_terms_are_anded_and_prefix_matched(self):
+        self.assertEqual([hit.object_id for hit in search_courses('djan templ')], [self.django.pk])
+        self.assertEqual(search_courses('python cobol'), [])
+
+    def test_instructor_and_category_are_searchable(self):
+        self.assertEqual(len(search_courses('nguyen')), 2)
+        self.instructor.last_name = 'Tran'
+        self.instructor.save()
+        self.assertEqual(search_courses('nguyen'), [])
+        self.assertEqual(len(search_courses('tran')), 2)
+
+    def test_update_and_delete_keep_index_in_sync(self):
+        self.python.title = 'Rust for Beginners'
+        self.python.save()
+        self.assertEqual([hit.object_id for hit in search_courses('rust')], [self.python.pk])
+
+        self.python.delete()
+        self.assertEqual(search_courses('rust'), [])
+        self.assertFalse(SearchPosting.objects.filter(object_id=self.python.pk, doc_type=SearchDocument.COURSE).exists())
+
+    def test_lessons_are_indexed(self):
+        section = Section.objects.create(course=self.python, title='Basics', order=1)
+        subsection = Subsection.objects.create(section=section, title='Intro', order=1)
+        lesson = Lesson.objects.create(
+            subsection=subsection, title='Variables', content='<p>Numbers and strings</p>', order=1
+        )
+        self.assertEqual([hit.object_id for hit in search_lessons('strings')], [lesson.pk])
+
+    def test_rebuild_search_index(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search_courses('python'), [])
+
+        counts = rebuild_search_index()
+        self.assertEqual(counts[SearchDocument.COURSE], 2)
+        self.assertEqual(counts[SearchDocument.CATEGORY], 1)
+        self.assertEqual(len(search_courses('python')), 2)
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.courses.models import Category, Course, Enrollment, Section
+from apps.courses.services import get_section_deadlines, get_sections_due_soon
+
+User = get_user_model()
+
+
+class SectionDeadlineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python', slug='python', instructor=self.instructor, category=category
+        )
+        self.sections = [
+            Section.objects.create(course=self.course, title=f'Week {n}', order=n, duration_days=days)
+            for n, days in enumerate([7, 3, 5], start=1)
+        ]
+
+    def offsets(self):
+        return list(
+            Section.objects.filter(course=self.course).order_by('order').values_list(
+                'title', 'start_offset_days', 'end_offset_days'
+            )
+        )
+
+    def test_offsets_follow_saves_deletes_and_reorders(self):
+        self.assertEqual(self.offsets(), [('Week 1', 0, 7), ('Week 2', 7, 10), ('Week 3', 10, 15)])
+
+        first = self.sections[0]
+        first.duration_days = 1
+        first.save()
+        self.assertEqual(self.offsets(), [('Week 1', 0, 1), ('Week 2', 1, 4), ('Week 3', 4, 9)])
+
+        self.sections[1].delete()
+        self.assertEqual(self.offsets(), [('Week 1', 0, 1), ('Week 3', 1, 6)])
+
+        self.client.login(username='teacher', password='password')
+        self.client.post(
+            reverse('courses:reorder_sections', args=['python']),
+            {'section_order[]': [self.sections[2].pk, first.pk]},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(self.offsets(), [('Week 3', 0, 5), ('Week 1', 5, 6)])
+
+    def test_get_deadline_needs_no_queries(self):
+        start = timezone.now()
+        section = Section.objects.get(pk=self.sections[2].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(section.get_deadline(start), start + timedelta(days=15))
+
+    def test_bulk_deadlines_for_user_and_course(self):
+        enrollment = Enrollment.objects.create(user=self.student, course=self.course)
+        self.course.refresh_from_db()
+        deadlines = get_section_deadlines(self.student, self.course)
+        self.assertEqual(
+            [deadline for _, deadline in deadlines],
+            [enrollment.enrolled_at + timedelta(days=days) for days in (7, 10, 15)],
+        )
+        with self.assertNumQueries(0):
+            get_section_deadlines(self.student, self.course)
+
+        # Without an enrollment the course opening date is the start
+        other = User.objects.create_user(username='guest', password='password')
+        self.assertEqual({deadline for _, deadline in get_section_deadlines(other, self.course)}, {None})
+
+    def test_due_soon_across_courses(self):
+        now = timezone.now()
+        other_course = Course.objects.create(
+            title='Go', slug='go', instructor=self.instructor, category=self.course.category
+        )
+        Section.objects.create(course=other_course, title='Only', order=1, duration_days=2)
+
+        def enroll(username, course, days_ago, **fields):
+            user = User.objects.create_user(username=username, password='password')
+            enrollment = Enrollment.objects.create(user=user, course=course, **fields)
+            Enrollment.objects.filter(pk=enrollment.pk).update(enrolled_at=now - timedelta(days=days_ago))
+            return user
+
+        # Week 2 ends 10 days after enrolling: due in 1 day
+        due_week_two = enroll('a', self.course, 9)
+        # Week 1 ended yesterday, week 2 ends exactly at the end of the window
+        enroll_eight = enroll('b', self.course, 8)
+        # Nothing due in the next 2 days
+        enroll('c', self.course, 1)
+        # Completed enrollments are skipped
+        enroll('d', self.course, 9, is_completed=True)
+        # The other course's only section is due in a day and a half
+        other = enroll('e', other_course, 0.5)
+
+        with self.assertNumQueries(2):
+            due = get_sections_due_soon(days=2, now=now)
+        self.assertEqual(
+            [(item.user_id, item.section_id) for item in due],
+            [
+                (due_week_two.pk, self.sections[1].pk),
+                (other.pk, other_course.sections.get().pk),
+                (enroll_eight.pk, self.sections[1].pk),
+            ],
+        )
+        self.assertEqual(due[0].deadline, now + timedelta(days=1))
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.courses.models import Certificate, Category, Course, CourseProgress, Enrollment, Section
+from apps.courses.services import get_user_course_loader
+
+User = get_user_model()
+
+
+class CoursesExtrasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        category = Category.objects.create(name='Programming')
+        self.courses = [
+            Course.objects.create(title=f'Course {n}', slug=f'course-{n}', instructor=self.instructor, category=category)
+            for n in range(5)
+        ]
+        self.enrollments = [Enrollment.objects.create(user=self.student, course=course) for course in self.courses]
+        for enrollment in self.enrollments[:2]:
+            enrollment.is_completed = True
+            enrollment.save()
+            Certificate.objects.create(user=self.student, course=enrollment.course, enrollment=enrollment)
+        CourseProgress.objects.update_or_create(
+            user=self.student, course=self.courses[0], defaults={'completed_lessons': 3, 'total_lessons': 3}
+        )
+
+    def render(self, source, **context):
+        return Template('{% load courses_extras %}' + source).render(Context(context))
+
+    def test_filters_load_each_kind_once_per_request(self):
+        source = (
+            '{% for course in courses %}'
+            '{{ user|has_certificate:course }}/{{ user|get_certificate:course|yesno:"c,-" }}/'
+            '{{ user|is_course_completed:course }};'
+            '{% endfor %}'
+        )
+        with self.assertNumQueries(2):
+            output = self.render(source, user=self.student, courses=self.courses)
+        self.assertEqual(output.split(';')[:3], ['True/c/True', 'True/c/False', 'False/-/False'])
+
+        # A new request gets a new user object and a fresh loader
+        self.assertIsNot(get_user_course_loader(User.objects.get(pk=self.student.pk)),
+                         get_user_course_loader(self.student))
+
+    def test_section_deadline_uses_the_outline(self):
+        course = self.courses[0]
+        Section.objects.create(course=course, title='One', order=1, duration_days=7)
+        second = Section.objects.create(course=course, title='Two', order=2, duration_days=3)
+        second = Section.objects.select_related('course__stats').get(pk=second.pk)
+        course = Course.objects.select_related('stats').get(pk=course.pk)
+        expected = second.get_deadline(self.enrollments[0].enrolled_at)
+        self.assertEqual(expected, self.enrollments[0].enrolled_at + timedelta(days=10))
+
+        # Enrollments and the outline (lessons, subsections, sections) once each
+        with self.assertNumQueries(4):
+            output = self.render(
+                '{% section_deadline section user as deadline %}{{ deadline|date:"c" }}|'
+                '{% section_deadline section user as again %}{{ course|course_duration_weeks }}',
+                section=second, user=self.student, course=course,
+            )
+        self.assertEqual(output, f'{expected.isoformat()}|1.4')
+
+    def test_dashboard_course_cards_are_fragment_cached(self):
+        self.client.login(username='student', password='password')
+        url = reverse('user_dashboard_with_tab', args=['enrollments'])
+        # Two course cards plus the certificates tab
+        self.assertContains(self.client.get(url), 'View Certificate', count=4)
+
+        # update() bypasses updated_at, so the cached card is still served
+        Course.objects.filter(pk=self.courses[0].pk).update(title='Renamed quietly')
+        self.assertNotContains(self.client.get(url), 'data-title="renamed quietly"')
+
+        course = Course.objects.get(pk=self.courses[0].pk)
+        course.title = 'Renamed'
+        course.save()
+        self.assertContains(self.client.get(url), 'data-title="renamed"')
+
+        # Earning a certificate changes the card's key as well
+        enrollment = self.enrollments[2]
+        enrollment.is_completed = True
+        enrollment.save()
+        Certificate.objects.create(user=self.student, course=enrollment.course, enrollment=enrollment)
+        self.assertContains(self.client.get(url), 'View Certificate', count=6)
@@ -36,6 +36,7 @@ urlpatterns = [
     path('dashboard/courses/<slug:course_slug>/sections/<int:section_id>/subsections/<int:subsection_id>/delete/', views.delete_subsection, name='delete_subsection'),
     path('dashboard/courses/<slug:course_slug>/sections/<int:section_id>/subsections/reorder/', views.reorder_subsections, name='reorder_subsections'),
     path('dashboard/courses/<slug:course_slug>/reorder/', views.reorder_sections, name='reorder_sections'),
+    path('dashboard/courses/<slug:course_slug>/outline/reorder/', views.reorder_course_outline, name='reorder_course_outline'),
 
     # Certificate URLs
     path('certificate/<str:certificate_id>/', views.course_certificate, name='course_certificate'),
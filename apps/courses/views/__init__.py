@@ -35,6 +35,7 @@ from .certificate_views import (
     public_certificate, purchase_certificate, course_certificate
 )
 from .reorder_views import (
+    reorder_course_outline,
     reorder_sections,
     reorder_lessons,
     reorder_quiz_questions,
@@ -51,7 +52,7 @@ __all__ = [
     'create_section', 'edit_section', 'delete_section', 'reorder_sections',
     'create_subsection', 'edit_subsection', 'delete_subsection', 'reorder_subsections',
     'create_lesson', 'edit_lesson', 'delete_lesson', 'delete_lesson_video',
-    'reorder_lessons', 'reorder_quiz_questions',
+    'reorder_lessons', 'reorder_quiz_questions', 'reorder_course_outline',
     'lesson_detail', 'check_and_issue_certificate',
     'public_certificate', 'purchase_certificate', 'home',
     'course_certificate', 'custom_page_not_found', 'upload_image',
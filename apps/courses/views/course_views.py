@@ -8,6 +8,10 @@ from django.views.decorators.http import require_http_methods
 from ..models import Course, Category
 from ..forms import CourseForm
 from ..services.search_service import log_search_query
+from ..services.search_index import annotate_relevance, search_courses
+from ..services.deadline_service import get_section_deadlines
+from ..services.page_cache import cache_anonymous_page
+from ..services.user_course_loader import get_user_course_loader
 
 
 @login_required
@@ -145,6 +149,12 @@ def delete_course(request, slug):
     return redirect('courses:edit_course', slug=course.slug)
 
 
+@cache_anonymous_page(
+    tags=('courses', 'categories'),
+    params=('category', 'is_free', 'min_price', 'max_price', 'ordering', 'page'),
+    # Free-text searches are logged per request and rarely repeat
+    bypass_params=('q',),
+)
 def course_list(request):
     """
     Display list of courses with search, filter, and sorting functionality.
@@ -155,29 +165,12 @@ def course_list(request):
         is_free: Filter free courses only (true/false)
         min_price: Minimum price filter
         max_price: Maximum price filter
-        ordering: Sort order (newest, oldest, price_low, price_high, popular)
+        ordering: Sort order (relevance, newest, oldest, price_low, price_high, popular)
     """
-    from django.db.models import Q, Count
-    
     courses = Course.objects.filter(is_active=True)
     
-    # Search query
     query = request.GET.get('q', '').strip()
-    if query:
-        # Log search query
-        log_search_query(query, request.user if request.user.is_authenticated else None)
 
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(description__icontains=query) |
-            Q(instructor__username__icontains=query) |
-            Q(instructor__first_name__icontains=query) |
-            Q(instructor__last_name__icontains=query) |
-            Q(category__name__icontains=query)
-        )
-
-    
     # Category filter
     category_id = request.GET.get('category', '').strip()
     if category_id and category_id.isdigit():
@@ -202,19 +195,26 @@ def course_list(request):
             courses = courses.filter(price__lte=float(max_price))
         except ValueError:
             pass
-    
+
+    # Search query, matched among the filtered courses
+    if query:
+        # Log search query
+        log_search_query(query, request.user if request.user.is_authenticated else None)
+
+        courses = annotate_relevance(courses, search_courses(query, candidates=courses))
+
     # Ordering
-    ordering = request.GET.get('ordering', 'newest')
-    if ordering == 'oldest':
+    ordering = request.GET.get('ordering', 'relevance' if query else 'newest')
+    if ordering == 'relevance' and query:
+        courses = courses.order_by('-relevance_score', '-created_at')
+    elif ordering == 'oldest':
         courses = courses.order_by('created_at')
     elif ordering == 'price_low':
         courses = courses.order_by('price', '-created_at')
     elif ordering == 'price_high':
         courses = courses.order_by('-price', '-created_at')
     elif ordering == 'popular':
-        courses = courses.annotate(
-            enrollment_count=Count('enrollments')
-        ).order_by('-enrollment_count', '-created_at')
+        courses = courses.order_by('-stats__enrollment_count', '-created_at')
     else:  # newest (default)
         courses = courses.order_by('-created_at')
     
@@ -242,9 +242,10 @@ def course_list(request):
     })
 
 
+@cache_anonymous_page(tags=('courses', 'categories'))
 def course_detail(request, slug):
     # First get the course without checking is_active
-    course = get_object_or_404(Course, slug=slug)
+    course = get_object_or_404(Course.objects.select_related('stats'), slug=slug)
     
     is_enrolled = False
     is_instructor = False
@@ -274,19 +275,20 @@ def course_detail(request, slug):
 
 @login_required
 def course_learning_process(request, slug):
-    course = get_object_or_404(Course, slug=slug, is_active=True)
-    is_enrolled = False
+    course = get_object_or_404(Course.objects.select_related('stats'), slug=slug, is_active=True)
+    enrollment = None
     is_instructor = False
     
     if request.user.is_authenticated:
         # Check if user is enrolled
-        is_enrolled = course.enrollments.filter(user=request.user).exists()
+        enrollment = get_user_course_loader(request.user).enrollment(course)
         # Check if user is the instructor
         is_instructor = (
                 hasattr(request.user, 'profile') and
                 request.user.profile.is_instructor() and
                 course.instructor == request.user
         )
+    is_enrolled = enrollment is not None
     
     # Only allow enrolled users or instructors to view the learning process
     if not is_enrolled and not is_instructor:
@@ -296,22 +298,16 @@ def course_learning_process(request, slug):
     # Check if user has certificate
     user_certificate = None
     if is_enrolled:
-        user_certificate = course.certificates.filter(user=request.user).first()
-    
-    # Get sections with optimization
-    sections = course.sections.prefetch_related(
-        'subsections',
-        'subsections__lessons',
-        'lessons'
-    ).all()
+        user_certificate = get_user_course_loader(request.user).certificate(course)
     
-    # Process sections to identify legacy lessons (lessons without subsection)
-    for section in sections:
-        section.has_legacy_lessons = section.lessons.filter(subsection__isnull=True).exists()
+    # Whole outline in a fixed number of queries (cached per content version)
+    start_date = enrollment.enrolled_at if enrollment else course.opening_date
+    sections = get_section_deadlines(request.user, course)
 
     return render(request, 'courses/course_learning_process.html', {
         'course': course,
-        'sections': sections,  # Pass processed sections
+        'sections': sections,  # (SectionOutline, deadline) pairs
+        'start_date': start_date,
         'is_enrolled': is_enrolled,
         'is_instructor': is_instructor,
         'user_certificate': user_certificate
@@ -2,29 +2,35 @@ import logging
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import Http404
 from django.contrib import messages
 from django.utils import timezone
-from ..models import (Course, Lesson, Enrollment, Progress, Certificate,
-                      Quiz, Answer, QuizAttempt, UserAnswer)
+from ..models import Course, Lesson, Enrollment, Progress, Certificate, QuizAttempt
 from apps.payments.models import Payment
+from ..services.content_cache import get_lesson_content, get_quiz_structure
+from ..services.outline_service import get_course_outline
+from ..services.quiz_service import (
+    get_answer_key, load_attempt_answers, save_attempt_answers
+)
 
 
 @login_required
 def lesson_detail(request, course_slug, lesson_slug):
-    course = get_object_or_404(Course, slug=course_slug, is_active=True)
-    # First get all lessons with the given slug in this course
-    lessons = Lesson.objects.filter(slug=lesson_slug, section__course=course, is_published=True)
-    if not lessons.exists():
+    course = get_object_or_404(Course.objects.select_related('stats'), slug=course_slug, is_active=True)
+    # Resolve the lesson from the cached course outline
+    outline = get_course_outline(course)
+    matches = outline.find_lessons(lesson_slug)
+    if not matches:
         raise Http404("Lesson not found")
-    elif lessons.count() > 1:
-        # If multiple lessons with same slug, get the first one
-        lesson = lessons.first()
-        # Log this issue for debugging
+    elif len(matches) > 1:
+        # If multiple lessons with same slug, use the first one
         logger = logging.getLogger(__name__)
         logger.warning(f"Multiple lessons found with slug '{lesson_slug}' in course '{course.title}'")
-    else:
-        lesson = lessons.first()
+    section_outline, subsection_outline, lesson_outline = matches[0]
+    lesson = get_lesson_content(course, lesson_outline.id)
+    if lesson is None:
+        raise Http404("Lesson not found")
 
     # Check if course is currently open
     now = timezone.now()
@@ -50,13 +56,22 @@ def lesson_detail(request, course_slug, lesson_slug):
         enrollment = get_object_or_404(Enrollment, user=request.user, course=course)
         has_certificate = Certificate.objects.filter(user=request.user, course=course).exists()
 
+    # Sidebar and deadline data shared by every render below
+    start_date = enrollment.enrolled_at if enrollment else course.opening_date
+    outline_context = {
+        'section_outline': section_outline,
+        'subsection_outline': subsection_outline,
+        'section_deadline': section_outline.deadline(start_date),
+        'now': timezone.now(),
+    }
+
     # Add debugging information
     if lesson.lesson_type == 'video' and not lesson.video_url:
         logger = logging.getLogger(__name__)
         logger.warning(f"Video lesson '{lesson.title}' (ID: {lesson.id}) has no video URL set")
 
     # Check if lesson/module is locked - instructors can always access
-    if not is_instructor and (lesson.is_locked or lesson.section.is_locked) and not has_certificate:
+    if not is_instructor and lesson_outline.locked and not has_certificate:
         # Lesson or module is locked and user doesn't have certificate
         messages.error(request, "This content is locked. Purchase a certificate to access it.")
         return redirect('courses:course_detail', slug=course.slug)
@@ -64,9 +79,8 @@ def lesson_detail(request, course_slug, lesson_slug):
     # Handle quiz lessons
     if lesson.lesson_type == 'quiz':
         # Check if quiz exists
-        try:
-            quiz = lesson.quiz
-        except Quiz.DoesNotExist:
+        quiz = get_quiz_structure(course, lesson.id)
+        if quiz is None:
             if not is_instructor:
                 messages.error(request, "This quiz is not configured yet.")
                 return redirect('courses:course_detail', slug=course.slug)
@@ -87,6 +101,7 @@ def lesson_detail(request, course_slug, lesson_slug):
                 context = {
                     'course': course,
                     'lesson': lesson,
+                    **outline_context,
                     'quiz': quiz,
                     'attempt': submitted_attempt,
                     'already_submitted': True,
@@ -114,74 +129,26 @@ def lesson_detail(request, course_slug, lesson_slug):
             if session_key not in request.session:
                 request.session[session_key] = 0
 
+            # Grade against the quiz's cached answer key
+            answer_key = get_answer_key(course, lesson.id)
+            if answer_key is None:
+                raise Http404("This quiz is not configured yet.")
+            posted_answers = answer_key.clean({
+                question.id: request.POST.getlist(f'question_{question.id}')
+                for question in answer_key.questions
+            })
+
             # Handle Check Answers
             if 'check_answers' in request.POST:
                 # Increment check count
                 request.session[session_key] = request.session.get(session_key, 0) + 1
                 check_count = request.session[session_key]
 
-                # Calculate score temporarily
-                score = 0
-                total_points = 0
-                check_results = {}
-
-                for question in quiz.questions.all():
-                    if question.question_type in ['single', 'multiple']:
-                        # Validate and save user answers during checkphase
-                        if question.question_type == 'single':
-                            answer_id= request.POST.get(f'question_{question.id}')
-                            if answer_id:
-                                try:
-                                    # Validate that the answer belongs to this question
-                                    selected_answer = Answer.objects.get(id=answer_id, question=question)
-                                    # Save user answer during check phase
-                                    user_answer, created = UserAnswer.objects.get_or_create(
-                                        quiz_attempt=current_attempt,
-                                        question=question
-                                    )
-                                    user_answer.selected_answers.clear()
-                                    user_answer.selected_answers.add(selected_answer)
-                                    
-                                    check_results[question.id] = {
-                                        'selected': [selected_answer.id],
-                                        'correct': selected_answer.is_correct
-                                    }
-                                    if selected_answer.is_correct:
-                                        score += question.points
-                                except Answer.DoesNotExist:
-                                    #Invalid answer ID provided
-                                    pass
-                        elif question.question_type == 'multiple':
-                            answer_ids = request.POST.getlist(f'question_{question.id}')
-                            if answer_ids:
-                                # Validate that all answers belong to this question
-                                selected_answers = Answer.objects.filter(id__in=answer_ids, question=question)
-                                
-                                # Only process if we found allthe answers
-                                if selected_answers.exists():
-                                    # Save user answers during check phase
-                                    user_answer, created = UserAnswer.objects.get_or_create(
-                                        quiz_attempt=current_attempt,
-                                        question=question
-                                    )
-                                    user_answer.selected_answers.set(selected_answers)
-
-                                    correct_answers = set(question.answers.filter(is_correct=True).values_list('id',flat=True))
-                                    selected_answer_ids = set(selected_answers.values_list('id', flat=True))
-
-                                    check_results[question.id] = {
-                                        'selected': list(selected_answer_ids),
-                                        'correct': correct_answers == selected_answer_ids
-                                    }
-
-                                    if correct_answers == selected_answer_ids:
-                                        score += question.points
-
-                        total_points += question.points
-                #Save the attempt with updated answers
-                current_attempt.save()
-
-                temp_score = (score / total_points * 100) if total_points > 0 else 0
+                # Save the checked answers and calculate score temporarily
+                save_attempt_answers(current_attempt, posted_answers)
+                grade = answer_key.grade(posted_answers)
+                check_results = grade.check_results()
+                temp_score = grade.score
 
                 # Check if max_check reached, auto submit
                 remaining_checks = lesson.max_check - check_count if lesson.max_check > 0 else -1
@@ -198,6 +165,7 @@ def lesson_detail(request, course_slug, lesson_slug):
                     context = {
                         'course': course,
                         'lesson': lesson,
+                        **outline_context,
                         'quiz': quiz,
                         'attempt': current_attempt,
                         'check_results': check_results,
@@ -214,73 +182,36 @@ def lesson_detail(request, course_slug, lesson_slug):
                 (0 < lesson.max_check <= request.session.get(session_key, 0)) or
                 current_attempt.is_time_limit_exceeded()):
                 
-                # If time limit exceeded, add a warning messageif current_attempt.is_time_limit_exceeded():
-                messages.warning(request, "Time limit exceeded. Your quiz has been automatically submitted.")
-                
+                # If time limit exceeded, add a warning message
+                if current_attempt.is_time_limit_exceeded():
+                    messages.warning(request, "Time limit exceeded. Your quiz has been automatically submitted.")
+
                 # Use current_attempt for final submission
                 new_attempt = current_attempt
 
-                score = 0
-                total_points = 0
-
-                #Validate all answers before calculating score
-                valid_submission = True
-                for question in quiz.questions.all():
-                    try:
-                        user_answer = UserAnswer.objects.get(quiz_attempt=new_attempt, question=question)
-                        
-                        # Validate that allselected answersbelong to the correct question
-                        for selected_answer in user_answer.selected_answers.all():
-                            if selected_answer.question != question:
-                                valid_submission = False
-                                break
-                    except UserAnswer.DoesNotExist:
-                        # No answer provided for this question - this is acceptable
-                        pass
-                
-                if not valid_submission:
-                    messages.error(request, "Invalid quiz submission detected. Please try again.")
-                    context ={
-                        'course': course,
-                        'lesson': lesson,
-                        'quiz': quiz,
-                        'attempt': new_attempt,
-                        'is_instructor': is_instructor,
-                    }
-                    return render(request, 'courses/lesson_detail.html', context)
-
-                for question in quiz.questions.all():
-                    # Get saved answers from the attempt
-                    try:
-                        user_answer = UserAnswer.objects.get(quiz_attempt=new_attempt, question=question)
-                        
-                        if question.question_type == 'single':
-                            # For single choice, check if the selected answer is correct
-                            selected_answers = user_answer.selected_answers.all()
-                            if selected_answers.exists():
-                                selected_answer = selected_answers.first()
-                                if selected_answer.is_correct:
-                                    score += question.points
-                                total_points += question.points
-                        elif question.question_type == 'multiple':
-                            # For multiple choice, check if all selected answers match exactly the correct answers
-                            correct_answers = set(question.answers.filter(is_correct=True).values_list('id', flat=True))
-                            selected_answer_ids = set(user_answer.selected_answers.values_list('id', flat=True))
-
-                            if correct_answers == selected_answer_ids:
-                                score += question.points
-                            total_points += question.points
-                    except UserAnswer.DoesNotExist:
-                        # No answer provided for this question
-                        total_points += question.points
-
-                # Calculate and save score
-                if total_points > 0:
-                    new_attempt.score = (score / total_points) * 100
-                else:
-                    new_attempt.score = 0
-                new_attempt.completed_at = timezone.now()
-                new_attempt.save()
+                with transaction.atomic():
+                    # Answers posted with the final submission replace the checked ones
+                    save_attempt_answers(new_attempt, posted_answers)
+                    saved_answers = load_attempt_answers(new_attempt)
+
+                    # Validate all answers before calculating score
+                    if not answer_key.is_valid(saved_answers):
+                        transaction.set_rollback(True)
+                        messages.error(request, "Invalid quiz submission detected. Please try again.")
+                        context = {
+                            'course': course,
+                            'lesson': lesson,
+                            **outline_context,
+                            'quiz': quiz,
+                            'attempt': new_attempt,
+                            'is_instructor': is_instructor,
+                        }
+                        return render(request, 'courses/lesson_detail.html', context)
+
+                    # Calculate and save score
+                    new_attempt.score = answer_key.grade(saved_answers).score
+                    new_attempt.completed_at = timezone.now()
+                    new_attempt.save()
 
                 # Clear session check count
                 if session_key in request.session:
@@ -309,6 +240,7 @@ def lesson_detail(request, course_slug, lesson_slug):
                 context = {
                     'course': course,
                     'lesson': lesson,
+                    **outline_context,
                     'quiz': quiz,
                     'attempt': new_attempt,
                     'already_submitted': True,
@@ -337,6 +269,7 @@ def lesson_detail(request, course_slug, lesson_slug):
                     context = {
                         'course': course,
                         'lesson': lesson,
+                        **outline_context,
                         'quiz': quiz,
                         'attempt': last_completed_attempt,
                         'already_submitted': True,
@@ -357,6 +290,7 @@ def lesson_detail(request, course_slug, lesson_slug):
             context = {
                 'course': course,
                 'lesson': lesson,
+                **outline_context,
                 'quiz': quiz,
                 'attempt': current_attempt,
                 'remaining_checks': remaining_checks,
@@ -368,6 +302,7 @@ def lesson_detail(request, course_slug, lesson_slug):
             context = {
                 'course': course,
                 'lesson': lesson,
+                **outline_context,
                 'quiz': quiz,
                 'is_instructor': is_instructor,
             }
@@ -389,10 +324,9 @@ def lesson_detail(request, course_slug, lesson_slug):
         check_and_issue_certificate(request.user, course)
 
     # Get next and previous lessons
-    all_lessons = Lesson.objects.filter(section__course=course, is_published=True)
-    all_lessons_list = list(all_lessons)
+    all_lessons_list = list(outline.published_lessons)
     try:
-        current_index = all_lessons_list.index(lesson)
+        current_index = all_lessons_list.index(lesson_outline)
 
         prev_lesson = None
         next_lesson = None
@@ -410,6 +344,7 @@ def lesson_detail(request, course_slug, lesson_slug):
     context = {
         'course': course,
         'lesson': lesson,
+        **outline_context,
         'prev_lesson': prev_lesson,
         'next_lesson': next_lesson,
         'enrollment': enrollment,
@@ -423,7 +358,7 @@ def check_and_issue_certificate(user, course):
     Check if user has completed all lessons in a course and issue certificate if so
     """
     # Get all lessons in the course
-    all_lessons = Lesson.objects.filter(section__course=course, is_published=True)
+    all_lessons = Lesson.objects.filter(subsection__section__course=course, is_published=True)
     total_lessons = all_lessons.count()
 
     if total_lessons == 0:
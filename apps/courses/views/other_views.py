@@ -14,8 +14,11 @@ from django.conf import settings
 from ..models import Course, Lesson, Enrollment, Section, Category
 
 
+from ..services.page_cache import cache_anonymous_page
 from ..services.search_service import get_popular_search_terms
 
+
+@cache_anonymous_page(tags=('courses', 'categories'))
 def home(request):
     categories = Category.objects.all()
     # Show all active courses but respect opening_date and closing_date
@@ -1,38 +1,76 @@
+import json
+
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
 from django.http import JsonResponse
-from ..models import Course, Lesson, Section, Subsection, Quiz, Question
+from ..models import Course, Lesson, Section, Subsection, Quiz
+from ..services.reorder_service import reorder_course, reorder_questions
+
+
+def _is_ajax_post(request):
+    return request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def _invalid_request():
+    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+
+
+def _apply(reorder, *args, **kwargs):
+    """Run a reorder and report the outcome the way the sortable widgets expect"""
+    try:
+        reorder(*args, **kwargs)
+    except ValidationError as e:
+        return JsonResponse({'status': 'error', 'message': ' '.join(e.messages)}, status=400)
+    return JsonResponse({'status': 'success'})
 
 
 @login_required
-def reorder_sections(request, course_slug):
-    """
-    Handle section reordering via AJAX drag and drop
+def reorder_course_outline(request, course_slug):
     """
-    print(f"Reorder sections called with course_slug: {course_slug}")
-    print(f"Request method: {request.method}")
-    print(f"Is AJAX: {request.headers.get('X-Requested-With') == 'XMLHttpRequest'}")
+    Reorder sections, subsections and lessons of a course in one call.
 
-    course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
-    print(f"Found course: {course.title}")
+    Expects a JSON body such as::
 
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        try:
-            # Get the ordered section IDs from the request
-            section_order = request.POST.getlist('section_order[]')
-            print(f"Section order received: {section_order}")
+        {"sections": [3, 1, 2],
+         "subsections": {"1": [7, 5], "3": [6]},
+         "lessons": {"5": [12, 10], "7": [11]}}
 
-            # Update the order of each section
-            for index, section_id in enumerate(section_order):
-                Section.objects.filter(id=section_id, course=course).update(order=index)
-                print(f"Updated section {section_id} order to {index}")
+    Every key is optional. Lists under "subsections"/"lessons" are the complete
+    new contents of that section/subsection and may take items from another
+    one. The change is validated as a whole and applied atomically.
+    """
+    course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
+    if request.method != 'POST':
+        return _invalid_request()
 
-            return JsonResponse({'status': 'success'})
-        except Exception as e:
-            print(f"Error in reorder_sections: {str(e)}")
-            return JsonResponse({'status': 'error', 'message': str(e)})
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    if not isinstance(payload, dict) or not all(
+        isinstance(payload.get(key, {}), dict) for key in ('subsections', 'lessons')
+    ):
+        return JsonResponse({'status': 'error', 'message': 'Invalid reorder payload'}, status=400)
+
+    return _apply(
+        reorder_course,
+        course,
+        sections=payload.get('sections'),
+        subsections=payload.get('subsections'),
+        lessons=payload.get('lessons'),
+    )
 
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+
+@login_required
+def reorder_sections(request, course_slug):
+    """
+    Handle section reordering via AJAX drag and drop
+    """
+    course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
+    if not _is_ajax_post(request):
+        return _invalid_request()
+    return _apply(reorder_course, course, sections=request.POST.getlist('section_order[]'))
 
 
 @login_required
@@ -42,53 +80,34 @@ def reorder_subsections(request, course_slug, section_id):
     """
     course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
     section = get_object_or_404(Section, id=section_id, course=course)
-
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        try:
-            # Get the ordered subsection IDs from the request
-            subsection_order = request.POST.getlist('subsection_order[]')
-
-            # Update the order of each subsection
-            for index, subsection_id in enumerate(subsection_order):
-                Subsection.objects.filter(id=subsection_id, section=section).update(order=index)
-
-            return JsonResponse({'status': 'success'})
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)})
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+    if not _is_ajax_post(request):
+        return _invalid_request()
+    return _apply(
+        reorder_course, course, subsections={section.pk: request.POST.getlist('subsection_order[]')}
+    )
 
 
 @login_required
 def reorder_lessons(request, course_slug, section_id):
     """
     Handle lesson reordering via AJAX drag and drop
-    """
-    print(f"Reorder lessons called with course_slug: {course_slug}, section_id: {section_id}")
-    print(f"Request method: {request.method}")
-    print(f"Is AJAX: {request.headers.get('X-Requested-With') == 'XMLHttpRequest'}")
 
+    Lessons belong to subsections, so the section-wide order is applied to
+    each subsection's lessons, which stay where they are.
+    """
     course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
     section = get_object_or_404(Section, id=section_id, course=course)
-    print(f"Found section: {section.title}")
-
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        try:
-            # Get the ordered lesson IDs from the request
-            lesson_order = request.POST.getlist('lesson_order[]')
-            print(f"Lesson order received: {lesson_order}")
-
-            # Update the order of each lesson
-            for index, lesson_id in enumerate(lesson_order):
-                Lesson.objects.filter(id=lesson_id, section=section).update(order=index)
-                print(f"Updated lesson {lesson_id} order to {index}")
+    if not _is_ajax_post(request):
+        return _invalid_request()
 
-            return JsonResponse({'status': 'success'})
-        except Exception as e:
-            print(f"Error in reorder_lessons: {str(e)}")
-            return JsonResponse({'status': 'error', 'message': str(e)})
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+    subsection_of = dict(Lesson.objects.filter(subsection__section=section).values_list('id', 'subsection_id'))
+    lessons = {}
+    for lesson_id in request.POST.getlist('lesson_order[]'):
+        parent = subsection_of.get(int(lesson_id)) if str(lesson_id).isdigit() else None
+        if parent is None:
+            return JsonResponse({'status': 'error', 'message': f'Unknown lesson id: {lesson_id}'}, status=400)
+        lessons.setdefault(parent, []).append(lesson_id)
+    return _apply(reorder_course, course, lessons=lessons)
 
 
 @login_required
@@ -99,21 +118,9 @@ def reorder_subsection_lessons(request, course_slug, section_id, subsection_id):
     course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
     section = get_object_or_404(Section, id=section_id, course=course)
     subsection = get_object_or_404(Subsection, id=subsection_id, section=section)
-
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        try:
-            # Get the ordered lesson IDs from the request
-            lesson_order = request.POST.getlist('lesson_order[]')
-
-            # Update the order of each lesson
-            for index, lesson_id in enumerate(lesson_order):
-                Lesson.objects.filter(id=lesson_id, subsection=subsection).update(order=index)
-
-            return JsonResponse({'status': 'success'})
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)})
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+    if not _is_ajax_post(request):
+        return _invalid_request()
+    return _apply(reorder_course, course, lessons={subsection.pk: request.POST.getlist('lesson_order[]')})
 
 
 @login_required
@@ -123,7 +130,7 @@ def reorder_quiz_questions(request, course_slug, section_id, lesson_id):
     """
     course = get_object_or_404(Course, slug=course_slug, instructor=request.user)
     section = get_object_or_404(Section, id=section_id, course=course)
-    lesson = get_object_or_404(Lesson, id=lesson_id, section=section)
+    lesson = get_object_or_404(Lesson, id=lesson_id, subsection__section=section)
 
     # Ensure lesson has a quiz
     if lesson.lesson_type != 'quiz':
@@ -134,17 +141,6 @@ def reorder_quiz_questions(request, course_slug, section_id, lesson_id):
     except Quiz.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Quiz not found for this lesson'})
 
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        try:
-            # Get the ordered question IDs from the request
-            question_order = request.POST.getlist('question_order[]')
-
-            # Update the order of each question
-            for index, question_id in enumerate(question_order):
-                Question.objects.filter(id=question_id, quiz=quiz).update(order=index)
-
-            return JsonResponse({'status': 'success'})
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)})
-
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'})
+    if not _is_ajax_post(request):
+        return _invalid_request()
+    return _apply(reorder_questions, quiz, request.POST.getlist('question_order[]'))
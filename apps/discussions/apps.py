@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class DiscussionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.discussions'
+
+    def ready(self):
+        import apps.discussions.signals
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_scores(apps, schema_editor):
+    Discussion = apps.get_model("discussions", "Discussion")
+    Reply = apps.get_model("discussions", "Reply")
+    Vote = apps.get_model("discussions", "Vote")
+
+    for model, field in ((Discussion, "discussion"), (Reply, "reply")):
+        totals = (
+            Vote.objects.filter(**{field: OuterRef("pk")})
+            .values(field)
+            .annotate(total=Sum("vote_type"))
+            .values("total")
+        )
+        model.objects.update(score=Coalesce(Subquery(totals), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("discussions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="discussion",
+            name="score",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="score",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.10 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MAX_REPLY_DEPTH = 20
+PATH_SEGMENT_WIDTH = 8
+
+
+def place_existing_replies(apps, schema_editor):
+    Reply = apps.get_model("discussions", "Reply")
+
+    discussion_ids = Reply.objects.values_list("discussion_id", flat=True).distinct()
+    for discussion_id in discussion_ids.iterator():
+        replies = list(
+            Reply.objects.filter(discussion_id=discussion_id).order_by("created_at", "id")
+        )
+        children = {}
+        for reply in replies:
+            children.setdefault(reply.parent_id, []).append(reply)
+
+        # Walk the tree from the top-level replies so parents are placed first
+        stack = [(None, reply) for reply in reversed(children.get(None, []))]
+        counters = {}
+        while stack:
+            parent, reply = stack.pop()
+            if parent is not None and parent.depth >= MAX_REPLY_DEPTH:
+                parent = next(r for r in replies if r.pk == parent.parent_id)
+                reply.parent_id = parent.pk
+            key = parent.pk if parent is not None else None
+            counters[key] = counters.get(key, 0) + 1
+            reply.position = counters[key]
+            segment = str(reply.position).zfill(PATH_SEGMENT_WIDTH)
+            if parent is None:
+                reply.root_id = reply.pk
+                reply.depth = 0
+                reply.path = segment
+                reply.branch_rank = 0
+            else:
+                reply.root_id = parent.root_id
+                reply.depth = parent.depth + 1
+                reply.path = f"{parent.path}.{segment}"
+                reply.branch_rank = max(parent.branch_rank, reply.position)
+            stack.extend((reply, child) for child in reversed(children.get(reply.pk, [])))
+
+        Reply.objects.bulk_update(
+            replies, ["parent", "root", "depth", "position", "path", "branch_rank"], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("discussions", "0002_discussion_score_reply_score"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reply",
+            name="root",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="thread_replies",
+                to="discussions.reply",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="position",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="path",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="branch_rank",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(place_existing_replies, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(fields=["discussion", "depth", "position"], name="reply_top_level_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(fields=["root", "path"], name="reply_thread_path_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(fields=["parent", "position"], name="reply_children_idx"),
+        ),
+    ]
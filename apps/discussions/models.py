@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 from django.conf import settings
 from apps.courses.models import Course
 
+# Deeper replies are attached to their parent's parent; keeps Reply.path within its max_length
+MAX_REPLY_DEPTH = 20
+PATH_SEGMENT_WIDTH = 8
+
 class Discussion(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='discussions')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='discussions')
@@ -10,6 +15,8 @@ class Discussion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_resolved = models.BooleanField(default=False)
+    # Net vote score (upvotes - downvotes), maintained by signals on Vote
+    score = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -25,12 +32,68 @@ class Reply(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_answer = models.BooleanField(default=False)
+    # Net vote score (upvotes - downvotes), maintained by signals on Vote
+    score = models.IntegerField(default=0, editable=False)
+
+    # Thread placement, assigned on insert (see discussions/services.py for the loaders):
+    # root is the top-level reply of the thread (itself for top-level replies),
+    # position is the 1-based order among siblings, path joins the zero-padded
+    # positions from the root down so ordering by path gives the tree in display
+    # order, and branch_rank is the largest position on the path below the root.
+    root = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='thread_replies', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    position = models.PositiveIntegerField(default=0, editable=False)
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    branch_rank = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Reply by {self.author} on {self.discussion}"
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['discussion', 'depth', 'position'], name='reply_top_level_idx'),
+            models.Index(fields=['root', 'path'], name='reply_thread_path_idx'),
+            models.Index(fields=['parent', 'position'], name='reply_children_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding or self.path:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            # Serialize inserts into the same discussion so sibling positions stay unique
+            Discussion.objects.select_for_update().filter(pk=self.discussion_id).exists()
+            self.place_in_thread()
+            super().save(*args, **kwargs)
+            if self.root_id is None:
+                Reply.objects.filter(pk=self.pk).update(root=self.pk)
+                self.root_id = self.pk
+
+    def place_in_thread(self):
+        """Assign root, depth, position, path and branch_rank below self.parent"""
+        parent = self.parent
+        if parent is not None and parent.discussion_id != self.discussion_id:
+            raise ValueError("A reply's parent must belong to the same discussion")
+        if parent is not None and parent.depth >= MAX_REPLY_DEPTH:
+            parent = self.parent = parent.parent
+
+        last = Reply.objects.filter(discussion_id=self.discussion_id, parent=parent).aggregate(
+            last=Max('position')
+        )['last']
+        self.position = (last or 0) + 1
+        segment = str(self.position).zfill(PATH_SEGMENT_WIDTH)
+        if parent is None:
+            self.root = None
+            self.depth = 0
+            self.path = segment
+            self.branch_rank = 0
+        else:
+            self.root_id = parent.root_id
+            self.depth = parent.depth + 1
+            self.path = f"{parent.path}.{segment}"
+            self.branch_rank = max(parent.branch_rank, self.position)
 
 class Vote(models.Model):
     VOTE_TYPES = (
@@ -0,0 +1,146 @@
+"""
+Discussion services - voting, thread querysets and the reply tree loader.
+
+Discussion.score and Reply.score hold the net vote score (upvotes minus
+downvotes). They are recomputed from the Vote table by the signals in
+discussions/signals.py whenever a vote is cast, changed or removed, so
+listing a thread never has to count votes.
+
+Replies are loaded as a tree from their materialized thread placement
+(root, depth, position, path, branch_rank on Reply): a page of top-level
+replies with a bounded number of children per level comes back from one
+query ordered by path, and every node that has more children than were
+loaded carries a cursor for fetching the next batch.
+"""
+from dataclasses import dataclass, field as dataclass_field
+from typing import List, Optional
+
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Discussion, Reply, Vote
+
+
+def _target(discussion=None, reply=None):
+    if (discussion is None) == (reply is None):
+        raise ValueError("Vote on exactly one of discussion or reply")
+    return ("discussion", discussion) if discussion is not None else ("reply", reply)
+
+
+def refresh_score(discussion_id=None, reply_id=None):
+    """Recompute the denormalized score of one discussion or reply in a single UPDATE"""
+    field, pk = _target(discussion_id, reply_id)
+    model = Discussion if field == "discussion" else Reply
+    total = (
+        Vote.objects.filter(**{field: OuterRef("pk")})
+        .values(field)
+        .annotate(total=Sum("vote_type"))
+        .values("total")
+    )
+    model.objects.filter(pk=pk).update(score=Coalesce(Subquery(total), Value(0)))
+
+
+def cast_vote(user, vote_type, discussion=None, reply=None):
+    """
+    Record user's vote (1 or -1) on a discussion or reply; 0 removes it.
+    Returns the target's new score.
+    """
+    field, target = _target(discussion, reply)
+    lookup = {"user": user, field: target}
+    with transaction.atomic():
+        if vote_type == 0:
+            Vote.objects.filter(**lookup).delete()
+        else:
+            Vote.objects.update_or_create(**lookup, defaults={"vote_type": vote_type})
+    return type(target).objects.values_list("score", flat=True).get(pk=target.pk)
+
+
+def with_user_vote(queryset, user, field):
+    """Annotate user_vote (1, -1 or 0) for the given user on a Discussion or Reply queryset"""
+    if not user.is_authenticated:
+        return queryset.annotate(user_vote=Value(0, output_field=IntegerField()))
+    vote = Vote.objects.filter(user=user, **{field: OuterRef("pk")}).values("vote_type")[:1]
+    return queryset.annotate(user_vote=Coalesce(Subquery(vote), Value(0)))
+
+
+# ============================================
+# Reply tree
+# ============================================
+
+REPLY_PAGE_SIZE = 20
+REPLY_TREE_DEPTH = 2
+REPLY_CHILDREN_PER_NODE = 5
+
+
+@dataclass
+class ReplyNode:
+    reply: Reply
+    children: List['ReplyNode'] = dataclass_field(default_factory=list)
+    # Pass as `after` to load_reply_children(reply) for the children not loaded yet
+    more_children_after: Optional[int] = None
+
+    @property
+    def has_more_children(self) -> bool:
+        return self.more_children_after is not None
+
+
+@dataclass
+class ReplyPage:
+    nodes: List[ReplyNode]
+    # Pass as `after` to load the next page of siblings; None on the last page
+    next_after: Optional[int] = None
+
+
+def _with_last_child_position(queryset):
+    last_child = Reply.objects.filter(parent=OuterRef("pk")).order_by("-position").values("position")[:1]
+    return queryset.annotate(last_child_position=Coalesce(Subquery(last_child), Value(0)))
+
+
+def _node(reply, loaded_children):
+    more = None
+    if reply.last_child_position > loaded_children:
+        more = loaded_children
+    return ReplyNode(reply=reply, more_children_after=more)
+
+
+def load_reply_tree(discussion, after=0, page_size=REPLY_PAGE_SIZE, depth=REPLY_TREE_DEPTH,
+                    children_per_node=REPLY_CHILDREN_PER_NODE, queryset=None):
+    """
+    Load a page of top-level replies (position > after) with up to `depth`
+    levels of children, at most `children_per_node` per parent, in one query.
+    The number of rows is bounded by page_size * children_per_node ** depth
+    whatever the size of the thread.
+    """
+    queryset = queryset if queryset is not None else Reply.objects.select_related("author")
+    roots = Reply.objects.filter(
+        discussion=discussion, depth=0, position__gt=after
+    ).order_by("position").values("pk")[:page_size]
+    replies = _with_last_child_position(
+        queryset.filter(root__in=Subquery(roots), depth__lte=depth, branch_rank__lte=children_per_node)
+    ).order_by("path")
+
+    top_level = []
+    nodes = {}
+    for reply in replies:
+        loaded = 0 if reply.depth >= depth else children_per_node
+        node = nodes[reply.pk] = _node(reply, loaded)
+        if reply.parent_id is None:
+            top_level.append(node)
+        elif reply.parent_id in nodes:
+            nodes[reply.parent_id].children.append(node)
+
+    next_after = top_level[-1].reply.position if len(top_level) == page_size else None
+    return ReplyPage(nodes=top_level, next_after=next_after)
+
+
+def load_reply_children(parent, after=0, limit=REPLY_CHILDREN_PER_NODE, queryset=None):
+    """The next `limit` direct children of a reply after the given position, in one query"""
+    queryset = queryset if queryset is not None else Reply.objects.select_related("author")
+    children = list(
+        _with_last_child_position(queryset.filter(parent=parent, position__gt=after))
+        .order_by("position")[:limit]
+    )
+    nodes = [_node(child, 0) for child in children]
+    next_after = children[-1].position if len(children) == limit else None
+    return ReplyPage(nodes=nodes, next_after=next_after)
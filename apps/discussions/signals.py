@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Vote
+from .services import refresh_score
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def update_vote_score(sender, instance, **kwargs):
+    """Keep Discussion.score / Reply.score in step with the votes"""
+    if kwargs.get('raw'):
+        return
+    if instance.discussion_id:
+        refresh_score(discussion_id=instance.discussion_id)
+    if instance.reply_id:
+        refresh_score(reply_id=instance.reply_id)
@@ -1,10 +1,15 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from apps.courses.models import Course, Category
 from .models import Discussion, Reply, Vote
+from .services import load_reply_children, load_reply_tree
 
 class DiscussionTests(TestCase):
     def setUp(self):
@@ -85,3 +90,194 @@ class DiscussionTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         reply.refresh_from_db()
         self.assertTrue(reply.is_answer)
+
+
+class VoteScoreTests(TestCase):
+    def setUp(self):
+        from apps.courses.models import Enrollment
+        category = Category.objects.create(name='Scores')
+        self.instructor = User.objects.create_user(username='instructor', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        self.course = Course.objects.create(
+            title='Scores', slug='scores', category=category, instructor=self.instructor
+        )
+        Enrollment.objects.create(user=self.student, course=self.course)
+        self.discussion = Discussion.objects.create(
+            course=self.course, author=self.student, title='Help', body='Me'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+
+    def add_replies(self, count):
+        for number in range(count):
+            author = User.objects.create_user(username=f'replier{Reply.objects.count()}', password='password')
+            reply = Reply.objects.create(discussion=self.discussion, author=author, body=f'Reply {number}')
+            Vote.objects.create(user=author, reply=reply, vote_type=1)
+
+    def test_score_follows_votes(self):
+        url = f'/api/discussions/{self.discussion.id}/vote/'
+        self.assertEqual(self.client.post(url, {'vote_type': 1}).data['score'], 1)
+        Vote.objects.create(user=self.instructor, discussion=self.discussion, vote_type=-1)
+        self.discussion.refresh_from_db()
+        self.assertEqual(self.discussion.score, 0)
+
+        # Changing a vote replaces it rather than adding a second one
+        self.assertEqual(self.client.post(url, {'vote_type': -1}).data['score'], -2)
+        self.assertEqual(self.client.post(url, {'vote_type': 0}).data['score'], -1)
+        self.assertEqual(Vote.objects.filter(discussion=self.discussion).count(), 1)
+
+    def test_edits_keep_votes_cast_meanwhile(self):
+        from apps.api.views.discussion_views import DiscussionViewSet, ReplyViewSet
+        reply = Reply.objects.create(discussion=self.discussion, author=self.instructor, body='Answer')
+
+        def vote_after_load(viewset, **target):
+            get_object = viewset.get_object
+
+            def load_then_vote(view):
+                obj = get_object(view)
+                # The vote commits after the view loaded the instance it saves
+                Vote.objects.create(user=self.instructor, vote_type=1, **target)
+                return obj
+            return mock.patch.object(viewset, 'get_object', load_then_vote)
+
+        with vote_after_load(DiscussionViewSet, discussion=self.discussion):
+            response = self.client.patch(f'/api/discussions/{self.discussion.id}/', {'title': 'Edited'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with vote_after_load(ReplyViewSet, reply=reply):
+            response = self.client.post(f'/api/replies/{reply.id}/mark_answer/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.discussion.refresh_from_db()
+        reply.refresh_from_db()
+        self.assertEqual((self.discussion.title, self.discussion.score), ('Edited', 1))
+        self.assertEqual((reply.is_answer, reply.score), (True, 1))
+
+    def test_thread_query_count_does_not_grow_with_replies(self):
+        url = f'/api/discussions/{self.discussion.id}/'
+        self.add_replies(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self.add_replies(20)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.data['reply_count'], 22)
+        self.assertEqual([reply['vote_count'] for reply in response.data['replies']], [1] * 22)
+        self.assertEqual(response.data['replies'][0]['user_vote'], 0)
+
+    def test_user_vote_is_annotated_per_user(self):
+        reply = Reply.objects.create(discussion=self.discussion, author=self.instructor, body='Answer')
+        self.client.post(f'/api/replies/{reply.id}/vote/', {'vote_type': -1})
+
+        response = self.client.get(f'/api/replies/{reply.id}/')
+        self.assertEqual((response.data['vote_count'], response.data['user_vote']), (-1, -1))
+        response = self.client.get(f'/api/discussions/{self.discussion.id}/')
+        self.assertEqual(response.data['replies'][0]['user_vote'], -1)
+
+
+class ReplyTreeTests(TestCase):
+    def setUp(self):
+        from apps.courses.models import Enrollment
+        category = Category.objects.create(name='Threads')
+        self.instructor = User.objects.create_user(username='instructor', password='password')
+        self.student = User.objects.create_user(username='student', password='password')
+        self.course = Course.objects.create(
+            title='Threads', slug='threads', category=category, instructor=self.instructor
+        )
+        Enrollment.objects.create(user=self.student, course=self.course)
+        self.discussion = Discussion.objects.create(
+            course=self.course, author=self.student, title='Help', body='Me'
+        )
+
+    def reply(self, parent=None, body='Reply'):
+        return Reply.objects.create(discussion=self.discussion, author=self.student, parent=parent, body=body)
+
+    def test_replies_are_placed_in_thread(self):
+        first = self.reply()
+        second = self.reply()
+        child = self.reply(first)
+        grandchild = self.reply(child)
+        first.refresh_from_db()
+
+        self.assertEqual((first.root_id, first.depth, first.position), (first.pk, 0, 1))
+        self.assertEqual(second.position, 2)
+        self.assertEqual((grandchild.root_id, grandchild.depth), (first.pk, 2))
+        self.assertEqual(grandchild.path, '00000001.00000001.00000001')
+        ordered = list(Reply.objects.order_by('path').values_list('pk', flat=True))
+        self.assertEqual(ordered, [first.pk, child.pk, grandchild.pk, second.pk])
+
+        with self.assertRaises(ValueError):
+            other = Discussion.objects.create(course=self.course, author=self.student, title='Other', body='x')
+            Reply.objects.create(discussion=other, author=self.student, parent=first, body='x')
+
+    def test_too_deep_replies_attach_to_grandparent(self):
+        from .models import MAX_REPLY_DEPTH
+        reply = self.reply()
+        for _ in range(MAX_REPLY_DEPTH):
+            reply = self.reply(reply)
+        deepest = self.reply(reply)
+        self.assertEqual(deepest.depth, MAX_REPLY_DEPTH)
+        self.assertEqual(deepest.parent_id, reply.parent_id)
+
+    def test_tree_page_is_one_bounded_query(self):
+        roots = [self.reply(body=f'Root {n}') for n in range(3)]
+        children = [self.reply(roots[0], body=f'Child {n}') for n in range(4)]
+        self.reply(children[0], body='Grandchild')
+        self.reply(children[3], body='Hidden grandchild')
+        self.reply(self.reply(children[0], body='Last level'), body='Too deep')
+
+        with self.assertNumQueries(1):
+            page = load_reply_tree(self.discussion, page_size=2, depth=2, children_per_node=3)
+            self.assertEqual([node.reply.body for node in page.nodes], ['Root 0', 'Root 1'])
+
+        first = page.nodes[0]
+        self.assertEqual([node.reply.body for node in first.children], ['Child 0', 'Child 1', 'Child 2'])
+        self.assertEqual(first.more_children_after, 3)
+        grandchildren = first.children[0].children
+        self.assertEqual([node.reply.body for node in grandchildren], ['Grandchild', 'Last level'])
+        self.assertEqual(grandchildren[1].more_children_after, 0)
+        self.assertIsNone(page.nodes[1].more_children_after)
+        self.assertEqual(page.next_after, 2)
+
+        last = load_reply_tree(self.discussion, after=page.next_after, page_size=2)
+        self.assertEqual([node.reply.body for node in last.nodes], ['Root 2'])
+        self.assertIsNone(last.next_after)
+
+        more = load_reply_children(roots[0], after=first.more_children_after)
+        self.assertEqual([node.reply.body for node in more.nodes], ['Child 3'])
+        self.assertEqual(more.nodes[0].more_children_after, 0)
+
+    def test_api_tree_endpoints(self):
+        root = self.reply(body='Root')
+        for n in range(3):
+            self.reply(root, body=f'Child {n}')
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+
+        response = client.get(f'/api/discussions/{self.discussion.pk}/replies/', {'children': 2})
+        self.assertEqual(response.status_code, 200)
+        node = response.data['results'][0]
+        self.assertEqual([child['body'] for child in node['children']], ['Child 0', 'Child 1'])
+        self.assertEqual(node['more_children_after'], 2)
+
+        response = client.get(f'/api/replies/{root.pk}/children/', {'after': 2})
+        self.assertEqual([child['body'] for child in response.data['results']], ['Child 2'])
+
+        response = client.post(f'/api/discussions/{self.discussion.pk}/reply/', {'body': 'Nested', 'parent': root.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['depth'], 1)
+
+    def test_detail_page_renders_tree(self):
+        root = self.reply(body='Root reply')
+        self.client.login(username='student', password='password')
+        url = reverse('discussions:discussion_detail', kwargs={'slug': self.course.slug, 'pk': self.discussion.pk})
+
+        self.client.post(url, {'body': 'Nested reply', 'parent': root.pk})
+        self.assertEqual(Reply.objects.get(body='Nested reply').parent_id, root.pk)
+
+        response = self.client.get(url)
+        self.assertContains(response, 'Root reply')
+        self.assertContains(response, 'Nested reply')
+        response = self.client.get(url, {'thread': root.pk})
+        self.assertContains(response, 'Back to all replies')
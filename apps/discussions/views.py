@@ -3,10 +3,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib import messages
-from django.db.models import Count, Prefetch
+from django.db.models import Count
 from apps.courses.models import Course, Enrollment
 from .models import Discussion, Reply
 from .forms import DiscussionForm, ReplyForm
+from .services import REPLY_PAGE_SIZE, load_reply_children, load_reply_tree
+from apps.notifications.services import notify_users
 
 class CourseContextMixin:
     def get_context_data(self, **kwargs):
@@ -43,15 +45,14 @@ class DiscussionCreateView(LoginRequiredMixin, CourseContextMixin, CreateView):
         response = super().form_valid(form)
         
         # Notify instructor if the author is not the instructor
-        if course.instructor != self.request.user:
-            from apps.notifications.models import Notification
-            Notification.objects.create(
-                recipient=course.instructor,
-                sender=self.request.user,
+        if course.instructor_id != self.request.user.pk:
+            notify_users(
+                [course.instructor_id],
                 title=f"New Discussion: {form.instance.title}",
                 message=f"{self.request.user.username} started a new discussion in {course.title}.",
                 link=reverse('discussions:discussion_detail', kwargs={'slug': course.slug, 'pk': self.object.pk}),
-                notification_type='discussion'
+                notification_type='discussion',
+                sender=self.request.user,
             )
             
         return response
@@ -65,13 +66,28 @@ class DiscussionDetailView(LoginRequiredMixin, CourseContextMixin, DetailView):
     context_object_name = 'discussion'
 
     def get_queryset(self):
-        # Optimization: Prefetch replies and specific votes
-        return super().get_queryset().select_related('author').prefetch_related(
-            'replies', 'replies__author'
-        )
+        return super().get_queryset().select_related('author').annotate(reply_count=Count('replies'))
+
+    def get_reply_page(self):
+        """
+        A page of the reply tree: top-level replies after ?after=, or the
+        children of ?thread=<reply id> after ?after= when expanding a branch.
+        """
+        try:
+            after = max(int(self.request.GET.get('after', 0)), 0)
+        except ValueError:
+            after = 0
+        thread_id = self.request.GET.get('thread')
+        if thread_id:
+            parent = get_object_or_404(
+                Reply.objects.select_related('author'), pk=thread_id, discussion=self.object
+            )
+            return parent, load_reply_children(parent, after=after, limit=REPLY_PAGE_SIZE)
+        return None, load_reply_tree(self.object, after=after)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['thread_parent'], context['reply_page'] = self.get_reply_page()
         context['reply_form'] = ReplyForm()
         # Pass user id to template for JS
         context['user_id'] = self.request.user.id
@@ -95,7 +111,8 @@ class DiscussionDetailView(LoginRequiredMixin, CourseContextMixin, DetailView):
             if new_title:
                 self.object.title = new_title
                 
-            self.object.save()
+            # update_fields keeps a vote score written while the form was open
+            self.object.save(update_fields=['title', 'body', 'updated_at'])
             messages.success(request, "Discussion updated successfully.")
             return redirect('discussions:discussion_detail', slug=self.kwargs.get('slug'), pk=self.object.pk)
 
@@ -110,40 +127,43 @@ class DiscussionDetailView(LoginRequiredMixin, CourseContextMixin, DetailView):
             new_body = request.POST.get('body')
             if new_body:
                 reply.body = new_body
-                reply.save()
+                reply.save(update_fields=['body', 'updated_at'])
                 messages.success(request, "Reply updated successfully.")
             return redirect('discussions:discussion_detail', slug=self.kwargs.get('slug'), pk=self.object.pk)
 
-        # Handle New Reply
+        # Handle New Reply (optionally in answer to another reply of this discussion)
         form = ReplyForm(request.POST)
         if form.is_valid():
             reply = form.save(commit=False)
             reply.discussion = self.object
             reply.author = request.user
+            parent_id = request.POST.get('parent')
+            if parent_id:
+                reply.parent = get_object_or_404(Reply, pk=parent_id, discussion=self.object)
             reply.save()
             
             # Notify discussion author (if reply author is not discussion author)
-            from apps.notifications.models import Notification
-            if self.object.author != request.user:
-                Notification.objects.create(
-                    recipient=self.object.author,
-                    sender=request.user,
+            link = reverse('discussions:discussion_detail', kwargs={'slug': self.kwargs.get('slug'), 'pk': self.object.pk})
+            if self.object.author_id != request.user.pk:
+                notify_users(
+                    [self.object.author_id],
                     title=f"New Reply in: {self.object.title}",
                     message=f"{request.user.username} replied to your discussion.",
-                    link=reverse('discussions:discussion_detail', kwargs={'slug': self.kwargs.get('slug'), 'pk': self.object.pk}),
-                    notification_type='discussion'
+                    link=link,
+                    notification_type='discussion',
+                    sender=request.user,
                 )
-            
+
             # Notify instructor (if reply author is not instructor and instructor is not discussion author - already notified above)
             course = self.object.course
-            if course.instructor != request.user and course.instructor != self.object.author:
-                 Notification.objects.create(
-                    recipient=course.instructor,
-                    sender=request.user,
+            if course.instructor_id not in (request.user.pk, self.object.author_id):
+                notify_users(
+                    [course.instructor_id],
                     title=f"New Reply in: {self.object.title}",
                     message=f"{request.user.username} replied to a discussion in {course.title}.",
-                    link=reverse('discussions:discussion_detail', kwargs={'slug': self.kwargs.get('slug'), 'pk': self.object.pk}),
-                    notification_type='discussion'
+                    link=link,
+                    notification_type='discussion',
+                    sender=request.user,
                 )
             messages.success(request, "Reply posted successfully.")
             return redirect('discussions:discussion_detail', slug=self.kwargs.get('slug'), pk=self.object.pk)
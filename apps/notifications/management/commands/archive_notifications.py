@@ -0,0 +1,24 @@
+import gzip
+
+from django.core.management.base import BaseCommand
+from apps.notifications.services import archive_read_notifications
+
+
+class Command(BaseCommand):
+    help = 'Move old read notifications to the archive table, or export them as gzipped JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive read notifications older than this many days')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--export', metavar='FILE', help='Append the rows to FILE (.jsonl.gz) instead')
+
+    def handle(self, *args, **options):
+        if options['export']:
+            with gzip.open(options['export'], 'at', encoding='utf-8') as export_to:
+                result = archive_read_notifications(options['days'], options['batch_size'], export_to)
+        else:
+            result = archive_read_notifications(options['days'], options['batch_size'])
+        self.stdout.write(
+            f'Notifications archived: {result.archived} in {result.batches} batch(es), {result.seconds:.2f}s'
+        )
+        self.stdout.write(self.style.SUCCESS('Notification archive complete.'))
@@ -19,6 +19,34 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread counts and the per-user list, newest first
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_read_idx'),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_created_idx'),
+            # Oldest read rows, scanned by the archiver
+            models.Index(fields=['created_at'], condition=models.Q(is_read=True), name='notif_read_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
+
+
+class ArchivedNotification(models.Model):
+    """Read notifications moved out of the hot table; keeps the original id"""
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    link = models.CharField(max_length=255, blank=True)
+    notification_type = models.CharField(max_length=20, choices=Notification.TYPES, default='system')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='archived_notif_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id}"
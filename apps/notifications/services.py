@@ -1,14 +1,299 @@
-from .models import Notification
+"""
+Notification services - dispatching and unread counters.
+
+Notifications are not written inside the request that triggers them: the
+dispatcher queues an event once the surrounding transaction commits, and
+the fan_out_notification_task Celery task inserts one row per recipient
+with bulk_create, in batches, so a course-wide announcement costs the
+request a single task enqueue however many students it reaches.
+
+Each user's unread count is cached under notifications:unread:<user id>.
+Marking one notification read decrements it; marking all read, or a
+fan-out to the user, drops it so the next poll recounts it once.
+
+New notifications and unread-count changes are also published to the
+user's open notification streams (see notifications/streams.py).
+
+Read notifications older than NOTIFICATION_ARCHIVE_AFTER_DAYS are moved
+in batches to ArchivedNotification, or exported as JSON lines, so the
+table that serves lists and counts only holds recent rows.
+"""
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+from .streams import broker, publish_after_commit
+
+UNREAD_CACHE_KEY = "notifications:unread:{user_id}"
+# Set while a reader counts on a miss; a fan-out deletes it with the counter
+UNREAD_COUNTING_KEY = "notifications:unread-counting:{user_id}"
+
+
+def _batch_size():
+    return getattr(settings, "NOTIFICATION_FANOUT_BATCH_SIZE", 1000)
+
+
+# ============================================
+# Dispatching
+# ============================================
+
+
+def _enqueue(audience, title, message, link, notification_type, sender):
+    from .tasks import fan_out_notification_task
+
+    event = {
+        "audience": audience,
+        "title": title,
+        "message": message,
+        "link": link,
+        "notification_type": notification_type,
+        "sender_id": getattr(sender, "pk", sender),
+    }
+    transaction.on_commit(lambda: fan_out_notification_task.delay(event))
+
+
+def notify_users(recipients, title, message, link='', notification_type='system', sender=None):
+    """Queue a notification for the given users (User objects or ids)"""
+    user_ids = sorted({getattr(recipient, "pk", recipient) for recipient in recipients})
+    if user_ids:
+        _enqueue({"user_ids": user_ids}, title, message, link, notification_type, sender)
+
+
+def notify_course_students(course, title, message, link='', notification_type='course', sender=None,
+                           exclude=()):
+    """
+    Queue a notification for every student enrolled in a course. Recipients
+    are resolved by the task, so the request does not load the enrollments.
+    """
+    audience = {
+        "course_id": getattr(course, "pk", course),
+        "exclude": sorted({getattr(user, "pk", user) for user in exclude}),
+    }
+    _enqueue(audience, title, message, link, notification_type, sender)
+
 
 def create_notification(recipient, title, message, link='', notification_type='system', sender=None):
     """
     Utility function to create a notification.
+    Queued through the dispatcher like every other notification.
+    """
+    notify_users([recipient], title, message, link, notification_type, sender)
+
+
+def _audience_batches(audience, batch_size):
+    """Yield lists of recipient ids for an event's audience"""
+    if "user_ids" in audience:
+        user_ids = audience["user_ids"]
+        for start in range(0, len(user_ids), batch_size):
+            yield user_ids[start:start + batch_size]
+        return
+
+    from apps.courses.models import Enrollment
+
+    user_ids = (
+        Enrollment.objects.filter(course_id=audience["course_id"])
+        .exclude(user_id__in=audience.get("exclude", ()))
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stream_data(notification):
+    return {
+        "id": notification.pk,
+        "title": notification.title,
+        "message": notification.message,
+        "link": notification.link,
+        "notification_type": notification.notification_type,
+    }
+
+
+def fan_out_notification(event, batch_size=None):
+    """Insert one notification per recipient of a queued event. Returns the number created."""
+    batch_size = batch_size or _batch_size()
+    created = 0
+    for user_ids in _audience_batches(event["audience"], batch_size):
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=user_id,
+                sender_id=event.get("sender_id"),
+                title=event["title"],
+                message=event["message"],
+                link=event.get("link", ""),
+                notification_type=event.get("notification_type", "system"),
+            )
+            for user_id in user_ids
+        ], batch_size=batch_size)
+        cache.delete_many([
+            key.format(user_id=user_id) for user_id in user_ids for key in (UNREAD_CACHE_KEY, UNREAD_COUNTING_KEY)
+        ])
+        broker.publish_many(
+            (notification.recipient_id, {"event": "notification", "data": _stream_data(notification)})
+            for notification in notifications
+        )
+        created += len(user_ids)
+    return created
+
+
+# ============================================
+# Unread counters
+# ============================================
+
+
+def get_unread_count(user):
+    """The user's unread notification count, counted in the database at most once per change"""
+    key = UNREAD_CACHE_KEY.format(user_id=user.pk)
+    count = cache.get(key)
+    if count is None:
+        counting_key = UNREAD_COUNTING_KEY.format(user_id=user.pk)
+        token = uuid.uuid4().hex
+        cache.set(counting_key, token, 60)
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        cache.add(key, count, getattr(settings, "NOTIFICATION_UNREAD_CACHE_TIMEOUT", 86400))
+        if cache.get(counting_key) != token:
+            # A fan-out committed while we counted and may have cleared the
+            # counter before it existed; don't keep a count that misses it
+            cache.delete(key)
+    return count
+
+
+def _decrement_unread(user, amount):
+    key = UNREAD_CACHE_KEY.format(user_id=user.pk)
+    try:
+        if cache.decr(key, amount) < 0:
+            cache.delete(key)
+    except ValueError:
+        # Not cached; the next read counts it
+        pass
+
+
+def mark_read(user, notification_id):
+    """Mark one of the user's notifications read. Returns False if it does not exist."""
+    updated = Notification.objects.filter(pk=notification_id, recipient=user, is_read=False).update(is_read=True)
+    if updated:
+        _decrement_unread(user, updated)
+        publish_after_commit(user.pk, "unread", {"count": get_unread_count(user)})
+        return True
+    return Notification.objects.filter(pk=notification_id, recipient=user).exists()
+
+
+def mark_all_read(user):
+    """Mark all of the user's notifications read and drop the cached counter"""
+    updated = Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+    # Not set to 0: a fan-out committed since the UPDATE would be hidden until the key expires
+    cache.delete(UNREAD_CACHE_KEY.format(user_id=user.pk))
+    publish_after_commit(user.pk, "unread", {"count": 0})
+    return updated
+
+
+# ============================================
+# Listing
+# ============================================
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(notification):
+    micros = (notification.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{notification.pk}"
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of a cursor, or None if it is malformed"""
+    try:
+        micros, pk = (int(part) for part in cursor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return _EPOCH + timedelta(microseconds=micros), pk
+
+
+def get_notification_page(user, before=None, page_size=20):
+    """
+    A page of the user's notifications, newest first, and the cursor of the
+    next page (None on the last page). Pages are read by keyset on
+    (created_at, id), so deep pages cost the same as the first.
     """
-    return Notification.objects.create(
-        recipient=recipient,
-        title=title,
-        message=message,
-        link=link,
-        notification_type=notification_type,
-        sender=sender
+    notifications = Notification.objects.filter(recipient=user).order_by("-created_at", "-id")
+    position = decode_cursor(before) if before else None
+    if position is not None:
+        created_at, pk = position
+        notifications = notifications.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    page = list(notifications[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+# ============================================
+# Retention
+# ============================================
+
+ARCHIVE_FIELDS = ("id", "recipient_id", "title", "message", "link", "notification_type", "created_at")
+
+
+@dataclass
+class ArchiveResult:
+    archived: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+
+def archive_read_notifications(older_than_days=None, batch_size=None, export_to=None):
+    """
+    Move read notifications older than `older_than_days` out of the
+    Notification table, oldest first, one batch per transaction.
+
+    Rows go to ArchivedNotification, or, when `export_to` is a text file,
+    are written to it as JSON lines instead. Archived rows keep their id,
+    so re-running after an interrupted batch does not duplicate them.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, "NOTIFICATION_ARCHIVE_AFTER_DAYS", 90)
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_ARCHIVE_BATCH_SIZE", 1000)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = (
+        Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+        .order_by("created_at")
+        .values(*ARCHIVE_FIELDS)
     )
+
+    result = ArchiveResult()
+    started = time.monotonic()
+    while True:
+        with transaction.atomic():
+            rows = list(candidates[:batch_size])
+            if not rows:
+                break
+            if export_to is not None:
+                for row in rows:
+                    export_to.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+                export_to.flush()
+            else:
+                ArchivedNotification.objects.bulk_create(
+                    [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+                )
+            # Read rows do not affect unread counts, so skip the per-row delete signals
+            Notification.objects.filter(pk__in=[row["id"] for row in rows])._raw_delete(Notification.objects.db)
+        result.archived += len(rows)
+        result.batches += 1
+        if len(rows) < batch_size:
+            break
+    result.seconds = time.monotonic() - started
+    return result
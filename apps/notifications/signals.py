@@ -0,0 +1,15 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notification
+from .services import UNREAD_CACHE_KEY
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def drop_unread_count(sender, instance, **kwargs):
+    """Rows written outside the dispatcher invalidate the recipient's cached unread count"""
+    if kwargs.get('raw'):
+        return
+    cache.delete(UNREAD_CACHE_KEY.format(user_id=instance.recipient_id))
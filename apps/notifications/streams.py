@@ -0,0 +1,165 @@
+"""
+Notification streams - in-process pub/sub for the notification SSE endpoint.
+
+Each open stream subscribes an asyncio queue for its user on the process
+broker. Publishing is thread-safe: events are handed to the subscriber's
+event loop with call_soon_threadsafe, so Celery tasks and sync views can
+publish while async views wait. Slow subscribers drop events instead of
+growing without bound; the next unread-count event resynchronizes them.
+
+Without a shared broker, events only reach streams served by the process
+that published them. Setting NOTIFICATION_STREAM_BROKER_URL to a Redis URL
+relays every event through Redis pub/sub to all processes.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notifications:stream:"
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, broker, user_id, loop):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Runs on the subscriber's loop"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout):
+        """Next event, or None after timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class RedisRelay:
+    """Relays published events between processes through Redis pub/sub"""
+
+    def __init__(self, url, broker):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.broker = broker
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        self.client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+
+    def publish_many(self, events):
+        pipeline = self.client.pipeline(transaction=False)
+        for user_id, event in events:
+            pipeline.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+        pipeline.execute()
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="notification-relay", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        for message in pubsub.listen():
+            try:
+                user_id = int(message["channel"].decode().rsplit(":", 1)[1])
+                self.broker.publish_local(user_id, json.loads(message["data"]))
+            except Exception:
+                logger.exception("Dropped malformed notification stream message")
+
+
+class NotificationBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._relay = None
+        self._relay_configured = False
+
+    @property
+    def relay(self):
+        if not self._relay_configured:
+            url = getattr(settings, "NOTIFICATION_STREAM_BROKER_URL", "")
+            self._relay = RedisRelay(url, self) if url else None
+            self._relay_configured = True
+        return self._relay
+
+    def subscribe(self, user_id):
+        """Subscribe the running event loop to a user's events"""
+        subscription = Subscription(self, user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        if self.relay is not None:
+            self.relay.ensure_listening()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish_local(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+    def publish(self, user_id, event):
+        """Deliver an event to every stream of the user, in all processes when a relay is set"""
+        if self.relay is not None:
+            self.relay.publish(user_id, event)
+        else:
+            self.publish_local(user_id, event)
+
+    def publish_many(self, events):
+        """Publish (user_id, event) pairs; a relay sends them in one pipeline"""
+        if self.relay is not None:
+            self.relay.publish_many(events)
+        else:
+            for user_id, event in events:
+                self.publish_local(user_id, event)
+
+
+broker = NotificationBroker()
+
+
+def publish_after_commit(user_id, name, data):
+    """Publish a stream event once the current transaction commits"""
+    event = {"event": name, "data": data}
+    transaction.on_commit(lambda: broker.publish(user_id, event))
+
+
+def format_sse(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,30 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def fan_out_notification_task(event):
+    """
+    Create the notifications of a queued event for all its recipients.
+    Queued by the dispatcher in notifications/services.py.
+    """
+    from .services import fan_out_notification
+
+    created = fan_out_notification(event)
+    logger.info(f"Notification '{event['title']}' sent to {created} recipient(s)")
+    return created
+
+
+@shared_task
+def archive_notifications_task():
+    """
+    Move old read notifications to the archive table.
+    Scheduled nightly via CELERY_BEAT_SCHEDULE.
+    """
+    from .services import archive_read_notifications
+
+    result = archive_read_notifications()
+    logger.info(f"Archived {result.archived} notification(s) in {result.seconds:.2f}s")
+    return result.archived
@@ -1,14 +1,35 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Notification
+from apps.courses.models import Category, Course, Enrollment
+from .models import ArchivedNotification, Notification
+from .streams import NotificationBroker, broker
+from .services import (
+    archive_read_notifications, fan_out_notification, get_notification_page, get_unread_count, mark_all_read,
+    notify_course_students, notify_users
+)
 
 User = get_user_model()
 
 class NotificationTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='testuser', password='password')
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
@@ -38,3 +59,229 @@ class NotificationTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.notification.refresh_from_db()
         self.assertTrue(self.notification.is_read)
+
+
+class NotificationDispatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', password='password')
+        self.students = [User.objects.create_user(username=f'student{n}', password='password') for n in range(5)]
+        self.course = Course.objects.create(
+            title='Course', slug='course', instructor=self.instructor,
+            category=Category.objects.create(name='Category')
+        )
+        for student in self.students:
+            Enrollment.objects.create(user=student, course=self.course)
+
+    def test_notifications_are_queued_until_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            notify_users(self.students[:2], 'Hello', 'World', sender=self.instructor)
+            self.assertEqual(Notification.objects.count(), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Notification.objects.filter(sender=self.instructor).count(), 2)
+
+    def test_course_announcement_fans_out_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_course_students(self.course, 'Announcement', 'Class moved', exclude=[self.students[0]])
+        self.assertEqual(Notification.objects.filter(title='Announcement').count(), 4)
+
+        event = {'audience': {'course_id': self.course.pk}, 'title': 'Batched', 'message': 'x'}
+        with self.assertNumQueries(4):
+            # Recipient lookup, then one insert per batch of two
+            self.assertEqual(fan_out_notification(event, batch_size=2), 5)
+
+    def test_unread_counter_is_cached_and_maintained(self):
+        student = self.students[0]
+        for n in range(3):
+            Notification.objects.create(recipient=student, title=f'N{n}', message='x')
+
+        self.assertEqual(get_unread_count(student), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(student), 3)
+
+        client = APIClient()
+        client.force_authenticate(user=student)
+        notification = Notification.objects.filter(recipient=student).first()
+        client.post(reverse('notifications:api_mark_read', kwargs={'pk': notification.pk}))
+        client.post(reverse('notifications:api_mark_read', kwargs={'pk': notification.pk}))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(student), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_users([student], 'New', 'x')
+        self.assertEqual(client.get(reverse('notifications:api_unread_count')).data['count'], 3)
+
+        mark_all_read(student)
+        self.assertEqual(get_unread_count(student), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(student), 0)
+        other = Notification.objects.create(recipient=self.students[1], title='Other', message='x')
+        self.assertEqual(
+            client.post(reverse('notifications:api_mark_read', kwargs={'pk': other.pk})).status_code, 404
+        )
+
+    def test_fan_out_during_a_recount_is_not_hidden(self):
+        student = self.students[0]
+        add = cache.add
+
+        def fan_out_then_add(*args, **kwargs):
+            # The fan-out commits after the count ran but before it is cached
+            fan_out_notification({'audience': {'user_ids': [student.pk]}, 'title': 'Race', 'message': 'x'})
+            return add(*args, **kwargs)
+
+        with mock.patch.object(cache, 'add', side_effect=fan_out_then_add):
+            self.assertEqual(get_unread_count(student), 0)
+        self.assertEqual(get_unread_count(student), 1)
+
+    def test_fan_out_during_mark_all_read_is_not_hidden(self):
+        student = self.students[0]
+        Notification.objects.create(recipient=student, title='Old', message='x')
+        update = QuerySet.update
+
+        def update_then_fan_out(queryset, **kwargs):
+            updated = update(queryset, **kwargs)
+            # The fan-out commits after the UPDATE but before the counter is reset
+            fan_out_notification({'audience': {'user_ids': [student.pk]}, 'title': 'Race', 'message': 'x'})
+            return updated
+
+        with mock.patch.object(QuerySet, 'update', update_then_fan_out):
+            mark_all_read(student)
+        self.assertEqual(get_unread_count(student), 1)
+
+    def test_discussion_create_notifies_instructor(self):
+        self.client.login(username='student0', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('discussions:discussion_create', kwargs={'slug': self.course.slug}),
+                {'title': 'Question', 'body': 'Help'},
+            )
+        self.assertTrue(Notification.objects.filter(recipient=self.instructor, notification_type='discussion').exists())
+
+
+class NotificationBrokerTest(SimpleTestCase):
+    def test_many_idle_streams_share_one_loop(self):
+        hub = NotificationBroker()
+
+        async def run():
+            subscriptions = [hub.subscribe(user_id % 500) for user_id in range(1000)]
+            self.assertEqual(hub.subscriber_count(), 1000)
+
+            # Idle streams only wait on their queues
+            idle = await asyncio.gather(*(subscription.get(0.05) for subscription in subscriptions))
+            self.assertEqual(idle, [None] * 1000)
+
+            hub.publish(7, {'event': 'unread', 'data': {'count': 1}})
+            received = await asyncio.gather(*(subscription.get(0.05) for subscription in subscriptions))
+            self.assertEqual([subscriptions[n].user_id for n, event in enumerate(received) if event], [7, 7])
+
+            for subscription in subscriptions:
+                subscription.close()
+            self.assertEqual(hub.subscriber_count(), 0)
+
+        asyncio.run(run())
+
+    def test_publish_from_another_thread(self):
+        hub = NotificationBroker()
+
+        async def run():
+            subscription = hub.subscribe(1)
+            threading.Thread(target=hub.publish, args=(1, {'event': 'unread', 'data': {'count': 2}})).start()
+            event = await subscription.get(1)
+            subscription.close()
+            return event
+
+        self.assertEqual(asyncio.run(run()), {'event': 'unread', 'data': {'count': 2}})
+
+
+class NotificationStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='streamer', password='password')
+        Notification.objects.create(recipient=self.user, title='Waiting', message='x')
+
+    @override_settings(NOTIFICATION_STREAM_MAX_SECONDS=1)
+    async def test_stream_sends_unread_count_then_events(self):
+        url = reverse('notifications:api_stream')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertIn(b'event: unread\ndata: {"count": 1}', await anext(chunks))
+        self.assertEqual(broker.subscriber_count(self.user.pk), 1)
+
+        broker.publish(self.user.pk, {'event': 'notification', 'data': {'title': 'Hello'}})
+        self.assertEqual(await anext(chunks), b'event: notification\ndata: {"title": "Hello"}\n\n')
+
+        # The stream ends at its maximum lifetime and releases the subscription
+        self.assertNotIn(b'event:', b''.join([chunk async for chunk in chunks]))
+        self.assertEqual(broker.subscriber_count(self.user.pk), 0)
+
+    def test_fan_out_and_mark_read_publish_to_streams(self):
+        published = []
+        original = broker.publish_local
+        broker.publish_local = lambda user_id, event: published.append((user_id, event))
+        try:
+            fan_out_notification({'audience': {'user_ids': [self.user.pk]}, 'title': 'Fresh', 'message': 'x'})
+            with self.captureOnCommitCallbacks(execute=True):
+                mark_all_read(self.user)
+        finally:
+            broker.publish_local = original
+
+        self.assertEqual([event['event'] for _, event in published], ['notification', 'unread'])
+        self.assertEqual(published[0][1]['data']['title'], 'Fresh')
+        self.assertEqual(published[1], (self.user.pk, {'event': 'unread', 'data': {'count': 0}}))
+
+
+class NotificationRetentionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='password')
+        now = timezone.now()
+        for n in range(5):
+            notification = Notification.objects.create(
+                recipient=self.user, title=f'N{n}', message='x', is_read=n != 4
+            )
+            # N0-N3 are old and read, N4 is old but unread
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(days=200 + n))
+        self.recent = Notification.objects.create(recipient=self.user, title='Recent', message='x', is_read=True)
+
+    def test_old_read_notifications_are_archived_in_batches(self):
+        result = archive_read_notifications(older_than_days=90, batch_size=3)
+        self.assertEqual((result.archived, result.batches), (4, 2))
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)), ['N4', 'Recent']
+        )
+        archived = ArchivedNotification.objects.get(title='N2')
+        self.assertEqual(archived.recipient, self.user)
+        self.assertLess(archived.created_at, timezone.now() - timedelta(days=200))
+        self.assertEqual(archive_read_notifications(older_than_days=90).archived, 0)
+
+    def test_export_command_writes_compressed_json_lines(self):
+        path = os.path.join(tempfile.mkdtemp(), 'notifications.jsonl.gz')
+        out = StringIO()
+        call_command('archive_notifications', days=90, export=path, stdout=out)
+        self.assertIn('Notifications archived: 4', out.getvalue())
+
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            rows = [json.loads(line) for line in exported]
+        self.assertEqual([row['title'] for row in rows], ['N3', 'N2', 'N1', 'N0'])
+        self.assertFalse(ArchivedNotification.objects.exists())
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_list_pages_by_cursor(self):
+        page, cursor = get_notification_page(self.user, page_size=4)
+        self.assertEqual([n.title for n in page], ['Recent', 'N0', 'N1', 'N2'])
+        with self.assertNumQueries(1):
+            page, next_cursor = get_notification_page(self.user, cursor, page_size=4)
+        self.assertEqual([n.title for n in page], ['N3', 'N4'])
+        self.assertIsNone(next_cursor)
+        self.assertEqual(len(get_notification_page(self.user, 'garbage', page_size=4)[0]), 4)
+
+        self.client.login(username='reader', password='password')
+        response = self.client.get(reverse('notifications:list'))
+        self.assertEqual(len(response.context['notifications']), 6)
+        self.assertIsNone(response.context['next_cursor'])
@@ -1,6 +1,6 @@
 from django.urls import path
 from .api_views import NotificationListView as ApiNotificationListView, UnreadCountView, MarkReadView
-from .views import NotificationListView
+from .views import NotificationListView, notification_stream
 
 app_name = 'notifications'
 
@@ -9,4 +9,5 @@ urlpatterns = [
     path('api/list/', ApiNotificationListView.as_view(), name='api_list'),
     path('api/unread-count/', UnreadCountView.as_view(), name='api_unread_count'),
     path('api/<int:pk>/mark-read/', MarkReadView.as_view(), name='api_mark_read'),
+    path('api/stream/', notification_stream, name='api_stream'),
 ]
@@ -1,21 +1,83 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import redirect
 from django.contrib import messages
 from .models import Notification
+from .services import get_notification_page, get_unread_count, mark_all_read
+from .streams import broker, format_sse
 
 class NotificationListView(LoginRequiredMixin, ListView):
     model = Notification
     template_name = 'notifications/list.html'
     context_object_name = 'notifications'
-    paginate_by = 20
+    page_size = 20
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
+        # Keyset pagination: ?before=<cursor> instead of page numbers
+        notifications, self.next_cursor = get_notification_page(
+            self.request.user, self.request.GET.get('before'), self.page_size
+        )
+        return notifications
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['is_first_page'] = not self.request.GET.get('before')
+        return context
 
     def post(self, request, *args, **kwargs):
         # Mark all as read
         if 'mark_all_read' in request.POST:
-            Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+            mark_all_read(request.user)
             messages.success(request, "All notifications marked as read.")
         return redirect('notifications:list')
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of a user's notifications.
+
+    Sends the unread count first, then new notifications and count changes
+    as they are published, with a comment line as heartbeat. Streams end
+    after NOTIFICATION_STREAM_MAX_SECONDS and the browser reconnects.
+    Under WSGI an open stream would hold a worker thread, so there the
+    response ends after the unread count and the client reconnects after
+    NOTIFICATION_STREAM_RETRY_MS, which degrades to polling.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    retry_ms = getattr(settings, "NOTIFICATION_STREAM_RETRY_MS", 15000)
+    count = await sync_to_async(get_unread_count)(user)
+    if isinstance(request, ASGIRequest):
+        events = _stream_events(user.pk, count, retry_ms)
+    else:
+        events = [f"retry: {retry_ms}\n" + format_sse("unread", {"count": count})]
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _stream_events(user_id, count, retry_ms):
+    subscription = broker.subscribe(user_id)
+    heartbeat = getattr(settings, "NOTIFICATION_STREAM_HEARTBEAT", 15)
+    deadline = time.monotonic() + getattr(settings, "NOTIFICATION_STREAM_MAX_SECONDS", 300)
+    try:
+        yield f"retry: {retry_ms}\n" + format_sse("unread", {"count": count})
+        while time.monotonic() < deadline:
+            event = await subscription.get(min(heartbeat, max(deadline - time.monotonic(), 0)))
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(event["event"], event["data"])
+    finally:
+        subscription.close()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _clear_search_log_buffer():
+    """Keep queued search queries from leaking into other tests or the exit flush"""
+    from apps.courses.services.search_service import search_log_buffer
+
+    search_log_buffer.clear()
+    yield
+    search_log_buffer.clear()
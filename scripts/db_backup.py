@@ -1,7 +1,35 @@
 """
 Database backup script for LearnOnline
-Creates JSON backup of all data from current database
+Streams every table into a backup directory of compressed JSONL files
+
+A backup directory holds one <app_label>.<model>.jsonl.gz file per table,
+with one JSON array of column values per line, and a manifest.json listing
+each table's columns, row count and SHA-256. Rows are read with iterator()
+in bounded chunks, so memory use does not grow with the size of the
+database.
+
+With --incremental only rows changed since the previous backup are written
+for the tables in INCREMENTAL_MODELS, whose change stamp moves on every
+write (updated_at, or the insert time for append-only tables). Every other
+table is copied in full, including tables with an updated_at that some
+writes leave alone (sections, reordered subsections, vote scores, ...).
+Deleted rows are not tracked, so restore the full backup followed by its
+incrementals in order.
+
+Content types and permissions are not backed up, since migrate recreates
+them with ids that can differ between databases. Columns pointing at them
+are written as natural keys ([app_label, model] or [codename, app_label,
+model]) and resolved against the target database on restore.
+
+Usage:
+  python scripts/db_backup.py
+  python scripts/db_backup.py --incremental
+  python scripts/db_backup.py --resume backups/db_backup_20231221_120000
 """
+import argparse
+import gzip
+import hashlib
+import json
 import os
 import sys
 from datetime import datetime
@@ -16,41 +44,197 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
 import django
 django.setup()
 
-from django.core.management import call_command
+from django.apps import apps
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+BACKUP_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+EXCLUDED_APPS = {'contenttypes', 'sessions'}
+EXCLUDED_MODELS = {'auth.permission'}
+# Referenced by natural key instead of id
+NATURAL_KEY_MODELS = {'contenttypes.contenttype', 'auth.permission'}
+# Tables whose change stamp is set by every write path, including queryset
+# updates and bulk operations. Check those before adding a table here.
+INCREMENTAL_MODELS = {
+    'courses.category': 'updated_at',
+    'courses.quiz': 'updated_at',
+    'courses.coursestats': 'updated_at',
+    'courses.categorystats': 'updated_at',
+    'payments.payment': 'updated_at',
+    'organization.school': 'updated_at',
+    # Rows in these tables are never edited, so the insert time marks every change.
+    # Not courses.searchquery: its rows are written up to
+    # SEARCH_LOG_FLUSH_INTERVAL seconds after their created_at.
+    'payments.paymentlog': 'created_at',
+    # created_at is the original notification's; archived_at is the insert time
+    'notifications.archivednotification': 'archived_at',
+}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def backup_models():
+    """Concrete models (including many-to-many tables) that are backed up"""
+    return [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed
+        and not model._meta.proxy
+        and model._meta.app_label not in EXCLUDED_APPS
+        and model._meta.label_lower not in EXCLUDED_MODELS
+    ]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def natural_keys(model):
+    """{pk: natural key} for every row of a table referenced by natural key"""
+    rows = model._base_manager.all()
+    if model._meta.label_lower == 'auth.permission':
+        rows = rows.select_related('content_type')
+    return {obj.pk: list(obj.natural_key()) for obj in rows}
+
+
+def latest_manifest(backup_dir):
+    """(name, manifest) of the most recent complete backup in the directory"""
+    manifests = []
+    for path in backup_dir.glob(f'db_backup_*/{MANIFEST_FILE}'):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('complete'):
+            manifests.append((manifest['started_at'], path.parent.name, manifest))
+    return max(manifests)[1:] if manifests else (None, None)
+
 
+def write_manifest(path, manifest):
+    # Written after every table so an interrupted backup can be resumed
+    tmp = path / f'{MANIFEST_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path / MANIFEST_FILE)
 
-def backup_database():
-    """Create a JSON backup of the database"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = PROJECT_ROOT / 'backups'
+
+def backup_table(model, path, since=None, chunk_size=2000):
+    """Stream one table into <label>.jsonl.gz and return its manifest entry"""
+    columns = [f.attname for f in model._meta.concrete_fields]
+    queryset = model._base_manager.order_by('pk')
+
+    keyed = {
+        columns.index(f.attname): natural_keys(f.related_model)
+        for f in model._meta.concrete_fields
+        if f.is_relation and f.related_model._meta.label_lower in NATURAL_KEY_MODELS
+    }
+    change_field = INCREMENTAL_MODELS.get(model._meta.label_lower)
+    if since and change_field:
+        queryset = queryset.filter(**{f'{change_field}__gte': since})
+
+    filename = f'{model._meta.label_lower}.jsonl.gz'
+    rows = 0
+    with gzip.open(path / filename, 'wt', encoding='utf-8') as out:
+        for values in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+            if keyed:
+                values = list(values)
+                for index, keys in keyed.items():
+                    if values[index] is not None:
+                        values[index] = keys[values[index]]
+            out.write(json.dumps(values, cls=DjangoJSONEncoder, ensure_ascii=False))
+            out.write('\n')
+            rows += 1
+
+    return {
+        'file': filename,
+        'columns': columns,
+        'natural_keys': [columns[index] for index in keyed],
+        'rows': rows,
+        'sha256': file_sha256(path / filename),
+        'mode': 'incremental' if since and change_field else 'full',
+        'change_field': change_field if since else None,
+    }
+
+
+def backup_database(incremental=False, resume=None, chunk_size=2000, backup_dir=None):
+    """Create a streaming backup of the database"""
+    backup_dir = Path(backup_dir or PROJECT_ROOT / 'backups')
     backup_dir.mkdir(exist_ok=True)
-    
-    backup_file = backup_dir / f'db_backup_{timestamp}.json'
-    
+
+    if resume:
+        path = Path(resume)
+        with open(path / MANIFEST_FILE, encoding='utf-8') as f:
+            manifest = json.load(f)
+        print(f"Resuming backup: {path}")
+    else:
+        started_at = timezone.now()
+        path = backup_dir / f"db_backup_{started_at.strftime('%Y%m%d_%H%M%S')}"
+        path.mkdir()
+        manifest = {
+            'format': BACKUP_FORMAT,
+            'started_at': started_at.isoformat(),
+            'database': {
+                'engine': settings.DATABASES['default']['ENGINE'],
+                'name': str(settings.DATABASES['default']['NAME']),
+            },
+            'since': None,
+            'base': None,
+            'complete': False,
+            'tables': {},
+        }
+        if incremental:
+            base, previous = latest_manifest(backup_dir)
+            if previous is None:
+                print("No previous backup found, creating a full backup")
+            else:
+                # Start of the previous run, so rows changed while it ran are included again
+                manifest['since'] = previous['started_at']
+                manifest['base'] = base
+
     # Show current database info
-    db_engine = settings.DATABASES['default']['ENGINE']
-    db_name = settings.DATABASES['default']['NAME']
-    print(f"Database Engine: {db_engine}")
-    print(f"Database Name: {db_name}")
-    print(f"\nCreating backup: {backup_file}")
-    
-    with open(backup_file, 'w', encoding='utf-8') as f:
-        call_command(
-            'dumpdata',
-            '--natural-foreign',
-            '--natural-primary',
-            '--indent', '2',
-            exclude=['contenttypes', 'auth.Permission', 'sessions'],
-            stdout=f
-        )
-    
-    file_size = backup_file.stat().st_size
-    print(f"\n✓ Backup completed: {backup_file}")
-    print(f"  File size: {file_size / 1024:.2f} KB")
-    
-    return backup_file
+    print(f"Database Engine: {manifest['database']['engine']}")
+    print(f"Database Name: {manifest['database']['name']}")
+    since = datetime.fromisoformat(manifest['since']) if manifest['since'] else None
+    print(f"\nCreating {'incremental' if since else 'full'} backup: {path}")
+    if since:
+        print(f"  Rows changed since {manifest['since']} (base: {manifest['base']})")
+
+    for model in backup_models():
+        label = model._meta.label_lower
+        done = manifest['tables'].get(label)
+        if done and (path / done['file']).exists() and file_sha256(path / done['file']) == done['sha256']:
+            continue
+        entry = backup_table(model, path, since=since, chunk_size=chunk_size)
+        manifest['tables'][label] = entry
+        write_manifest(path, manifest)
+        print(f"  {label}: {entry['rows']} rows")
+
+    manifest['complete'] = True
+    manifest['finished_at'] = timezone.now().isoformat()
+    write_manifest(path, manifest)
+
+    total_rows = sum(entry['rows'] for entry in manifest['tables'].values())
+    total_size = sum((path / entry['file']).stat().st_size for entry in manifest['tables'].values())
+    print(f"\n✓ Backup completed: {path}")
+    print(f"  Tables: {len(manifest['tables'])}, rows: {total_rows}")
+    print(f"  Size: {total_size / 1024:.2f} KB")
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up the LearnOnline database')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only back up rows changed since the last complete backup')
+    parser.add_argument('--resume', metavar='BACKUP_DIR',
+                        help='Finish an interrupted backup, skipping tables already written')
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help='Rows fetched from the database per round trip (default: 2000)')
+    args = parser.parse_args()
+    backup_database(incremental=args.incremental, resume=args.resume, chunk_size=args.chunk_size)
 
 
 if __name__ == '__main__':
-    backup_database()
+    main()
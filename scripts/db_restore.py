@@ -1,9 +1,30 @@
 """
 Database restore script for LearnOnline
-Restores data from JSON backup to target database
+Restores data from backup directories created by db_backup.py
+
+Each table's file is checked against the manifest checksum, then loaded
+with bulk_create in batches. Content type and permission references are
+stored as natural keys and mapped to the target database's ids; rows that
+point at a permission or content type the target does not have are skipped. Tables are restored in dependency order:
+tables whose foreign keys only point at tables already restored are loaded
+in parallel, one worker thread per table. Rows that already exist (same
+primary key) are updated, so a full backup can be followed by its
+incremental backups and an interrupted restore can simply be run again.
+
+Usage:
+  python scripts/db_restore.py backups/db_backup_20231221_120000
+  python scripts/db_restore.py <full backup> <incremental> [<incremental> ...]
+  python scripts/db_restore.py backups/db_backup_20231221_120000.json   (legacy dumpdata file)
 """
+import argparse
+import gzip
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -14,41 +35,235 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
 import django
 django.setup()
 
-from django.core.management import call_command
+from django.apps import apps
 from django.conf import settings
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+
+BACKUP_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def read_manifest(path):
+    with open(path / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BACKUP_FORMAT:
+        raise ValueError(f"Unsupported backup format: {manifest.get('format')}")
+    if not manifest.get('complete'):
+        raise ValueError(f"Backup {path} is incomplete; finish it with db_backup.py --resume")
+    return manifest
+
+
+def verify_checksums(path, manifest):
+    for label, entry in manifest['tables'].items():
+        digest = hashlib.sha256()
+        with open(path / entry['file'], 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {label} in {path}")
+
+
+def restore_levels(labels):
+    """
+    Group the tables into levels that can each be restored in parallel.
+
+    A table's level comes after every table its foreign keys point to, so
+    each level only references rows committed by the levels before it.
+    """
+    models_by_label = {label: apps.get_model(label) for label in labels}
+    depends_on = {}
+    for label, model in models_by_label.items():
+        depends_on[label] = {
+            f.related_model._meta.label_lower
+            for f in model._meta.concrete_fields
+            if f.is_relation and f.related_model is not model
+            and f.related_model._meta.label_lower in models_by_label
+        }
+
+    levels = []
+    remaining = dict(depends_on)
+    while remaining:
+        done = {label for level in levels for label in level}
+        ready = sorted(label for label, deps in remaining.items() if deps <= done)
+        if not ready:
+            # A foreign key cycle; restore the rest one table at a time
+            levels.extend([label] for label in sorted(remaining))
+            break
+        levels.append(ready)
+        for label in ready:
+            del remaining[label]
+    return levels
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Store the backed-up values of auto_now/auto_now_add fields unchanged"""
+    fields = [
+        f for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def natural_key_ids(model):
+    """{natural key: pk} for every row of a table referenced by natural key"""
+    rows = model._base_manager.all()
+    if model._meta.label_lower == 'auth.permission':
+        rows = rows.select_related('content_type')
+    return {tuple(obj.natural_key()): obj.pk for obj in rows}
+
 
+def read_rows(path, entry, model):
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    keyed = {
+        name: natural_key_ids(fields[name].related_model)
+        for name in entry.get('natural_keys', ()) if name in fields
+    }
+    with gzip.open(path / entry['file'], 'rt', encoding='utf-8') as rows:
+        for line in rows:
+            if not line.strip():
+                continue
+            values = {}
+            for name, value in zip(entry['columns'], json.loads(line)):
+                field = fields.get(name)
+                if field is None:
+                    # Column dropped since the backup was taken
+                    continue
+                if value is not None and name in keyed:
+                    value = keyed[name].get(tuple(value))
+                    if value is None and not field.null:
+                        break
+                elif value is not None and not field.is_relation:
+                    value = field.to_python(value)
+                values[name] = value
+            else:
+                yield model(**values)
+
+
+def restore_table(path, label, entry, batch_size):
+    """Load one table inside its own transaction and return the row count"""
+    model = apps.get_model(label)
+    pk_name = model._meta.pk.name
+    update_fields = [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.attname in entry['columns']
+    ]
+    options = {'ignore_conflicts': True}
+    if update_fields:
+        options = {'update_conflicts': True, 'unique_fields': [pk_name], 'update_fields': update_fields}
+
+    restored = 0
+    try:
+        with keep_timestamps(model), transaction.atomic():
+            objects = read_rows(path, entry, model)
+            while batch := list(islice(objects, batch_size)):
+                model._base_manager.bulk_create(batch, batch_size=batch_size, **options)
+                restored += len(batch)
+    finally:
+        # Worker threads each open their own connection
+        connections.close_all()
+    return restored
+
+
+def reset_sequences(labels):
+    sql = connection.ops.sequence_reset_sql(no_style(), [apps.get_model(label) for label in labels])
+    if sql:
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+
+
+def restore_backup(path, workers, batch_size):
+    manifest = read_manifest(path)
+    verify_checksums(path, manifest)
+    kind = 'incremental' if manifest['since'] else 'full'
+    print(f"\nRestoring {kind} backup: {path}")
+
+    tables = {}
+    for label, entry in manifest['tables'].items():
+        if not entry['rows']:
+            continue
+        try:
+            apps.get_model(label)
+        except LookupError:
+            print(f"  {label}: skipped, model no longer exists")
+            continue
+        tables[label] = entry
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for level in restore_levels(list(tables)):
+            futures = {
+                label: pool.submit(restore_table, path, label, tables[label], batch_size)
+                for label in level
+            }
+            for label, future in futures.items():
+                restored = future.result()
+                note = ''
+                if restored < tables[label]['rows']:
+                    note = f", {tables[label]['rows'] - restored} skipped (unknown permission or content type)"
+                print(f"  {label}: {restored} rows{note}")
+
+    reset_sequences(list(tables))
+
+
+def restore_database(backups, workers=4, batch_size=1000, assume_yes=False):
+    """Restore database from one or more backups, applied in order"""
+    paths = [Path(backup) for backup in backups]
+    for path in paths:
+        if not path.exists():
+            print(f"Error: Backup not found: {path}")
+            sys.exit(1)
 
-def restore_database(backup_file: str):
-    """Restore database from JSON backup"""
-    backup_path = Path(backup_file)
-    
-    if not backup_path.exists():
-        print(f"Error: Backup file not found: {backup_file}")
-        sys.exit(1)
-    
     # Show current database info
     db_engine = settings.DATABASES['default']['ENGINE']
     db_name = settings.DATABASES['default']['NAME']
     print(f"Target Database Engine: {db_engine}")
     print(f"Target Database Name: {db_name}")
-    print(f"\nRestoring from: {backup_file}")
-    print("Warning: This will add data to the current database!")
-    
-    confirm = input("\nContinue? (yes/no): ")
-    if confirm.lower() != 'yes':
-        print("Cancelled.")
-        sys.exit(0)
-    
+    print(f"\nRestoring from: {', '.join(str(path) for path in paths)}")
+    print("Warning: This will add data to the current database and overwrite rows with the same ids!")
+
+    if not assume_yes:
+        confirm = input("\nContinue? (yes/no): ")
+        if confirm.lower() != 'yes':
+            print("Cancelled.")
+            sys.exit(0)
+
+    if connection.vendor == 'sqlite' and workers > 1:
+        # SQLite allows a single writer at a time
+        print("SQLite target: restoring one table at a time")
+        workers = 1
+
     print("\nRestoring data...")
-    call_command('loaddata', str(backup_path))
+    for path in paths:
+        if path.is_file():
+            call_command('loaddata', str(path))
+        else:
+            restore_backup(path, workers, batch_size)
     print("\n✓ Restore completed!")
 
 
+def main():
+    parser = argparse.ArgumentParser(description='Restore the LearnOnline database from backups')
+    parser.add_argument('backups', nargs='+',
+                        help='Backup directories to apply in order (a full backup, then its incrementals)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Tables restored in parallel (default: 4)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Rows per bulk insert (default: 1000)')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+    restore_database(args.backups, workers=args.workers, batch_size=args.batch_size, assume_yes=args.yes)
+
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python db_restore.py <backup_file.json>")
-        print("\nExample:")
-        print("  python scripts/db_restore.py backups/db_backup_20231221_120000.json")
-        sys.exit(1)
-    
-    restore_database(sys.argv[1])
+    main()
@@ -1,103 +1,336 @@
 """
 Complete migration script: SQLite → PostgreSQL
 This script performs a full migration with verification
+
+Data is copied table by table straight from the SQLite file into the target
+database. Each table is read in primary key order in keyset batches
+(WHERE pk > last ORDER BY pk LIMIT n) and written with bulk_create, one
+transaction per batch. Tables run concurrently in a worker pool as soon as
+every table they reference has been copied.
+
+Progress is checkpointed per table after every batch, so running the script
+again after an interruption resumes where it stopped. Sequences are reset
+and row counts verified at the end.
+
+Usage:
+  python scripts/migrate_to_postgresql.py
+  python scripts/migrate_to_postgresql.py --source old.sqlite3 --workers 8
+  python scripts/migrate_to_postgresql.py --target-sqlite copy.sqlite3   (local dry run)
 """
+import argparse
+import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
+
+import django
+django.setup()
+
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SOURCE_ALIAS = 'migration_source'
+EXCLUDED_APPS = {'sessions'}
+
 
-def check_postgresql_connection():
+def set_database(alias, config):
+    """Point a database alias at another database at runtime"""
+    connections.settings[alias] = connections.configure_settings(
+        {DEFAULT_DB_ALIAS: {}, alias: dict(config)}
+    )[alias]
+    # Drop a connection opened with the old settings during startup
+    for connection in connections.all(initialized_only=True):
+        if connection.alias == alias:
+            connection.close()
+            del connections[alias]
+
+
+def check_postgresql_connection(allow_sqlite=False):
     """Test PostgreSQL connection"""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
-    import django
-    django.setup()
-    
-    from django.db import connection
-    from django.conf import settings
-    
-    db_engine = settings.DATABASES['default']['ENGINE']
-    db_name = settings.DATABASES['default']['NAME']
-    
+    connection = connections[DEFAULT_DB_ALIAS]
+    db_engine = connection.settings_dict['ENGINE']
+    db_name = connection.settings_dict['NAME']
+
     print(f"Database Engine: {db_engine}")
     print(f"Database Name: {db_name}")
-    
-    if 'sqlite' in db_engine:
+
+    if 'sqlite' in db_engine and not allow_sqlite:
         print("\n⚠ Warning: DATABASE is still configured for SQLite")
         print("Please update .env to use PostgreSQL before running this script")
         print("\nTo switch to PostgreSQL:")
         print("1. Copy .env.postgresql.example to .env")
         print("2. Update PostgreSQL credentials in .env")
         print("3. Run this script again")
+        print("\nTo try the copy locally, pass --target-sqlite <file>")
         return False
-    
+
     try:
         connection.ensure_connection()
-        print("\n✓ PostgreSQL connection successful")
+        print(f"\n✓ {connection.display_name} connection successful")
         return True
     except Exception as e:
-        print(f"\n✗ PostgreSQL connection failed: {e}")
+        print(f"\n✗ {connection.display_name} connection failed: {e}")
         return False
 
 
 def run_migrations():
     """Run Django migrations"""
-    from django.core.management import call_command
     print("\n--- Running migrations ---")
-    call_command('migrate', '--verbosity', '1')
+    call_command('migrate', verbosity=1)
     print("✓ Migrations completed")
 
 
-def verify_data_count():
-    """Verify data counts after migration"""
-    from django.contrib.auth.models import User
-    from apps.courses.models import Course, Category, Section, Lesson, Enrollment
-    from apps.accounts.models import Profile
-    from apps.payments.models import Payment
-    
-    counts = {
-        'Users': User.objects.count(),
-        'Profiles': Profile.objects.count(),
-        'Categories': Category.objects.count(),
-        'Courses': Course.objects.count(),
-        'Sections': Section.objects.count(),
-        'Lessons': Lesson.objects.count(),
-        'Enrollments': Enrollment.objects.count(),
-        'Payments': Payment.objects.count(),
+# ============================================
+# Table copy
+# ============================================
+
+
+class Checkpoint:
+    """Per-table progress ({label: {"last_pk", "rows", "started", "done"}}) saved to a JSON file"""
+
+    def __init__(self, path, source, target):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = {'source': source, 'target': target, 'tables': {}}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if (saved['source'], saved['target']) != (source, target):
+                raise ValueError(
+                    f"Checkpoint {self.path} belongs to {saved['source']} → {saved['target']}; "
+                    "pass --restart to start over"
+                )
+            self.data = saved
+
+    @property
+    def started(self):
+        return self.path.exists()
+
+    def table(self, label):
+        return self.data['tables'].get(label, {'last_pk': None, 'rows': 0, 'started': False, 'done': False})
+
+    def update(self, label, **values):
+        with self.lock:
+            self.data['tables'][label] = {**self.table(label), **values}
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, default=str)
+            os.replace(tmp, self.path)
+
+
+def copy_models(source):
+    """Concrete models (including many-to-many tables) present in the source database"""
+    tables = set(connections[source].introspection.table_names())
+    return [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed
+        and not model._meta.proxy
+        and model._meta.app_label not in EXCLUDED_APPS
+        and model._meta.db_table in tables
+    ]
+
+
+def table_dependencies(models):
+    """{label: labels of the other copied tables its foreign keys point to}"""
+    labels = {model._meta.label_lower for model in models}
+    return {
+        model._meta.label_lower: {
+            f.related_model._meta.label_lower
+            for f in model._meta.concrete_fields
+            if f.is_relation and f.related_model is not model
+            and f.related_model._meta.label_lower in labels
+        }
+        for model in models
     }
-    
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Copy auto_now/auto_now_add fields unchanged instead of stamping the current time"""
+    fields = [
+        f for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def copy_table(model, source, target, checkpoint, batch_size):
+    """Copy one table in keyset batches, resuming after the checkpointed key"""
+    label = model._meta.label_lower
+    state = checkpoint.table(label)
+    if state['done']:
+        return state['rows']
+
+    columns = [f.attname for f in model._meta.concrete_fields]
+    pk_index = columns.index(model._meta.pk.attname)
+    rows = model._base_manager.using(source).order_by('pk').values_list(*columns)
+    last_pk, copied = state['last_pk'], state['rows']
+
+    try:
+        if last_pk is not None:
+            # Drop a batch that was committed after the last checkpoint was written
+            model._base_manager.using(target).filter(pk__gt=last_pk)._raw_delete(target)
+        elif state.get('started'):
+            # Interrupted before the first checkpoint, possibly after the first batch committed
+            model._base_manager.using(target).all()._raw_delete(target)
+        else:
+            checkpoint.update(label, started=True)
+        with keep_timestamps(model):
+            while True:
+                remaining = rows.filter(pk__gt=last_pk) if last_pk is not None else rows
+                batch = list(remaining[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic(using=target):
+                    model._base_manager.using(target).bulk_create(
+                        [model(**dict(zip(columns, values))) for values in batch], batch_size=batch_size
+                    )
+                last_pk = batch[-1][pk_index]
+                copied += len(batch)
+                checkpoint.update(label, last_pk=last_pk, rows=copied)
+        checkpoint.update(label, done=True)
+    finally:
+        # Worker threads each open their own connections
+        connections.close_all()
+    return copied
+
+
+def copy_tables(source, target, checkpoint, workers=4, batch_size=2000):
+    """
+    Copy every table, running up to `workers` tables at a time.
+
+    A table is started once every table it references is complete, so each
+    batch only points at rows the target database already holds.
+    """
+    models = {model._meta.label_lower: model for model in copy_models(source)}
+    pending = table_dependencies(models.values())
+    done = {label for label in pending if checkpoint.table(label)['done']}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for label in sorted(pending):
+                if pending[label] <= done:
+                    running[pool.submit(copy_table, models[label], source, target, checkpoint, batch_size)] = label
+                    del pending[label]
+            if not running:
+                # A foreign key cycle; start the rest and rely on deferred constraints
+                label = sorted(pending)[0]
+                print(f"  ⚠ {label}: foreign key cycle, copying before {sorted(pending[label] - done)}")
+                pending[label] = set()
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                label = running.pop(future)
+                print(f"  ✓ {label}: {future.result()} rows")
+                done.add(label)
+    return list(models.values())
+
+
+def reset_sequences(alias, models):
+    sql = connections[alias].ops.sequence_reset_sql(no_style(), models)
+    if sql:
+        with connections[alias].cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+    print(f"✓ Sequences reset ({len(sql)} statements)")
+
+
+def verify_data_count(source, target, models):
+    """Verify data counts after migration"""
     print("\n--- Data Verification ---")
-    for model, count in counts.items():
-        status = "✓" if count > 0 else "○"
-        print(f"  {status} {model}: {count}")
-    
-    return counts
+    mismatched = []
+    for model in models:
+        expected = model._base_manager.using(source).count()
+        actual = model._base_manager.using(target).count()
+        if expected != actual:
+            mismatched.append(model._meta.label_lower)
+            print(f"  ✗ {model._meta.label_lower}: {actual} of {expected}")
+    if not mismatched:
+        print(f"  ✓ {len(models)} tables, all row counts match")
+    return mismatched
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Copy the SQLite database into PostgreSQL')
+    parser.add_argument('--source', default=str(PROJECT_ROOT / 'db.sqlite3'),
+                        help='SQLite database to copy from (default: db.sqlite3)')
+    parser.add_argument('--target-sqlite', metavar='PATH',
+                        help='Copy into this SQLite file instead of the configured database')
+    parser.add_argument('--workers', type=int, default=4, help='Tables copied in parallel (default: 4)')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Rows per batch (default: 2000)')
+    parser.add_argument('--checkpoint', default=str(PROJECT_ROOT / 'backups' / 'migration_checkpoint.json'),
+                        help='Progress file used to resume an interrupted copy')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore the checkpoint and copy everything again')
+    args = parser.parse_args()
+
     print("=" * 50)
     print("LearnOnline: SQLite → PostgreSQL Migration")
     print("=" * 50)
-    
+
+    set_database(SOURCE_ALIAS, {'ENGINE': 'django.db.backends.sqlite3', 'NAME': args.source})
+    target = DEFAULT_DB_ALIAS
+    if args.target_sqlite:
+        # Concurrent writers wait for SQLite's single write lock
+        set_database(target, {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': args.target_sqlite, 'OPTIONS': {'timeout': 60},
+        })
+    target_name = str(connections[target].settings_dict['NAME'])
+    if Path(target_name).resolve() == Path(args.source).resolve():
+        print("Error: source and target are the same database")
+        sys.exit(1)
+
     # Step 1: Check database connection
-    if not check_postgresql_connection():
+    if not check_postgresql_connection(allow_sqlite=bool(args.target_sqlite)):
         sys.exit(1)
-    
+
     # Step 2: Run migrations
     run_migrations()
-    
-    # Step 3: Show data verification
-    counts = verify_data_count()
-    
-    if all(c == 0 for c in counts.values()):
-        print("\n⚠ Database is empty. Import data using:")
-        print("  python scripts/db_restore.py backups/db_backup_TIMESTAMP.json")
-    
+
+    # Step 3: Copy the data
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    checkpoint = Checkpoint(checkpoint_path, str(Path(args.source).resolve()), target_name)
+    if not checkpoint.started:
+        # Start from empty tables, without the content types and permissions
+        # that migrate created, so every copied id matches the source
+        call_command('flush', database=target, interactive=False, inhibit_post_migrate=True, verbosity=0)
+        print("\n--- Copying tables ---")
+    else:
+        print(f"\n--- Resuming copy from {checkpoint_path} ---")
+
+    started = time.monotonic()
+    models = copy_tables(SOURCE_ALIAS, target, checkpoint, workers=args.workers, batch_size=args.batch_size)
+    print(f"✓ Copied {len(models)} tables in {time.monotonic() - started:.1f}s")
+
+    # Step 4: Fix sequences and verify
+    reset_sequences(target, models)
+    if verify_data_count(SOURCE_ALIAS, target, models):
+        sys.exit(1)
+
     print("\n" + "=" * 50)
-    print("Migration setup complete!")
+    print("Migration complete!")
     print("=" * 50)
 
 
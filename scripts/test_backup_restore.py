@@ -0,0 +1,67 @@
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.test import TransactionTestCase
+
+from apps.courses.models import Category, Course, Section
+from apps.discussions.models import Discussion
+from apps.discussions.services import cast_vote
+
+import db_backup
+import db_restore
+
+User = get_user_model()
+
+
+class BackupRestoreTests(TransactionTestCase):
+    def setUp(self):
+        self.backup_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.backup_dir.cleanup)
+        self.user = User.objects.create_user(username='teacher', password='password')
+        category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(title='Python', slug='python', instructor=self.user, category=category)
+        self.section = Section.objects.create(course=self.course, title='Basics', order=0)
+        self.discussion = Discussion.objects.create(course=self.course, author=self.user, title='Q', body='x')
+
+    def backup(self, incremental=False):
+        if incremental:
+            # Backup directories are named to the second
+            time.sleep(1.1)
+        with redirect_stdout(StringIO()):
+            return db_backup.backup_database(incremental=incremental, backup_dir=self.backup_dir.name)
+
+    def restore(self, *paths):
+        with redirect_stdout(StringIO()):
+            db_restore.restore_database(paths, workers=1, assume_yes=True)
+
+    def test_incremental_keeps_writes_that_do_not_move_updated_at(self):
+        full = self.backup()
+        # Neither write changes updated_at
+        Section.objects.filter(pk=self.section.pk).update(title='Getting started')
+        cast_vote(self.user, 1, discussion=self.discussion)
+        incremental = self.backup(incremental=True)
+
+        Section.objects.filter(pk=self.section.pk).update(title='Broken')
+        Discussion.objects.filter(pk=self.discussion.pk).update(score=99)
+        self.restore(full, incremental)
+
+        self.assertEqual(Section.objects.get(pk=self.section.pk).title, 'Getting started')
+        self.assertEqual(Discussion.objects.get(pk=self.discussion.pk).score, 1)
+
+    def test_permissions_are_restored_by_natural_key(self):
+        group = Group.objects.create(name='Editors')
+        group.permissions.add(Permission.objects.get(codename='add_course'))
+        path = self.backup()
+
+        # A freshly migrated database numbers its permissions differently
+        old = Permission.objects.get(codename='add_course')
+        new = Permission.objects.create(codename='add_course_tmp', name=old.name, content_type=old.content_type)
+        old.delete()
+        Permission.objects.filter(pk=new.pk).update(codename='add_course')
+        self.restore(path)
+
+        self.assertEqual(list(group.permissions.values_list('pk', flat=True)), [new.pk])
@@ -195,6 +195,21 @@ function initLessonSortable(sectionId, courseSlug, subsectionId = null) {
     $sortableList.disableSelection();
 }
 
+// Save several levels of the outline at once, e.g. after moving a lesson to
+// another subsection: {sections: [...], subsections: {id: [...]}, lessons: {id: [...]}}
+function saveOutlineOrder(courseSlug, order) {
+    return $.ajax({
+        url: `/dashboard/courses/${encodeURIComponent(courseSlug)}/outline/reorder/`,
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': $('[name=csrfmiddlewaretoken]').val(),
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        contentType: 'application/json',
+        data: JSON.stringify(order)
+    });
+}
+
 // Initialize sortable for quiz questions
 function initQuestionSortable(params) {
     const { courseSlug, sectionId, lessonId, quizId } = params;
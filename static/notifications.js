@@ -13,21 +13,50 @@ document.addEventListener('DOMContentLoaded', function () {
             })
             .then(data => {
                 if (!data) return;
-                if (data.count > 0) {
-                    unreadBadge.innerText = data.count;
-                    unreadBadge.classList.remove('d-none');
-                } else {
-                    unreadBadge.classList.add('d-none');
-                }
+                showUnreadCount(data.count);
             })
             .catch(error => console.log('Notification fetch error:', error));
     }
 
-    if (unreadBadge) {
+    function showUnreadCount(count) {
+        if (count > 0) {
+            unreadBadge.innerText = count;
+            unreadBadge.classList.remove('d-none');
+        } else {
+            unreadBadge.classList.add('d-none');
+        }
+    }
+
+    // Prefer the event stream; fall back to polling when it is unavailable
+    function startPolling() {
         fetchUnreadCount();
         setInterval(fetchUnreadCount, 300000);
     }
 
+    if (unreadBadge) {
+        if (window.EventSource) {
+            const stream = new EventSource('/notifications/api/stream/');
+            let opened = false;
+            stream.addEventListener('unread', function (event) {
+                opened = true;
+                showUnreadCount(JSON.parse(event.data).count);
+            });
+            stream.addEventListener('notification', function () {
+                const current = parseInt(unreadBadge.innerText, 10) || 0;
+                showUnreadCount(unreadBadge.classList.contains('d-none') ? 1 : current + 1);
+            });
+            stream.onerror = function () {
+                // Never connected (e.g. logged out): stop retrying and poll instead
+                if (!opened) {
+                    stream.close();
+                    startPolling();
+                }
+            };
+        } else {
+            startPolling();
+        }
+    }
+
     // 2. Load Notifications Logic
     const dropdownToggle = document.getElementById('navbarDropdownMenuLink');
     if (dropdownToggle) {